@@ -0,0 +1,82 @@
+import atexit
+import os
+import threading
+from collections import Counter
+from datetime import datetime
+
+
+class ViewCounter:
+    """Per-process view counts, written to the database in batches.
+
+    ``record()`` only bumps a dict entry under a lock, so counting adds no
+    database work to a request. A thread (one per process, started on first
+    use) passes the counts gathered since the last flush to ``flush(counts)``
+    every ``interval`` seconds, sooner once ``max_keys`` distinct keys are
+    pending, and once more at exit. Counts are keyed (kind, metric, hour,
+    item id); ``flush`` should add them to what is stored, so processes
+    flushing on their own schedules merge. If it raises, the counts are kept
+    for the next attempt.
+    """
+
+    def __init__(self, flush, interval=30.0, max_keys=20000):
+        self.flush = flush
+        self.interval = interval
+        self.max_keys = max_keys
+        self.counts = Counter()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self._pid = None
+
+    def record(self, kind, metric, item_ids, now=None):
+        hour = (now or datetime.utcnow()).replace(minute=0, second=0, microsecond=0)
+        # Started first: in a forked child it drops the parent's counts, not this view
+        if self._pid != os.getpid():
+            self.start()
+        with self.lock:
+            for item_id in item_ids:
+                self.counts[kind, metric, hour, item_id] += 1
+            pending = len(self.counts)
+        if pending >= self.max_keys:
+            self.wakeup.set()
+
+    def drain(self):
+        with self.lock:
+            counts, self.counts = self.counts, Counter()
+        return counts
+
+    def flush_now(self):
+        """Write pending counts; returns how many keys were written."""
+        counts = self.drain()
+        if not counts:
+            return 0
+        try:
+            self.flush(counts)
+        except Exception:
+            with self.lock:
+                self.counts.update(counts)
+            raise
+        return len(counts)
+
+    def start(self):
+        with self.lock:
+            if self._pid == os.getpid():
+                return
+            # Counts inherited from a parent process are the parent's to flush
+            if self._pid is not None:
+                self.counts = Counter()
+            self._pid = os.getpid()
+        atexit.register(self._flush_quietly)
+        threading.Thread(target=self._run, name='view-counter', daemon=True).start()
+
+    def _flush_quietly(self):
+        try:
+            self.flush_now()
+        except Exception:
+            pass
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            # The database may be locked; the counts wait for the next round.
+            self._flush_quietly()
@@ -1,13 +1,61 @@
-from flask import Flask, render_template, jsonify, request, redirect, url_for, session, send_from_directory, flash
+from flask import Flask, render_template, jsonify, request, redirect, url_for, session, send_from_directory, flash, Response, stream_with_context, abort, g
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 import os
+import io
+import json
+import math
+import re
+import smtplib
+import sqlite3
+import sys
+import tempfile
+import threading
+import mimetypes
+import zipfile
+from urllib.parse import urlsplit
+from email.message import EmailMessage
+import time
+import click
+from collections import namedtuple
+from functools import lru_cache
+from types import SimpleNamespace
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import deferred, load_only
+from werkzeug.exceptions import TooManyRequests
+from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.utils import secure_filename
-from datetime import datetime
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from datetime import date, datetime, timedelta
+from contextlib import ExitStack
+from uuid import uuid4
+from tasks import TaskQueue, run_worker
+from mailsink import MailSink
+from objectsink import ObjectSink
+import cvindex
+import catalog_io
+from matching import JobMatcher
+from suggest import PrefixIndex
+from readmodel import ReadModel, CHANGE_LOG_DDL
+from feeds import DocumentCache, Entry, CalendarEvent, atom_feed, ical_calendar, sitemap, sitemap_urls
+from publish import StaticSite
+from analytics import ViewCounter
+import related
+from profiling import Sampler, Tracer, MemoryTracer, ProfileStore
+import uploadgc
+from pubsub import Broker, BrokerRelay, BrokerServer, SQLitePoller
+import dbmaint
+import planaudit
+import jobarchive
+import content
+from storage import create_storage
+from ratelimit import RateLimiter, MemoryStore, DatabaseStore
 
 app = Flask(__name__)
 app.secret_key = 'your_secret_key'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///amco.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///amco.db')
 app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'gif'}
 db = SQLAlchemy(app)
 migrate = Migrate(app, db)
@@ -19,12 +67,111 @@ app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
+# Where uploads are kept: 'local' (UPLOAD_FOLDER) or 's3' for any S3-compatible
+# object store, which serves downloads and direct uploads via presigned URLs.
+app.config['STORAGE_BACKEND'] = os.environ.get('STORAGE_BACKEND', 'local')
+app.config['S3_BUCKET'] = os.environ.get('S3_BUCKET', 'amco-uploads')
+app.config['S3_ENDPOINT_URL'] = os.environ.get('S3_ENDPOINT_URL')
+app.config['S3_REGION'] = os.environ.get('S3_REGION', 'us-east-1')
+app.config['S3_ACCESS_KEY'] = os.environ.get('S3_ACCESS_KEY')
+app.config['S3_SECRET_KEY'] = os.environ.get('S3_SECRET_KEY')
+app.config['UPLOAD_URL_EXPIRES'] = 300
+# How long a presigned upload may be attached to a form after it was issued
+app.config['UPLOAD_TICKET_MAX_AGE'] = 3600
+app.config['MAX_DIRECT_UPLOAD_SIZE'] = 50 * 1024 * 1024
+app.config['UPLOAD_QUARANTINE_FOLDER'] = os.path.join(app.instance_path, 'quarantine')
+storage = create_storage(app.config)
+
+# Threads running views when served over ASGI by asgi.py; transfers do not use them.
+app.config['ASGI_THREADS'] = int(os.environ.get('ASGI_THREADS', 8))
+# Request body limits, enforced by Flask under both WSGI and ASGI. Catalog
+# imports carry image archives and get their own, larger limit.
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_LENGTH', 50 * 1024 * 1024))
+app.config['MAX_IMPORT_SIZE'] = int(os.environ.get('MAX_IMPORT_SIZE', 1024 * 1024 * 1024))
+
+app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'localhost')
+app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 8025))
+app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER', 'careers@amco.local')
+
+queue = TaskQueue(db)
+# Finished tasks are kept this long for inspection; dead ones longer, to debug
+app.config['TASK_RETENTION_DAYS'] = 7
+app.config['TASK_DEAD_RETENTION_DAYS'] = 30
+
+@queue.periodic('purge_tasks', interval=24 * 3600)
+def purge_tasks():
+    queue.purge(timedelta(days=app.config['TASK_RETENTION_DAYS']),
+                timedelta(days=app.config['TASK_DEAD_RETENTION_DAYS']))
+
+# Token-bucket rate limits for login, search and application routes, and a cap
+# on concurrent uploads per process. 'database' shares buckets between processes.
+app.config['RATELIMIT_ENABLED'] = True
+app.config['RATELIMIT_STORAGE'] = os.environ.get('RATELIMIT_STORAGE', 'memory')
+app.config['UPLOAD_CONCURRENCY'] = 8
+# Number of reverse proxies in front of the app. Their X-Forwarded-For,
+# -Proto and -Host headers are trusted, so request.remote_addr (which keys the
+# per-client buckets) is the client's address instead of the proxy's. Leave
+# at 0 when clients connect directly, or they could pick their own address.
+app.config['PROXY_FIX_HOPS'] = int(os.environ.get('PROXY_FIX_HOPS', 0))
+if app.config['PROXY_FIX_HOPS']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_HOPS'],
+                            x_proto=app.config['PROXY_FIX_HOPS'], x_host=app.config['PROXY_FIX_HOPS'])
+rate_limit_store = DatabaseStore(db)
+limiter = RateLimiter(rate_limit_store if app.config['RATELIMIT_STORAGE'] == 'database' else MemoryStore(),
+                      enabled=app.config['RATELIMIT_ENABLED'])
+
+@queue.periodic('purge_rate_limits', interval=3600)
+def purge_rate_limits():
+    rate_limit_store.purge()
+
+# Commit hooks: functions called with the changed instances of some models
+# once the transaction that changed them has committed. Values are the
+# attributes loaded at flush time, since the session cannot query then.
+ModelChange = namedtuple('ModelChange', ['model', 'id', 'deleted', 'values', 'created'])
+commit_hooks = []
+
+def on_commit(*models):
+    def decorator(func):
+        commit_hooks.append((models, func))
+        return func
+    return decorator
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_changes(session, flush_context):
+    changes = session.info.setdefault('model_changes', {})
+    for obj, deleted in [(o, False) for o in session.new | session.dirty] + [(o, True) for o in session.deleted]:
+        state = inspect(obj)
+        identity = tuple(state.mapper.primary_key_from_instance(obj))
+        if None in identity:
+            continue
+        values = {k: v for k, v in state.dict.items() if not k.startswith('_')}
+        previous = changes.get((type(obj), identity))
+        created = obj in session.new or (previous is not None and previous.created)
+        changes[(type(obj), identity)] = ModelChange(type(obj), identity[0], deleted, values, created)
+
+@event.listens_for(db.session, 'after_commit')
+def _run_commit_hooks(session):
+    changes = list(session.info.pop('model_changes', {}).values())
+    if not changes:
+        return
+    for models, func in commit_hooks:
+        relevant = [change for change in changes if issubclass(change.model, models)]
+        if relevant:
+            try:
+                func(relevant)
+            except Exception:
+                app.logger.exception('Commit hook %s failed', func.__name__)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('model_changes', None)
+
 class ActionHistory(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     entity_type = db.Column(db.String(50))
     entity_id = db.Column(db.Integer)
     action = db.Column(db.String(50))
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
     details = db.Column(db.Text)
 
     def __init__(self, entity_type, entity_id, action, details):
@@ -40,6 +187,16 @@ class Product(db.Model):
     price = db.Column(db.Float, nullable=False)
     image = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)
+
+    def serialize(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'price': self.price,
+            'image': self.image,
+            'description': self.description,
+        }
 
     def log_action(self, action, details):
         log_entry = ActionHistory(
@@ -51,15 +208,21 @@ class Product(db.Model):
         db.session.add(log_entry)
         db.session.commit()
 
+db.Index('ix_product_price_id', Product.price, Product.id)
+db.Index('ix_product_name_id', Product.name.collate('NOCASE'), Product.id)
+
 class AppliedJob(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    job_id = db.Column(db.Integer, nullable=False)
+    job_id = db.Column(db.Integer, db.ForeignKey('job.id'), nullable=False, index=True)
     first_name = db.Column(db.String(100), nullable=False)
     father_name = db.Column(db.String(100), nullable=False)
     applicant_email = db.Column(db.String(100), nullable=False)
     gender = db.Column(db.String(10), nullable=True)
     age = db.Column(db.Integer, nullable=True)
     cv_path = db.Column(db.String(100), nullable=True)
+    cv_text = deferred(db.Column(db.Text, nullable=True))
+    cv_extracted_at = db.Column(db.DateTime, nullable=True)
+    applied_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)
 
     def log_action(self, action, details):
         log_entry = ActionHistory(
@@ -79,6 +242,10 @@ class BlogPost(db.Model):
     title = db.Column(db.String(100), nullable=False)
     content = db.Column(db.Text, nullable=False)
     author = db.Column(db.String(50), nullable=False)
+    # Markdown rendered when content is set; see render_content_fields
+    content_html = deferred(db.Column(db.Text, nullable=True))
+    excerpt = db.Column(db.String(300), nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow, index=True)
 
     def __init__(self, title, content, author):
         self.title = title
@@ -91,8 +258,18 @@ class Event(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.String(100), nullable=False)  # Add a description field
-    date = db.Column(db.Date, nullable=False) 
+    date = db.Column(db.Date, nullable=False, index=True)
     location = db.Column(db.String(100), nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)
+
+    def serialize(self):
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'date': self.date.isoformat(),
+            'location': self.location,
+        }
 
     def __repr__(self):
         return f"<Event(title='{self.title}', date='{self.date}', location='{self.location}')>"
@@ -103,6 +280,16 @@ class NewsArticle(db.Model):
     title = db.Column(db.String(100), nullable=False)
     content = db.Column(db.Text, nullable=False)
     author = db.Column(db.String(100), nullable=False)
+    content_html = deferred(db.Column(db.Text, nullable=True))
+    excerpt = db.Column(db.String(300), nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow, index=True)
+
+@event.listens_for(BlogPost.content, 'set')
+@event.listens_for(NewsArticle.content, 'set')
+def render_content_fields(target, value, oldvalue, initiator):
+    # Rendered once per write, so views only read stored HTML and excerpts.
+    target.content_html = content.render_markdown(value)
+    target.excerpt = content.excerpt(target.content_html)
 
 class Job(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -111,6 +298,10 @@ class Job(db.Model):
     requirements = db.Column(db.String(500), nullable=False)
     deadline = db.Column(db.DateTime, nullable=True)
     is_active = db.Column(db.Boolean, default=True)
+    applicant_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    applicants_24h = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    applicants_7d = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)
 
     def __init__(self, *args, **kwargs):
         super(Job, self).__init__(*args, **kwargs)
@@ -140,15 +331,883 @@ class Job(db.Model):
         db.session.add(log_entry)
         db.session.commit()
 
+# The jobs feed: open postings, most recently updated first
+db.Index('ix_job_is_active_updated_at', Job.is_active, Job.updated_at)
+
+# Stub left in place of an archived posting's applications; see archive_job
+class JobArchive(db.Model):
+    __tablename__ = 'job_archive'
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('job.id'), nullable=False, unique=True)
+    name = db.Column(db.String(200), nullable=False)
+    applicant_count = db.Column(db.Integer, nullable=False)
+    cv_count = db.Column(db.Integer, nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# Pre-aggregated applicant statistics, maintained by the AppliedJob events below
+class JobApplicantHourly(db.Model):
+    __tablename__ = 'job_applicant_hourly'
+
+    job_id = db.Column(db.Integer, primary_key=True)
+    hour = db.Column(db.DateTime, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class JobApplicantBreakdown(db.Model):
+    __tablename__ = 'job_applicant_breakdown'
+
+    job_id = db.Column(db.Integer, primary_key=True)
+    dimension = db.Column(db.String(20), primary_key=True)
+    bucket = db.Column(db.String(20), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+# Listing impressions and page views per item and hour, written by view_counter
+class ItemViewHourly(db.Model):
+    __tablename__ = 'item_view_hourly'
+
+    kind = db.Column(db.String(20), primary_key=True)
+    hour = db.Column(db.DateTime, primary_key=True)
+    metric = db.Column(db.String(20), primary_key=True)
+    item_id = db.Column(db.Integer, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+# Precomputed most similar products and jobs, RELATED_ITEMS_K per item
+class RelatedItem(db.Model):
+    __tablename__ = 'related_item'
+
+    kind = db.Column(db.String(20), primary_key=True)
+    item_id = db.Column(db.Integer, primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)
+    related_id = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float, nullable=False)
+
+# How far refresh_related_items has followed read_model_change, per kind
+class RelatedItemCursor(db.Model):
+    __tablename__ = 'related_item_cursor'
+
+    kind = db.Column(db.String(20), primary_key=True)
+    seq = db.Column(db.Integer, nullable=False)
+    built_at = db.Column(db.DateTime, nullable=False)
+
+AGE_BUCKETS = [(18, 'Under 18'), (25, '18-24'), (35, '25-34'), (45, '35-44'), (55, '45-54')]
+
+def age_bucket(age):
+    try:
+        age = int(age)
+    except (TypeError, ValueError):
+        return 'Unknown'
+    for upper, label in AGE_BUCKETS:
+        if age < upper:
+            return label
+    return '55+'
+
+def gender_bucket(gender):
+    # Must match the SQL backfills in the migrations: UPPER of the first
+    # character, LOWER of the rest, after TRIM (which only strips spaces).
+    gender = (gender or '').strip(' ')[:20]
+    return gender[:1].upper() + gender[1:].lower() or 'Unknown'
+
+def _upsert_count(connection, model, keys, delta):
+    table = model.__table__
+    stmt = sqlite_insert(table).values(count=delta, **keys)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={'count': table.c.count + delta}
+    )
+    connection.execute(stmt)
+
+def _update_applicant_stats(connection, applied_job, delta):
+    now = datetime.utcnow()
+    applied_at = applied_job.applied_at
+    if applied_at is None and delta > 0:
+        applied_at = now
+    job = Job.__table__
+    values = {'applicant_count': job.c.applicant_count + delta}
+    if applied_at is not None:
+        if applied_at >= now - timedelta(hours=24):
+            values['applicants_24h'] = job.c.applicants_24h + delta
+        if applied_at >= now - timedelta(days=7):
+            values['applicants_7d'] = job.c.applicants_7d + delta
+        hour = applied_at.replace(minute=0, second=0, microsecond=0)
+        _upsert_count(connection, JobApplicantHourly, {'job_id': applied_job.job_id, 'hour': hour}, delta)
+    connection.execute(job.update().where(job.c.id == applied_job.job_id).values(**values))
+    _upsert_count(connection, JobApplicantBreakdown, {
+        'job_id': applied_job.job_id, 'dimension': 'gender', 'bucket': gender_bucket(applied_job.gender)
+    }, delta)
+    _upsert_count(connection, JobApplicantBreakdown, {
+        'job_id': applied_job.job_id, 'dimension': 'age', 'bucket': age_bucket(applied_job.age)
+    }, delta)
+
+@event.listens_for(AppliedJob, 'after_insert')
+def applied_job_inserted(mapper, connection, target):
+    _update_applicant_stats(connection, target, 1)
+
+@event.listens_for(AppliedJob, 'after_delete')
+def applied_job_deleted(mapper, connection, target):
+    _update_applicant_stats(connection, target, -1)
+
+# Background tasks, run by `flask worker` outside the request
+@queue.task('log_action')
+def log_action_task(entity_type, entity_id, action, details):
+    log_entry = ActionHistory(
+        entity_type=entity_type,
+        entity_id=entity_id,
+        action=action,
+        details=details
+    )
+    db.session.add(log_entry)
+    db.session.commit()
+
+@queue.task('send_email')
+def send_email(to, subject, body):
+    message = EmailMessage()
+    message['From'] = app.config['MAIL_DEFAULT_SENDER']
+    message['To'] = to
+    message['Subject'] = subject
+    message.set_content(body)
+    with smtplib.SMTP(app.config['MAIL_SERVER'], app.config['MAIL_PORT'], timeout=30) as smtp:
+        smtp.send_message(message)
+
+@queue.task('send_application_email')
+def send_application_email(applied_job_id):
+    applied_job = AppliedJob.query.get(applied_job_id)
+    if applied_job is None:
+        return
+    job = Job.query.get(applied_job.job_id)
+    job_title = job.title if job else 'the position'
+    send_email(
+        to=applied_job.applicant_email,
+        subject=f"Application received: {job_title}",
+        body=f"Dear {applied_job.first_name},\n\n"
+             f"Thank you for applying for {job_title} at AMCO. "
+             f"We have received your application and will be in touch.\n"
+    )
+
+@queue.periodic('refresh_applicant_windows', interval=600)
+def refresh_applicant_windows():
+    now = datetime.utcnow()
+    hourly = JobApplicantHourly.__table__
+    job = Job.__table__
+
+    def window_sum(since):
+        return db.select(db.func.coalesce(db.func.sum(hourly.c.count), 0)) \
+            .where(hourly.c.job_id == job.c.id, hourly.c.hour >= since) \
+            .scalar_subquery()
+
+    db.session.execute(job.update().values(
+        applicants_24h=window_sum(now - timedelta(hours=24)),
+        applicants_7d=window_sum(now - timedelta(days=7))
+    ))
+    db.session.execute(hourly.delete().where(hourly.c.hour < now - timedelta(days=8)))
+    db.session.commit()
+
+# View analytics: listing impressions and page views of products, jobs, blog
+# posts and news are counted in memory and added to item_view_hourly with one
+# batched upsert per process every ANALYTICS_FLUSH_INTERVAL seconds.
+app.config['ANALYTICS_ENABLED'] = True
+app.config['ANALYTICS_FLUSH_INTERVAL'] = 30
+app.config['ANALYTICS_RETENTION_DAYS'] = 90
+ANALYTICS_KINDS = {'product': Product, 'job': Job, 'blog': BlogPost, 'news': NewsArticle}
+
+def flush_item_views(counts):
+    table = ItemViewHourly.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['kind', 'hour', 'metric', 'item_id'],
+        set_={'count': table.c.count + stmt.excluded['count']}
+    )
+    rows = [{'kind': kind, 'hour': hour, 'metric': metric, 'item_id': item_id, 'count': count}
+            for (kind, metric, hour, item_id), count in counts.items()]
+    # Runs on the flusher thread, or at exit
+    with app.app_context(), db.engine.begin() as connection:
+        connection.execute(stmt, rows)
+
+view_counter = ViewCounter(flush_item_views, interval=app.config['ANALYTICS_FLUSH_INTERVAL'])
+
+def count_views(kind, metric, item_ids):
+    # Pages the app renders for itself (static export, query audit) are not visits
+    if app.config['ANALYTICS_ENABLED'] and not request.environ.get('amco.internal'):
+        view_counter.record(kind, metric, item_ids)
+
+def item_view_totals(kind, days, metric=None):
+    """{item id: {metric: count}} over the last ``days`` days."""
+    since = datetime.utcnow() - timedelta(days=days)
+    total = db.func.sum(ItemViewHourly.count)
+    query = db.select(ItemViewHourly.item_id, ItemViewHourly.metric, total) \
+        .where(ItemViewHourly.kind == kind, ItemViewHourly.hour >= since) \
+        .group_by(ItemViewHourly.item_id, ItemViewHourly.metric)
+    if metric:
+        query = query.where(ItemViewHourly.metric == metric)
+    totals = {}
+    for item_id, row_metric, count in db.session.execute(query):
+        totals.setdefault(item_id, {})[row_metric] = count
+    return totals
+
+def most_viewed(kind, days=7, limit=10):
+    """[(item id, label, metrics)] for the most viewed existing items of a kind."""
+    model = ANALYTICS_KINDS[kind]
+    totals = item_view_totals(kind, days)
+    label = model.name if model is Product else model.title
+    labels = dict(db.session.query(model.id, label).filter(model.id.in_(list(totals))))
+    ranked = sorted((item_id for item_id in totals if item_id in labels),
+                    key=lambda item_id: totals[item_id].get('view', 0), reverse=True)
+    return [(item_id, labels[item_id], totals[item_id]) for item_id in ranked[:limit]]
+
+@queue.periodic('prune_item_views', interval=24 * 3600)
+def prune_item_views():
+    cutoff = datetime.utcnow() - timedelta(days=app.config['ANALYTICS_RETENTION_DAYS'])
+    db.session.execute(db.delete(ItemViewHourly).where(ItemViewHourly.hour < cutoff))
+    db.session.commit()
+
+# Typeahead index over public titles, kept in memory in each process. This
+# process's commits update it in place; other processes' writes are picked up
+# by a rebuild every SUGGEST_REBUILD_INTERVAL, made off the request path.
+app.config['SUGGEST_REBUILD_INTERVAL'] = 60
+suggest_index = PrefixIndex()
+suggest_rebuild = threading.Lock()
+
+def build_suggest_index():
+    items = [('job', i, title) for i, title in
+             db.session.query(Job.id, Job.title).filter(Job.is_active == True)]
+    items += [('product', i, name) for i, name in db.session.query(Product.id, Product.name)]
+    items += [('blog', i, title) for i, title in db.session.query(BlogPost.id, BlogPost.title)]
+    items += [('news', i, title) for i, title in db.session.query(NewsArticle.id, NewsArticle.title)]
+    suggest_index.replace(items)
+
+def ensure_suggest_index():
+    """Build the index on first use; once it is stale, start a rebuild on a
+    background thread and keep answering from the current one."""
+    if suggest_index.built_at is None:
+        with suggest_rebuild:
+            if suggest_index.built_at is None:
+                build_suggest_index()
+    elif time.monotonic() - suggest_index.built_at > app.config['SUGGEST_REBUILD_INTERVAL']:
+        if suggest_rebuild.acquire(blocking=False):
+            threading.Thread(target=_rebuild_suggest_index, name='suggest-rebuild', daemon=True).start()
+
+def _rebuild_suggest_index():
+    try:
+        with app.app_context():
+            build_suggest_index()
+    except Exception:
+        app.logger.exception('Rebuilding the suggest index failed.')
+    finally:
+        suggest_rebuild.release()
+
+@on_commit(Job, Product, BlogPost, NewsArticle)
+def refresh_suggest_index(changes):
+    if suggest_index.built_at is None:
+        return
+    kinds = {Job: 'job', Product: 'product', BlogPost: 'blog', NewsArticle: 'news'}
+    for change in changes:
+        kind = kinds[change.model]
+        label = change.values.get('name' if change.model is Product else 'title')
+        if change.deleted or (change.model is Job and change.values.get('is_active') is False):
+            suggest_index.remove(kind, change.id)
+        elif label is not None:
+            suggest_index.add(kind, change.id, label)
+
+@event.listens_for(Product, 'before_update')
+@event.listens_for(Job, 'before_update')
+@event.listens_for(BlogPost, 'before_update')
+@event.listens_for(NewsArticle, 'before_update')
+@event.listens_for(Event, 'before_update')
+def touch_updated_at(mapper, connection, target):
+    # ORM updates only; the applicant counters are Core updates and leave it alone.
+    target.updated_at = datetime.utcnow()
+
+# Atom feeds and the sitemap are generated documents, rebuilt only when a
+# commit touches the models behind them (or after FEED_MAX_AGE, for writes
+# made by other processes) and served with validators for cheap 304s.
+app.config['FEED_MAX_AGE'] = 300
+app.config['FEED_ENTRIES'] = 50
+# The public address of the site. Cached documents are shared by every
+# request, so their links are built from this, not from the Host header of
+# whichever request happened to build them.
+app.config['SITE_URL'] = os.environ.get('SITE_URL', 'http://localhost')
+documents = DocumentCache(max_age=app.config['FEED_MAX_AGE'])
+
+def site_url(endpoint, **values):
+    parts = urlsplit(app.config['SITE_URL'])
+    adapter = app.url_map.bind(parts.netloc, script_name=parts.path or '/', url_scheme=parts.scheme)
+    return adapter.build(endpoint, values, force_external=True)
+
+def _content_feed(model, title, endpoint, feed_endpoint):
+    items = model.query.options(load_only(model.id, model.title, model.author, model.excerpt, model.updated_at)) \
+        .order_by(model.updated_at.desc(), model.id.desc()).limit(app.config['FEED_ENTRIES'])
+    entries = []
+    for item in items:
+        url = site_url(endpoint, id=item.id)
+        entries.append(Entry(url, item.title, url, item.updated_at, item.excerpt, item.author))
+    feed_url = site_url(feed_endpoint)
+    return atom_feed(feed_url, title, site_url('bloog'), feed_url, entries)
+
+def _jobs_feed():
+    jobs = db.session.query(Job.id, Job.title, Job.description, Job.updated_at) \
+        .filter(Job.is_active == True).order_by(Job.updated_at.desc(), Job.id.desc()) \
+        .limit(app.config['FEED_ENTRIES'])
+    entries = []
+    for job_id, title, description, updated_at in jobs:
+        url = site_url('apply', job_id=job_id)
+        entries.append(Entry(url, title, url, updated_at, description))
+    feed_url = site_url('jobs_feed')
+    return atom_feed(feed_url, 'Open positions', site_url('vacancy'), feed_url, entries)
+
+def _sitemap_pages():
+    return sitemap_urls((site_url(endpoint), None)
+                        for endpoint in ('home', 'about', 'p_page', 'vacancy', 'bloog'))
+
+def _sitemap_products():
+    rows = db.session.query(Product.id, Product.updated_at).order_by(Product.id)
+    return sitemap_urls((site_url('product_detail', product_id=i), updated_at)
+                        for i, updated_at in rows)
+
+def _sitemap_jobs():
+    rows = db.session.query(Job.id, Job.updated_at).filter(Job.is_active == True).order_by(Job.id)
+    return sitemap_urls((site_url('apply', job_id=i), updated_at) for i, updated_at in rows)
+
+def _sitemap_content():
+    urls = [(site_url('blog_post', id=i), updated_at)
+            for i, updated_at in db.session.query(BlogPost.id, BlogPost.updated_at).order_by(BlogPost.id)]
+    urls += [(site_url('news_article', id=i), updated_at)
+             for i, updated_at in db.session.query(NewsArticle.id, NewsArticle.updated_at).order_by(NewsArticle.id)]
+    return sitemap_urls(urls)
+
+SITEMAP_SECTIONS = ('sitemap-pages', 'sitemap-products', 'sitemap-jobs', 'sitemap-content')
+
+def _sitemap():
+    sections = [documents.get(name) for name in SITEMAP_SECTIONS]
+    return sitemap([(section.body.decode('utf-8'), section.last_modified) for section in sections])
+
+documents.register('feed-blog', lambda: _content_feed(BlogPost, 'Blog', 'blog_post', 'blog_feed'))
+documents.register('feed-news', lambda: _content_feed(NewsArticle, 'News', 'news_article', 'news_feed'))
+documents.register('feed-jobs', _jobs_feed)
+documents.register('sitemap-pages', _sitemap_pages)
+documents.register('sitemap-products', _sitemap_products)
+documents.register('sitemap-jobs', _sitemap_jobs)
+documents.register('sitemap-content', _sitemap_content)
+documents.register('sitemap', _sitemap, parts=SITEMAP_SECTIONS)
+
+# Events calendar: date range queries use the index on events.date
+app.config['CALENDAR_PAST_DAYS'] = 90
+app.config['EVENTS_PER_PAGE'] = 100
+
+def events_between(start=None, end=None, limit=None):
+    query = Event.query
+    if start is not None:
+        query = query.filter(Event.date >= start)
+    if end is not None:
+        query = query.filter(Event.date <= end)
+    query = query.order_by(Event.date, Event.id)
+    return query.limit(limit).all() if limit else query.all()
+
+def _events_calendar():
+    start = datetime.utcnow().date() - timedelta(days=app.config['CALENDAR_PAST_DAYS'])
+    host = urlsplit(app.config['SITE_URL']).hostname
+    events = [CalendarEvent(f'event-{e.id}@{host}', e.title, e.date, e.location, e.description,
+                            site_url('bloog'), e.updated_at)
+              for e in events_between(start)]
+    return ical_calendar('AMCO events', events)
+
+documents.register('calendar', _events_calendar)
+
+@on_commit(Job, Product, BlogPost, NewsArticle, Event)
+def invalidate_documents(changes):
+    affected = {
+        Event: ('calendar',),
+        Product: ('sitemap-products',),
+        Job: ('feed-jobs', 'sitemap-jobs'),
+        BlogPost: ('feed-blog', 'sitemap-content'),
+        NewsArticle: ('feed-news', 'sitemap-content'),
+    }
+    documents.invalidate(*{name for change in changes for name in affected[change.model]})
+
+def serve_document(name, mimetype):
+    document = documents.get(name)
+    response = Response(document.body, mimetype=mimetype)
+    response.set_etag(document.etag)
+    response.last_modified = document.last_modified
+    response.headers['Cache-Control'] = 'public, max-age=60'
+    return response.make_conditional(request)
+
+# Names handed out by presign_upload come back signed, so a form can only
+# attach an object the same browser was allowed to upload.
+upload_tickets = URLSafeTimedSerializer(app.secret_key, salt='direct-upload')
+
+def unique_upload_name(filename):
+    # Uploads never share a stored file, so deleting one cannot break another row.
+    return f"{uuid4().hex[:12]}-{filename}"
+
+UPLOAD_NAME_PREFIX = re.compile(r'^[0-9a-f]{12}-')
+
+def save_upload(file_field, name_field, allowed=None):
+    """Store the file posted in ``file_field`` and return its stored name.
+
+    A browser that uploaded straight to storage with a presigned form sends
+    the ticket it was given for ``file_field`` in ``name_field`` instead.
+    Returns None if neither is present, the ticket is not valid, or the file
+    is not an allowed type.
+    """
+    ticket = request.form.get(name_field, '')
+    if ticket:
+        try:
+            kind, name = upload_tickets.loads(ticket, max_age=app.config['UPLOAD_TICKET_MAX_AGE'])
+        except (BadSignature, ValueError):
+            return None
+        # A ticket attaches its upload to one row only
+        if kind != file_field or not storage.exists(name) or is_upload_referenced(name):
+            return None
+        return name if allowed is None or allowed(name) else None
+    upload = request.files.get(file_field)
+    if upload is None or upload.filename == '':
+        return None
+    name = secure_filename(upload.filename)
+    if not name or (allowed is not None and not allowed(name)):
+        return None
+    return storage.save(unique_upload_name(name), upload.stream)
+
+@app.route('/api/uploads/presign', methods=['POST'])
+@limiter.limit('presign', per_client=(10, 600))
+def presign_upload():
+    data = request.get_json(silent=True) or {}
+    kind = data.get('kind')
+    filename = secure_filename(data.get('filename') or '')
+    if kind not in ('cv', 'image') or not filename:
+        return jsonify({'error': 'A kind (cv or image) and filename are required.'}), 400
+    if kind == 'image' and not session.get('admin_logged_in'):
+        return jsonify({'error': 'Not allowed.'}), 403
+    if kind == 'image' and not allowed_file(filename):
+        return jsonify({'error': 'Invalid file type.'}), 400
+    name = unique_upload_name(filename)
+    form = storage.presign_upload(name, app.config['MAX_DIRECT_UPLOAD_SIZE'],
+                                  app.config['UPLOAD_URL_EXPIRES'])
+    if form is None:
+        return jsonify({'error': 'Direct uploads are not available.'}), 404
+    return jsonify({'name': name, 'ticket': upload_tickets.dumps([kind, name]),
+                    'url': form['url'], 'fields': form['fields']})
+
+@queue.task('extract_cv_text')
+def extract_cv_text(applied_job_id):
+    applied_job = AppliedJob.query.get(applied_job_id)
+    if applied_job is None or not applied_job.cv_path:
+        return
+    with storage.local_path(uploadgc.reference_name(applied_job.cv_path)) as path:
+        applied_job.cv_text = cvindex.extract_text(path)
+    applied_job.cv_extracted_at = datetime.utcnow()
+    db.session.commit()
+
+# Uploads no longer referenced by any row are moved to quarantine after a
+# grace period, then deleted once the retention period has passed.
+app.config['UPLOAD_GC_GRACE'] = 24 * 3600
+app.config['UPLOAD_GC_INTERVAL'] = 24 * 3600
+app.config['UPLOAD_QUARANTINE_DAYS'] = 30
+
+def upload_references():
+    return uploadgc.build_references(
+        db.session.scalars(db.select(Product.image)),
+        db.session.scalars(db.select(TeamMember.photo_url)),
+        db.session.scalars(db.select(AppliedJob.cv_path)),
+    )
+
+def is_upload_referenced(filename):
+    product = db.select(Product.id).where(Product.image == filename)
+    member = db.select(TeamMember.id).where(TeamMember.photo_url.endswith('/' + filename))
+    applicant = db.select(AppliedJob.id).where(AppliedJob.cv_path == f"uploads/{filename}")
+    return db.session.execute(product.union_all(member, applicant).limit(1)).first() is not None
+
+def release_upload(value):
+    """Schedule a check of an upload that a row stopped referencing. The caller commits."""
+    filename = uploadgc.reference_name(value)
+    if filename:
+        queue.enqueue('collect_upload', {'filename': filename}, delay=app.config['UPLOAD_GC_GRACE'])
+
+@queue.task('collect_upload')
+def collect_upload(filename):
+    modified = storage.modified(filename)
+    if modified is None or is_upload_referenced(filename):
+        return
+    # Re-uploaded under the same name since it was released
+    if time.time() - modified < app.config['UPLOAD_GC_GRACE']:
+        return
+    storage.quarantine(filename)
+
+def sweep_uploads(dry_run=False, grace=None):
+    """Quarantine every unreferenced upload older than the grace period."""
+    references = upload_references()
+    grace = app.config['UPLOAD_GC_GRACE'] if grace is None else grace
+    orphans = []
+    for name, size in uploadgc.scan_orphans(storage.list(), references, grace):
+        # Re-check against the database: the file may have been attached since the scan began.
+        if not dry_run and not is_upload_referenced(name):
+            storage.quarantine(name)
+        orphans.append((name, size))
+    return orphans
+
+@queue.periodic('sweep_uploads', interval=app.config['UPLOAD_GC_INTERVAL'])
+def sweep_uploads_task():
+    orphans = sweep_uploads()
+    storage.purge_quarantine(app.config['UPLOAD_QUARANTINE_DAYS'])
+    if orphans:
+        app.logger.info('Quarantined %d orphaned upload(s)', len(orphans))
+
+# Postings closed for ARCHIVE_AFTER_DAYS have their applications and CVs packed
+# into one zip per job in cold storage and deleted from the hot tables, leaving
+# a JobArchive stub. applied_jobs() reads an archived posting from its zip, and
+# it can be restored on demand.
+app.config['ARCHIVE_FOLDER'] = os.path.join(app.instance_path, 'archive')
+app.config['ARCHIVE_AFTER_DAYS'] = 180
+app.config['ARCHIVE_BATCH_SIZE'] = 500
+archive_storage = create_storage(app.config, archive=True)
+
+ARCHIVED_COLUMNS = ('id', 'job_id', 'first_name', 'father_name', 'applicant_email', 'gender', 'age',
+                    'cv_path', 'cv_text', 'cv_extracted_at', 'applied_at')
+
+def archivable_jobs(days=None):
+    days = app.config['ARCHIVE_AFTER_DAYS'] if days is None else days
+    has_applicants = db.select(AppliedJob.id).where(AppliedJob.job_id == Job.id).exists()
+    return Job.query.filter(Job.deadline < datetime.now() - timedelta(days=days), has_applicants).all()
+
+def open_upload(name):
+    if not storage.exists(name):
+        raise FileNotFoundError(name)
+    return storage.open(name)
+
+@lru_cache(maxsize=8)
+def read_job_archive(name):
+    """(job, applicants) from an archive; archive names are never reused."""
+    with archive_storage.local_path(name) as path:
+        return jobarchive.read(path)
+
+def pack_job_archive(job):
+    columns = [getattr(AppliedJob, column) for column in ARCHIVED_COLUMNS]
+    rows = db.session.execute(db.select(*columns).where(AppliedJob.job_id == job.id).order_by(AppliedJob.id))
+    applicants = [dict(row._mapping, cv_name=uploadgc.reference_name(row.cv_path)) for row in rows]
+    values = {column.name: getattr(job, column.name) for column in Job.__table__.columns}
+    name = f"job-{job.id}-{datetime.utcnow():%Y%m%d%H%M%S}.zip"
+    with tempfile.TemporaryFile() as packed:
+        cv_count = jobarchive.write(packed, values, applicants, open_upload)
+        jobarchive.verify(packed)
+        size = packed.seek(0, os.SEEK_END)
+        packed.seek(0)
+        archive_storage.save(name, packed)
+    archive = JobArchive(job_id=job.id, name=name, applicant_count=len(applicants), cv_count=cv_count, size=size)
+    db.session.add(archive)
+    db.session.add(ActionHistory('Job', job.id, 'Archived', f"{len(applicants)} application(s) archived to {name}"))
+    db.session.commit()
+    return archive
+
+def archive_job(job):
+    """Move a posting's applications and CVs to cold storage; returns its stub.
+
+    Rows are deleted only once the archive holding them is stored, a batch
+    at a time, so running it again after a failure finishes the job.
+    """
+    archive = JobArchive.query.filter_by(job_id=job.id).first() or pack_job_archive(job)
+    _, applicants = read_job_archive(archive.name)
+    for batch in catalog_io.chunked([a['id'] for a in applicants], app.config['ARCHIVE_BATCH_SIZE']):
+        cv_paths = db.session.scalars(db.select(AppliedJob.cv_path).where(
+            AppliedJob.id.in_(batch), AppliedJob.cv_path.isnot(None))).all()
+        # A Core delete: the applicant counters keep counting archived applications.
+        db.session.execute(db.delete(AppliedJob).where(AppliedJob.id.in_(batch)))
+        db.session.commit()
+        for cv_path in cv_paths:
+            name = uploadgc.reference_name(cv_path)
+            # Uploads stored before names were made unique may be shared with a live application
+            if not is_upload_referenced(name):
+                storage.delete(name)
+    return archive
+
+def archived_row(applicant, keep_id=True):
+    row = {column: applicant[column] for column in ARCHIVED_COLUMNS if column != 'id' or keep_id}
+    for column in ('cv_extracted_at', 'applied_at'):
+        if row[column]:
+            row[column] = datetime.fromisoformat(row[column])
+    return row
+
+@queue.task('restore_job_archive')
+def restore_job_archive(job_id):
+    archive = JobArchive.query.filter_by(job_id=job_id).first()
+    if archive is None:
+        return
+    _, applicants = read_job_archive(archive.name)
+    # Rows an earlier, interrupted run restored, whichever id they were given
+    restored = set(db.session.execute(db.select(AppliedJob.applicant_email, AppliedJob.applied_at)
+                                      .where(AppliedJob.job_id == job_id)).all())
+    # Ids freed by the archive may have been reused since
+    taken = set()
+    for batch in catalog_io.chunked([a['id'] for a in applicants], app.config['ARCHIVE_BATCH_SIZE']):
+        taken.update(db.session.scalars(db.select(AppliedJob.id).where(AppliedJob.id.in_(batch))))
+    # Rows keeping their id go first, so a new id is never one still to be restored
+    applicants = sorted(applicants, key=lambda applicant: applicant['id'] in taken)
+    with archive_storage.local_path(archive.name) as path, zipfile.ZipFile(path) as bundle:
+        for batch in catalog_io.chunked(applicants, app.config['ARCHIVE_BATCH_SIZE']):
+            rows = []
+            for applicant in batch:
+                row = archived_row(applicant, keep_id=applicant['id'] not in taken)
+                if (row['applicant_email'], row['applied_at']) in restored:
+                    continue
+                if applicant['cv_member']:
+                    # A fresh name: the old one may have been taken by another upload since
+                    original = UPLOAD_NAME_PREFIX.sub('', os.path.basename(applicant['cv_member']))
+                    with bundle.open(applicant['cv_member']) as cv:
+                        row['cv_path'] = f"uploads/{storage.save(unique_upload_name(original), cv)}"
+                restored.add((row['applicant_email'], row['applied_at']))
+                rows.append(row)
+            for group in ([row for row in rows if 'id' in row], [row for row in rows if 'id' not in row]):
+                if group:
+                    db.session.execute(db.insert(AppliedJob), group)
+            db.session.commit()
+    name = archive.name
+    db.session.delete(archive)
+    db.session.add(ActionHistory('Job', job_id, 'Restored', f"{len(applicants)} application(s) restored from {name}"))
+    db.session.commit()
+    archive_storage.delete(name)
+
+# Per-process cache of TF-IDF match scores, keyed by job id
+job_matchers = {}
+
+def job_matcher(job):
+    job_text = ' '.join([job.title, job.description, job.requirements])
+    matcher = job_matchers.get(job.id)
+    if matcher is None or matcher.job_text != job_text:
+        matcher = job_matchers[job.id] = JobMatcher(job_text)
+
+    with matcher.lock:
+        current = dict(db.session.query(AppliedJob.id, AppliedJob.cv_extracted_at)
+                       .filter(AppliedJob.job_id == job.id))
+        for applied_job_id in [i for i in matcher.rows if i not in current]:
+            matcher.remove(applied_job_id)
+        changed = [i for i, extracted_at in current.items()
+                   if extracted_at and (i not in matcher or matcher.stamp(i) != extracted_at)]
+        for start in range(0, len(changed), 500):
+            rows = db.session.query(AppliedJob.id, AppliedJob.cv_text, AppliedJob.cv_extracted_at) \
+                .filter(AppliedJob.id.in_(changed[start:start + 500]))
+            for applied_job_id, cv_text, extracted_at in rows:
+                matcher.add(applied_job_id, cv_text or '', extracted_at)
+        matcher.scores()
+    return matcher
+
 @app.route('/')
 @app.route('/home')
 def home():
     return render_template('home.html')
 
+# Catalog listing and the job board are served from an in-process read model,
+# kept current from a trigger-maintained change log.
+app.config['PRODUCTS_PER_PAGE'] = 24
+PRICE_BUCKETS = [0, 1000, 5000, 10000, 50000]
+PRODUCT_SORTS = ('newest', 'price', 'price_desc', 'name')
+def connect_database():
+    """Raw sqlite3 connection to the app database, usable from any thread."""
+    with app.app_context():
+        path = db.engine.url.database
+    return sqlite3.connect(path, timeout=30, check_same_thread=False)
+
+read_model = ReadModel(connect_database)
+
+@queue.periodic('prune_read_model_changes', interval=3600)
+def prune_read_model_changes():
+    read_model.prune()
+
+# Related products and jobs: TF-IDF neighbours precomputed into related_item.
+# refresh_related_items follows the read model's change log and recomputes only
+# the lists an edit can alter; a daily full rebuild absorbs idf drift.
+app.config['RELATED_ITEMS_K'] = 6
+app.config['RELATED_REFRESH_INTERVAL'] = 60
+app.config['RELATED_REBUILD_INTERVAL'] = 24 * 3600
+
+def related_vectors(kind):
+    if kind == 'product':
+        rows = db.session.query(Product.id, Product.name, Product.description)
+    else:
+        rows = db.session.query(Job.id, Job.title, Job.description, Job.requirements) \
+            .filter(Job.is_active == True)
+    ids, texts = [], []
+    for item_id, *fields in rows:
+        ids.append(item_id)
+        texts.append(' '.join(field or '' for field in fields))
+    return related.Vectors(ids, texts)
+
+def refresh_related(kind, full=False):
+    """Bring one kind's related_item lists up to date; returns how many were recomputed."""
+    k = app.config['RELATED_ITEMS_K']
+    now = datetime.utcnow()
+    # Read the log position first: anything committed meanwhile is redone next run
+    seq, oldest = db.session.execute(
+        db.text('SELECT coalesce(max(seq), 0), min(seq) FROM read_model_change')).one()
+    cursor = db.session.get(RelatedItemCursor, kind)
+    if cursor is None:
+        cursor = RelatedItemCursor(kind=kind, seq=0, built_at=now)
+        db.session.add(cursor)
+        full = True
+    # Pruned past our position, or the log was recreated
+    full = (full or cursor.seq > seq or (oldest is not None and oldest > cursor.seq + 1)
+            or (now - cursor.built_at).total_seconds() > app.config['RELATED_REBUILD_INTERVAL'])
+    changed = set()
+    if not full:
+        changed = {row_id for row_id, in db.session.execute(db.text(
+            'SELECT DISTINCT row_id FROM read_model_change WHERE table_name = :kind '
+            'AND seq > :after AND seq <= :seq'), {'kind': kind, 'after': cursor.seq, 'seq': seq})}
+        if not changed:
+            cursor.seq = seq
+            db.session.commit()
+            return 0
+    vectors = related_vectors(kind)
+    if len(changed) > len(vectors) // 4:
+        full = True
+    # The stored lists, to tell which pages show different related items now
+    neighbours = {}
+    for item_id, related_id, score in db.session.query(
+            RelatedItem.item_id, RelatedItem.related_id, RelatedItem.score) \
+            .filter(RelatedItem.kind == kind).order_by(RelatedItem.item_id, RelatedItem.rank):
+        neighbours.setdefault(item_id, []).append((related_id, score))
+    if full:
+        rows = range(len(vectors))
+        db.session.execute(db.delete(RelatedItem).where(RelatedItem.kind == kind))
+        cursor.built_at = now
+    else:
+        rows = related.affected(vectors, changed, neighbours, k=k)
+        # Deleted or closed items keep no list
+        gone = [item_id for item_id in changed if item_id not in vectors.rows]
+        for chunk in catalog_io.chunked(gone, 500):
+            db.session.execute(db.delete(RelatedItem).where(
+                RelatedItem.kind == kind, RelatedItem.item_id.in_(chunk)))
+    relisted = []
+    for chunk in catalog_io.chunked(related.nearest(vectors, rows, k=k), 500):
+        if not full:
+            db.session.execute(db.delete(RelatedItem).where(
+                RelatedItem.kind == kind, RelatedItem.item_id.in_([item_id for item_id, _ in chunk])))
+        values = [{'kind': kind, 'item_id': item_id, 'rank': rank, 'related_id': related_id, 'score': score}
+                  for item_id, items in chunk for rank, (related_id, score) in enumerate(items)]
+        if values:
+            db.session.execute(db.insert(RelatedItem), values)
+        relisted += [item_id for item_id, items in chunk
+                     if [related_id for related_id, _ in items]
+                     != [related_id for related_id, _ in neighbours.get(item_id, [])]]
+    # Core writes fire no on_commit hooks, so queue the product pages that
+    # show a different list ourselves, in the same transaction.
+    if kind == 'product' and static_site is not None:
+        for chunk in catalog_io.chunked(relisted, 1000):
+            queue.enqueue('publish_pages', {'paths': [f'/prod/{item_id}' for item_id in chunk]})
+    cursor.seq = seq
+    db.session.commit()
+    return len(rows)
+
+@queue.periodic('refresh_related_items', interval=app.config['RELATED_REFRESH_INTERVAL'])
+def refresh_related_items():
+    for kind in ('product', 'job'):
+        refresh_related(kind)
+
+def related_ids(kind, item_id):
+    return [related_id for related_id, in db.session.query(RelatedItem.related_id)
+            .filter(RelatedItem.kind == kind, RelatedItem.item_id == item_id).order_by(RelatedItem.rank)]
+
+def catalog_args(args):
+    sort = args.get('sort', 'newest')
+    return {
+        'q': args.get('q', '').strip(),
+        'min_price': args.get('min_price', type=float),
+        'max_price': args.get('max_price', type=float),
+        'sort': sort if sort in PRODUCT_SORTS else 'newest',
+        'page': max(args.get('page', 1, type=int), 1),
+        'per_page': min(max(args.get('per_page', app.config['PRODUCTS_PER_PAGE'], type=int), 1), 100),
+    }
+
+def _text_filters(filters):
+    if not filters['q']:
+        return []
+    # A prefix LIKE can use the NOCASE name index; SQLite's LIKE is case-insensitive.
+    pattern = filters['q'].replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    return [Product.name.like(pattern, escape='\\')]
+
+def _price_filters(filters):
+    conditions = []
+    if filters['min_price'] is not None:
+        conditions.append(Product.price >= filters['min_price'])
+    if filters['max_price'] is not None:
+        conditions.append(Product.price <= filters['max_price'])
+    return conditions
+
+def product_page(filters):
+    read_model.refresh()
+    return read_model.product_page(
+        q=filters['q'], min_price=filters['min_price'], max_price=filters['max_price'],
+        sort=filters['sort'], offset=(filters['page'] - 1) * filters['per_page'],
+        limit=filters['per_page'])
+
+def price_facets(filters):
+    read_model.refresh()
+    bounds = PRICE_BUCKETS + [None]
+    counts = read_model.price_counts(PRICE_BUCKETS, q=filters['q'])
+    return [{'min_price': bounds[i], 'max_price': bounds[i + 1], 'count': counts[i]}
+            for i in range(len(PRICE_BUCKETS))]
+
 @app.route('/prod')
 def p_page():
-    products = Product.query.all()
-    return render_template('prod.html', products=products)
+    filters = catalog_args(request.args)
+    products, has_next = product_page(filters)
+    count_views('product', 'impression', [product.id for product in products])
+    return render_template('prod.html', products=products, has_next=has_next,
+                           filters=filters, facets=price_facets(filters), sorts=list(PRODUCT_SORTS))
+
+@app.route('/api/products')
+def api_products():
+    filters = catalog_args(request.args)
+    products, has_next = product_page(filters)
+    return jsonify({
+        'products': [product.serialize() for product in products],
+        'page': filters['page'],
+        'per_page': filters['per_page'],
+        'has_next': has_next,
+        'facets': {'price': price_facets(filters)},
+    })
+
+@app.route('/prod/<int:product_id>')
+def product_detail(product_id):
+    read_model.refresh()
+    product = read_model.products.get(product_id)
+    if product is None:
+        abort(404)
+    count_views('product', 'view', [product_id])
+    related_products = [read_model.products[i] for i in related_ids('product', product_id)
+                        if i in read_model.products]
+    return render_template('product.html', product=product, related=related_products)
+
+@app.route('/feeds/blog.atom')
+def blog_feed():
+    return serve_document('feed-blog', 'application/atom+xml')
+
+@app.route('/feeds/news.atom')
+def news_feed():
+    return serve_document('feed-news', 'application/atom+xml')
+
+@app.route('/feeds/jobs.atom')
+def jobs_feed():
+    return serve_document('feed-jobs', 'application/atom+xml')
+
+@app.route('/sitemap.xml')
+def sitemap_xml():
+    return serve_document('sitemap', 'application/xml')
+
+@app.route('/feeds/events.ics')
+def events_ics():
+    return serve_document('calendar', 'text/calendar')
+
+@app.route('/api/events')
+def api_events():
+    # Upcoming events by default; bad dates are ignored like other filters.
+    start = request.args.get('from', type=date.fromisoformat)
+    end = request.args.get('to', type=date.fromisoformat)
+    if start is None and end is None:
+        start = datetime.utcnow().date()
+    limit = min(max(request.args.get('limit', app.config['EVENTS_PER_PAGE'], type=int), 1), 500)
+    events = events_between(start, end, limit)
+    return jsonify({
+        'from': start.isoformat() if start else None,
+        'to': end.isoformat() if end else None,
+        'events': [e.serialize() for e in events],
+    })
 
 @app.route('/login/admin')
 def admin():
@@ -158,6 +1217,7 @@ def admin():
     return render_template('admin.html', products=products)
 
 @app.route('/admin/add_product', methods=['GET', 'POST'])
+@limiter.concurrency('uploads', app.config['UPLOAD_CONCURRENCY'])
 def add_product():
     if 'admin_logged_in' not in session or not session['admin_logged_in']:
         return redirect(url_for('login'))
@@ -166,26 +1226,246 @@ def add_product():
         price = request.form['price']
         description = request.form['description']
 
-        if 'image' in request.files:
-            image_file = request.files['image']
-            if image_file.filename != '':
-                filename = secure_filename(image_file.filename)
-                image_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                image_file.save(image_path)
-            else:
-                flash('No image selected.', 'error')
-                return redirect(request.url)
+        filename = save_upload('image', 'image_name')
+        if filename is None:
+            flash('No image selected.', 'error')
+            return redirect(request.url)
 
         new_product = Product(name=name, price=price, image=filename, description=description)
         db.session.add(new_product)
+        db.session.flush()
+        queue.enqueue('log_action', {
+            'entity_type': 'Product',
+            'entity_id': new_product.id,
+            'action': 'Added',
+            'details': f"Product '{name}' added successfully."
+        })
         db.session.commit()
-        
-        new_product.log_action('Added', f"Product '{name}' added successfully.")
 
         flash('Product added successfully.', 'success')
         return redirect(url_for('admin'))
     return render_template('add_product.html')
 
+def invalidate_product_caches():
+    # Bulk statements bypass the ORM, so on_commit hooks never see them. The
+    # read model needs nothing here: its change log is written by triggers.
+    suggest_index.expire()
+    documents.invalidate('sitemap-products')
+    if app.config['STATIC_EXPORT_DIR']:
+        queue.enqueue('publish_product_pages')
+        db.session.commit()
+
+def import_products(stream, fmt, image_source=None, chunk_size=1000, workers=8):
+    summary = {'imported': 0, 'skipped': 0, 'errors': []}
+    records = enumerate(catalog_io.read_records(stream, fmt), 1)
+    stored, image_errors = {}, {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for chunk in catalog_io.chunked(records, chunk_size):
+            if image_source is not None:
+                names = [(record.get('image') or '').strip() for _, record in chunk]
+                copied, failed = catalog_io.copy_images(
+                    pool, image_source, [n for n in names if n not in stored and n not in image_errors],
+                    storage)
+                stored.update(copied)
+                image_errors.update(failed)
+
+            mappings = []
+            for line, record in chunk:
+                image = (record.get('image') or '').strip()
+                try:
+                    if not (record.get('name') or '').strip():
+                        raise ValueError('name is required')
+                    price = float(record.get('price'))
+                    if image and image_source is not None:
+                        if image in image_errors:
+                            raise ValueError(f"image '{image}': {image_errors[image]}")
+                        image = stored[image]
+                except (TypeError, ValueError) as exc:
+                    summary['skipped'] += 1
+                    summary['errors'].append((line, str(exc)))
+                    continue
+                mappings.append({
+                    'name': record['name'].strip(),
+                    'price': price,
+                    'image': image,
+                    'description': record.get('description') or '',
+                })
+            if not mappings:
+                continue
+
+            first_id = (db.session.query(db.func.max(Product.id)).scalar() or 0) + 1
+            db.session.bulk_insert_mappings(Product, mappings)
+            db.session.add(ActionHistory(
+                entity_type='Product',
+                entity_id=None,
+                action='Imported',
+                details=f"Imported {len(mappings)} products (IDs {first_id}-{first_id + len(mappings) - 1})."
+            ))
+            db.session.commit()
+            summary['imported'] += len(mappings)
+    invalidate_product_caches()
+    return summary
+
+@app.route('/admin/import_products', methods=['GET', 'POST'])
+@limiter.concurrency('uploads', app.config['UPLOAD_CONCURRENCY'])
+def import_products_view():
+    if 'admin_logged_in' not in session or not session['admin_logged_in']:
+        return redirect(url_for('login'))
+    if request.method == 'POST':
+        request.max_content_length = app.config['MAX_IMPORT_SIZE']
+        data_file = request.files.get('file')
+        if not data_file or data_file.filename == '':
+            flash('No product file selected.', 'error')
+            return redirect(request.url)
+        fmt = catalog_io.detect_format(data_file.filename)
+        images = request.files.get('images')
+        with tempfile.TemporaryDirectory() as tmp:
+            image_source = None
+            if images and images.filename != '':
+                archive_path = os.path.join(tmp, 'images.zip')
+                images.save(archive_path)
+                if not zipfile.is_zipfile(archive_path):
+                    flash('Product images must be uploaded as a ZIP archive.', 'error')
+                    return redirect(request.url)
+                image_source = catalog_io.ImageSource(archive_path)
+            stream = io.TextIOWrapper(data_file.stream, encoding='utf-8-sig', newline='')
+            try:
+                summary = import_products(stream, fmt, image_source)
+            finally:
+                if image_source is not None:
+                    image_source.close()
+        flash(f"Imported {summary['imported']} products, skipped {summary['skipped']}.", 'success')
+        return render_template('import_products.html', summary=summary)
+    return render_template('import_products.html')
+
+def export_products(fmt):
+    products = (product.serialize() for product in Product.query.order_by(Product.id).yield_per(1000))
+    return catalog_io.write_records(products, fmt)
+
+@app.route('/admin/export_products')
+def export_products_view():
+    if 'admin_logged_in' not in session or not session['admin_logged_in']:
+        return redirect(url_for('login'))
+    fmt = 'jsonl' if request.args.get('format') == 'jsonl' else 'csv'
+    response = Response(stream_with_context(export_products(fmt)),
+                        mimetype='application/x-ndjson' if fmt == 'jsonl' else 'text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename=products.{fmt}'
+    return response
+
+PRICE_OPERATIONS = ('percent', 'delta', 'set')
+PATCHABLE_PRODUCT_FIELDS = ('name', 'image', 'description')
+
+def bulk_update_products(filters, operation=None, amount=None, patch=None, chunk_size=1000):
+    """Apply a price change and/or attribute patch to every product matching filters.
+
+    Works through the matching rows in id order, one UPDATE per chunk. Each
+    chunk commits with its own audit entry, so a run that fails part way
+    leaves a record of the chunks it did change.
+    """
+    if operation is not None and not math.isfinite(amount):
+        raise ValueError('The amount must be a finite number.')
+    product = Product.__table__
+    values = {key: value for key, value in (patch or {}).items() if key in PATCHABLE_PRODUCT_FIELDS}
+    if operation == 'percent':
+        values['price'] = db.func.max(db.func.round(product.c.price * (1 + amount / 100.0), 2), 0)
+    elif operation == 'delta':
+        values['price'] = db.func.max(db.func.round(product.c.price + amount, 2), 0)
+    elif operation == 'set':
+        values['price'] = max(round(amount, 2), 0)
+    if not values:
+        return 0
+    values['updated_at'] = datetime.utcnow()
+
+    conditions = _text_filters(filters) + _price_filters(filters)
+    if filters.get('ids'):
+        conditions.append(Product.id.in_(filters['ids']))
+    change = [f"price {operation} {amount:g}"] if operation else []
+    change += [f"{key} patched" for key in values if key not in ('price', 'updated_at')]
+    updated, last_id = 0, 0
+    try:
+        while True:
+            chunk_ids = [row[0] for row in db.session.query(Product.id)
+                         .filter(Product.id > last_id, *conditions)
+                         .order_by(Product.id).limit(chunk_size)]
+            if not chunk_ids:
+                break
+            result = db.session.execute(
+                product.update().where(product.c.id.in_(chunk_ids)).values(**values)
+            )
+            db.session.add(ActionHistory(
+                entity_type='Product',
+                entity_id=None,
+                action='Bulk Edited',
+                details=f"Bulk edited {result.rowcount} products (IDs {chunk_ids[0]}-{chunk_ids[-1]}): "
+                        f"{', '.join(change)}."
+            ))
+            db.session.commit()
+            updated += result.rowcount
+            last_id = chunk_ids[-1]
+    except BaseException:
+        db.session.rollback()
+        raise
+    finally:
+        # Committed chunks are live whether or not the rest went through.
+        if updated:
+            invalidate_product_caches()
+    return updated
+
+def bulk_set_prices(prices, chunk_size=1000):
+    """Set individual prices from (id, price) pairs with one executemany per chunk."""
+    product = Product.__table__
+    stmt = product.update().where(product.c.id == db.bindparam('product_id')) \
+        .values(price=db.bindparam('new_price'), updated_at=db.bindparam('updated_at'))
+    updated = 0
+    try:
+        for chunk in catalog_io.chunked(prices, chunk_size):
+            now = datetime.utcnow()
+            rows = [{'product_id': int(i), 'new_price': float(p), 'updated_at': now} for i, p in chunk]
+            for row in rows:
+                if not math.isfinite(row['new_price']):
+                    raise ValueError(f"Product {row['product_id']}: the price must be a finite number.")
+            result = db.session.execute(stmt, rows)
+            db.session.add(ActionHistory(
+                entity_type='Product',
+                entity_id=None,
+                action='Bulk Edited',
+                details=f"Bulk repriced {result.rowcount} products from a price list "
+                        f"(IDs {rows[0]['product_id']}-{rows[-1]['product_id']})."
+            ))
+            db.session.commit()
+            updated += result.rowcount
+    except BaseException:
+        db.session.rollback()
+        raise
+    finally:
+        # Committed chunks are live whether or not the rest went through.
+        if updated:
+            invalidate_product_caches()
+    return updated
+
+@app.route('/admin/bulk_edit_products', methods=['GET', 'POST'])
+def bulk_edit_products():
+    if 'admin_logged_in' not in session or not session['admin_logged_in']:
+        return redirect(url_for('login'))
+    filters = catalog_args(request.values)
+    ids = request.values.get('ids', '')
+    filters['ids'] = [int(i) for i in ids.replace(',', ' ').split() if i.isdigit()]
+    matching = Product.query.filter(*_text_filters(filters), *_price_filters(filters))
+    if filters['ids']:
+        matching = matching.filter(Product.id.in_(filters['ids']))
+    if request.method == 'POST':
+        operation = request.form.get('operation') or None
+        amount = request.form.get('amount', type=float)
+        if operation is not None and (operation not in PRICE_OPERATIONS or amount is None
+                                      or not math.isfinite(amount)):
+            flash('Choose a price operation and amount.', 'error')
+            return redirect(request.url)
+        patch = {key: request.form[key] for key in PATCHABLE_PRODUCT_FIELDS if request.form.get(key)}
+        updated = bulk_update_products(filters, operation, amount, patch)
+        flash(f'{updated} products updated.', 'success')
+        return redirect(url_for('admin'))
+    return render_template('bulk_edit_products.html', filters=filters, ids=ids, count=matching.count())
+
 @app.route('/admin/edit_product/<int:product_id>', methods=['GET', 'POST'])
 def edit_product(product_id):
     if 'admin_logged_in' not in session or not session['admin_logged_in']:
@@ -196,13 +1476,11 @@ def edit_product(product_id):
         product.price = request.form['price']
         product.description = request.form['description']
         
-        if 'image' in request.files:
-            image_file = request.files['image']
-            if image_file.filename != '':
-                filename = secure_filename(image_file.filename)
-                image_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                image_file.save(image_path)
-                product.image = filename
+        filename = save_upload('image', 'image_name')
+        if filename is not None:
+            if product.image != filename:
+                release_upload(product.image)
+            product.image = filename
 
         db.session.commit()
         # Assuming you have a product instance named 'product'
@@ -219,6 +1497,7 @@ def delete_product(product_id):
         return redirect(url_for('login'))
     product = Product.query.get_or_404(product_id)
     db.session.delete(product)
+    release_upload(product.image)
     db.session.commit()
 
     # Assuming you have a product instance named 'product'
@@ -229,6 +1508,7 @@ def delete_product(product_id):
     return redirect(url_for('admin'))
 
 @app.route('/login', methods=['GET', 'POST'])
+@limiter.limit('login', per_client=(5, 60, 10), methods=('POST',))
 def login():
     if request.method == 'POST':
         username = request.form['username']
@@ -247,6 +1527,9 @@ def logout():
 
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
+    url = storage.download_url(filename, expires=app.config['UPLOAD_URL_EXPIRES'])
+    if url:
+        return redirect(url)
     return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
 
 
@@ -281,10 +1564,45 @@ def delete_job(job_id):
 
 @app.route('/vacancy')
 def vacancy():
-    jobs = Job.query.filter_by(is_active=True).all()
+    read_model.refresh()
+    jobs = read_model.active_jobs()
+    count_views('job', 'impression', [job.id for job in jobs])
     return render_template('vacancy.html', jobs=jobs)
 
+def item_url(kind, item_id):
+    if kind == 'job':
+        return url_for('apply', job_id=item_id)
+    if kind == 'product':
+        return url_for('product_detail', product_id=item_id)
+    return url_for('blog_post' if kind == 'blog' else 'news_article', id=item_id)
+
+@app.route('/api/suggest')
+def api_suggest():
+    ensure_suggest_index()
+    q = request.args.get('q', '')
+    limit = min(request.args.get('limit', 10, type=int), 25)
+    suggestions = [{'type': kind, 'id': i, 'label': label, 'url': item_url(kind, i)}
+                   for kind, i, label in suggest_index.lookup(q, limit=limit)]
+    response = jsonify({'query': q, 'suggestions': suggestions})
+    response.headers['Cache-Control'] = 'public, max-age=60'
+    return response
+
+@app.route('/api/popular')
+def api_popular():
+    kind = request.args.get('kind', 'product')
+    if kind not in ANALYTICS_KINDS:
+        abort(404)
+    days = min(max(request.args.get('days', 7, type=int), 1), app.config['ANALYTICS_RETENTION_DAYS'])
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    items = [{'id': item_id, 'label': label, 'url': item_url(kind, item_id), 'views': metrics.get('view', 0)}
+             for item_id, label, metrics in most_viewed(kind, days=days, limit=limit)]
+    response = jsonify({'kind': kind, 'days': days, 'items': items})
+    # Counts only move once per flush; no need to recompute on every request
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    return response
+
 @app.route('/search', methods=['GET', 'POST'])
+@limiter.limit('search', per_client=(30, 60), per_route=(20, 1, 40), methods=('POST',))
 def search():
     if request.method == 'POST':
         search_term = request.form['search_term']
@@ -293,6 +1611,7 @@ def search():
     return redirect(url_for('home'))
 
 @app.route('/lagin', methods=['GET', 'POST'])
+@limiter.limit('login', per_client=(5, 60, 10), methods=('POST',))
 def lagin():
     if request.method == 'POST':
         username = request.form['username']
@@ -311,13 +1630,21 @@ def lagout():
     session.pop('admin_logged_in', None)
     return redirect(url_for('lagin'))
 
+def related_jobs(job_id):
+    return db.session.query(Job.id, Job.title) \
+        .join(RelatedItem, db.and_(RelatedItem.kind == 'job', RelatedItem.related_id == Job.id)) \
+        .filter(RelatedItem.item_id == job_id, Job.is_active == True).order_by(RelatedItem.rank).all()
+
 @app.route('/apply/<int:job_id>', methods=['GET', 'POST'])
+@limiter.limit('apply', per_client=(5, 600), methods=('POST',))
+@limiter.concurrency('uploads', app.config['UPLOAD_CONCURRENCY'])
 def apply(job_id):
     job = Job.query.get(job_id)
     current_time = datetime.now()  # Get the current time
 
     if job.deadline and job.deadline < current_time:
-        return render_template('apply.html', job=job, error='Application deadline has passed.', current_time=current_time)
+        return render_template('apply.html', job=job, error='Application deadline has passed.', current_time=current_time,
+                               related_jobs=related_jobs(job_id))
 
     if request.method == 'POST':
         first_name = request.form['first_name']
@@ -325,8 +1652,9 @@ def apply(job_id):
         email = request.form['email']
         gender = request.form['gender']
         age = request.form['age']
-        cv = request.files['cv']
-        cv.save(os.path.join(app.config['UPLOAD_FOLDER'], cv.filename))
+        cv_name = save_upload('cv', 'cv_name')
+        if cv_name is None:
+            return render_template('apply.html', job=job, error='Please attach your CV.', current_time=current_time)
 
         applied_job = AppliedJob(
             job_id=job_id,
@@ -335,29 +1663,123 @@ def apply(job_id):
             applicant_email=email,
             gender=gender,
             age=age,
-            cv_path=f"uploads/{cv.filename}"
+            cv_path=f"uploads/{cv_name}"
         )
         db.session.add(applied_job)
+        db.session.flush()
+        queue.enqueue('send_application_email', {'applied_job_id': applied_job.id})
+        queue.enqueue('extract_cv_text', {'applied_job_id': applied_job.id})
         db.session.commit()
+        count_views('job', 'apply', [job_id])
 
         return redirect(url_for('vacancy'))
 
-    return render_template('apply.html', job=job, current_time=current_time)
+    count_views('job', 'view', [job_id])
+    return render_template('apply.html', job=job, current_time=current_time, related_jobs=related_jobs(job_id))
 
 @app.route('/lagin/vadmin')
 def vadmin():
     jobs = Job.query.all()
     return render_template('vadmin.html', jobs=jobs)
 
+@app.route('/vadmin/stats')
+def applicant_stats():
+    if 'admin_logged_in' not in session or not session['admin_logged_in']:
+        return Response('Login required.', status=403, mimetype='text/plain')
+    jobs = Job.query.order_by(Job.id).all()
+    job_ids = {job.id for job in jobs}
+    breakdown = {}
+    totals = {'gender': {}, 'age': {}}
+    for row in JobApplicantBreakdown.query.filter(JobApplicantBreakdown.count > 0):
+        if row.job_id not in job_ids:
+            continue
+        breakdown.setdefault(row.job_id, {}).setdefault(row.dimension, {})[row.bucket] = row.count
+        totals[row.dimension][row.bucket] = totals[row.dimension].get(row.bucket, 0) + row.count
+    return render_template('stats.html', jobs=jobs, breakdown=breakdown, totals=totals,
+                           age_buckets=[label for _, label in AGE_BUCKETS] + ['55+', 'Unknown'])
+
+@app.route('/vadmin/analytics')
+def analytics_report():
+    if 'admin_logged_in' not in session or not session['admin_logged_in']:
+        return redirect(url_for('lagin'))
+    days = min(max(request.args.get('days', 7, type=int), 1), app.config['ANALYTICS_RETENTION_DAYS'])
+    sections = [(kind, most_viewed(kind, days=days, limit=25)) for kind in ANALYTICS_KINDS]
+    return render_template('analytics.html', sections=sections, days=days, item_url=item_url)
+
 @app.route('/vadmin/applied_jobs/<int:job_id>')
 def applied_jobs(job_id):
-    applied_jobs = AppliedJob.query.filter_by(job_id=job_id).all()
-    return render_template('applied_jobs.html', applied_jobs=applied_jobs, job_id=job_id)
+    q = request.args.get('q', '').strip()
+    sort = request.args.get('sort', '')
+    snippets = {}
+    if q:
+        matches = cvindex.search(db.session, job_id, q)
+        by_id = {a.id: a for a in AppliedJob.query.filter(AppliedJob.id.in_([m[0] for m in matches]))}
+        applied_jobs = [by_id[applied_job_id] for applied_job_id, _, _ in matches if applied_job_id in by_id]
+        snippets = {applied_job_id: cvindex.highlight(snippet) for applied_job_id, _, snippet in matches}
+    else:
+        applied_jobs = AppliedJob.query.filter_by(job_id=job_id).all()
+
+    # Archived applications are listed from the archive, after any still in the table
+    archive = JobArchive.query.filter_by(job_id=job_id).first()
+    if archive is not None:
+        _, archived = read_job_archive(archive.name)
+        archived = [SimpleNamespace(**applicant) for applicant in archived]
+        if q:
+            terms = q.lower().split()
+            archived = [a for a in archived if any(t in (a.cv_text or '').lower() for t in terms)]
+        applied_jobs = applied_jobs + archived
+
+    match_scores = {}
+    job = Job.query.get(job_id)
+    if job is not None:
+        doc_ids, scores = job_matcher(job).scores()
+        match_scores = dict(zip(doc_ids.tolist(), scores.tolist()))
+    if sort == 'match':
+        applied_jobs.sort(key=lambda a: match_scores.get(a.id, -1.0), reverse=True)
+
+    return render_template('applied_jobs.html', applied_jobs=applied_jobs, job_id=job_id, q=q,
+                           snippets=snippets, sort=sort, match_scores=match_scores, archive=archive)
+
+@app.route('/vadmin/archive/<int:job_id>/restore', methods=['POST'])
+def restore_job(job_id):
+    if 'admin_logged_in' not in session or not session['admin_logged_in']:
+        return redirect(url_for('lagin'))
+    JobArchive.query.filter_by(job_id=job_id).first_or_404()
+    queue.enqueue('restore_job_archive', {'job_id': job_id})
+    db.session.commit()
+    flash('The applications are being restored from the archive.')
+    return redirect(url_for('applied_jobs', job_id=job_id))
+
+@app.route('/vadmin/archive/<int:job_id>/cv/<int:applied_job_id>')
+def archived_cv(job_id, applied_job_id):
+    if 'admin_logged_in' not in session or not session['admin_logged_in']:
+        return redirect(url_for('lagin'))
+    archive = JobArchive.query.filter_by(job_id=job_id).first_or_404()
+    _, applicants = read_job_archive(archive.name)
+    member = next((a['cv_member'] for a in applicants if a['id'] == applied_job_id), None)
+    if not member:
+        abort(404)
+    filename = os.path.basename(member)
+
+    def generate():
+        # Streamed out of the zip; remote archives are downloaded to a temporary file first.
+        with archive_storage.local_path(archive.name) as path, zipfile.ZipFile(path) as bundle, \
+                bundle.open(member) as cv:
+            while True:
+                chunk = cv.read(64 * 1024)
+                if not chunk:
+                    break
+                yield chunk
+
+    response = Response(generate(), mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
 @app.route('/vadmin/delete_applied_job/<int:applied_job_id>', methods=['POST'])
 def delete_applied_job(applied_job_id):
     applied_job = AppliedJob.query.get(applied_job_id)
     db.session.delete(applied_job)
+    release_upload(applied_job.cv_path)
     db.session.commit()
 
     applied_job.log_action('Deleted', f"Applied job with ID '{applied_job_id}' deleted successfully.")
@@ -366,9 +1788,11 @@ def delete_applied_job(applied_job_id):
 
 @app.route('/download_cv/<path:cv_path>')
 def download_cv(cv_path):
-    cv_directory = app.config['UPLOAD_FOLDER']
     filename = os.path.basename(cv_path)
-    return send_from_directory(cv_directory, filename, as_attachment=True)
+    url = storage.download_url(filename, filename=filename, expires=app.config['UPLOAD_URL_EXPIRES'])
+    if url:
+        return redirect(url)
+    return send_from_directory(app.config['UPLOAD_FOLDER'], filename, as_attachment=True)
 
 class Admin(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -379,15 +1803,35 @@ class Admin(db.Model):
 @app.route('/bloog')
 def bloog():
     # Retrieve data from the database
-    blog_posts = BlogPost.query.all()
-    events = Event.query.all()
-    news_articles = NewsArticle.query.all()
+    # Listings only need the stored excerpts, not the full bodies
+    blog_posts = BlogPost.query.options(
+        load_only(BlogPost.id, BlogPost.title, BlogPost.author, BlogPost.excerpt)).all()
+    events = events_between(datetime.utcnow().date())
+    news_articles = NewsArticle.query.options(
+        load_only(NewsArticle.id, NewsArticle.title, NewsArticle.author, NewsArticle.excerpt)).all()
+    count_views('blog', 'impression', [post.id for post in blog_posts])
+    count_views('news', 'impression', [article.id for article in news_articles])
     # Pass data to the HTML template
     return render_template('c.html', blog_posts=blog_posts, events=events, news_articles=news_articles)
 
+@app.route('/bloog/post/<int:id>')
+def blog_post(id):
+    post = BlogPost.query.options(
+        load_only(BlogPost.id, BlogPost.title, BlogPost.author, BlogPost.content_html)).get_or_404(id)
+    count_views('blog', 'view', [id])
+    return render_template('article.html', item=post, back=url_for('bloog') + f'#blog-{id}')
+
+@app.route('/bloog/news/<int:id>')
+def news_article(id):
+    article = NewsArticle.query.options(
+        load_only(NewsArticle.id, NewsArticle.title, NewsArticle.author, NewsArticle.content_html)).get_or_404(id)
+    count_views('news', 'view', [id])
+    return render_template('article.html', item=article, back=url_for('bloog') + f'#news-{id}')
+
 
 
 @app.route('/bagin', methods=['GET', 'POST'])
+@limiter.limit('login', per_client=(5, 60, 10), methods=('POST',))
 def bagin():
     if request.method == 'POST':
         username = request.form['username']
@@ -408,7 +1852,7 @@ def bagout():
 def badmin():
     posts = BlogPost.query.all()  # Retrieve all blog posts
     articles = NewsArticle.query.all()  # Retrieve all news articles
-    events = Event.query.all()  # Retrieve all events
+    events = Event.query.order_by(Event.date.desc(), Event.id.desc()).all()
     return render_template('badmin.html', posts=posts, articles=articles, events=events)
 
 # Blog post routes
@@ -537,6 +1981,7 @@ def delete_action(action_id):
 
 
 @app.route('/sagin', methods=['GET', 'POST'])
+@limiter.limit('login', per_client=(5, 60, 10), methods=('POST',))
 def sagin():
     if request.method == 'POST':
         username = request.form['username']
@@ -566,6 +2011,7 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
 @app.route('/tagin/team/add', methods=['POST'])
+@limiter.concurrency('uploads', app.config['UPLOAD_CONCURRENCY'])
 def add_member():
     name = request.form['name']
     
@@ -581,13 +2027,18 @@ def add_member():
     if photo.filename == '':
         return 'No selected file', 400
     if photo and allowed_file(photo.filename):
-        filename = secure_filename(photo.filename)
-        photo_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        photo.save(photo_path)
+        filename = storage.save(unique_upload_name(secure_filename(photo.filename)), photo.stream)
         photo_url = url_for('uploaded_file', filename=filename)
 
         new_member = TeamMember(name=name, job_title=job_title, photo_url=photo_url)
         db.session.add(new_member)
+        db.session.flush()
+        queue.enqueue('log_action', {
+            'entity_type': 'TeamMember',
+            'entity_id': new_member.id,
+            'action': 'Added',
+            'details': f"Team member '{name}' added successfully."
+        })
         db.session.commit()
         return redirect(url_for('team'))
     else:
@@ -606,10 +2057,11 @@ def edit_member(member_id):
         member.job_title = request.form['job_title']
         photo = request.files.get('photo')
         if photo and allowed_file(photo.filename):
-            filename = secure_filename(photo.filename)
-            photo_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            photo.save(photo_path)
-            member.photo_url = url_for('uploaded_file', filename=filename)
+            filename = storage.save(unique_upload_name(secure_filename(photo.filename)), photo.stream)
+            photo_url = url_for('uploaded_file', filename=filename)
+            if member.photo_url != photo_url:
+                release_upload(member.photo_url)
+            member.photo_url = photo_url
         db.session.commit()
         return redirect(url_for('team'))
     return render_template('edit_member.html', member=member)
@@ -619,10 +2071,12 @@ def delete_member(member_id):
     member = TeamMember.query.get(member_id)
     if member:
         db.session.delete(member)
+        release_upload(member.photo_url)
         db.session.commit()
     return redirect(url_for('team'))
 
 @app.route('/tagin', methods=['GET', 'POST'])
+@limiter.limit('login', per_client=(5, 60, 10), methods=('POST',))
 def tagin():
     if request.method == 'POST':
         username = request.form['username']
@@ -647,7 +2101,801 @@ def team():
     team_members = TeamMember.query.all()
     return render_template('team.html', team_members=team_members)
 
+# Static publishing: public pages rendered to STATIC_EXPORT_DIR, for a front
+# server to answer anonymous GETs from disk. Only the plain URL of a page is
+# published, so a request with a query string (catalog pages, filters, sorts)
+# must go to the app. With nginx:
+#
+#     error_page 418 = @flask;
+#     location / {
+#         if ($args) { return 418; }
+#         try_files $uri $uri/index.html @flask;
+#     }
+#
+# Commits queue a re-render of only the pages built from the changed rows, for
+# the worker; a failed render is retried like any task.
+app.config['STATIC_EXPORT_DIR'] = os.environ.get('STATIC_EXPORT_DIR')
+app.config['STATIC_EXPORT_BASE_URL'] = os.environ.get('STATIC_EXPORT_BASE_URL', app.config['SITE_URL'])
+PUBLIC_PAGES = ('/', '/about', '/prod', '/vacancy', '/bloog',
+                '/sitemap.xml', '/feeds/blog.atom', '/feeds/news.atom', '/feeds/jobs.atom', '/feeds/events.ics')
+
+def render_public_page(path):
+    response = app.test_client().get(path, base_url=app.config['STATIC_EXPORT_BASE_URL'],
+                                     environ_base={'amco.internal': True})
+    return response.status_code, response.get_data()
+
+static_site = StaticSite(app.config['STATIC_EXPORT_DIR'], render_public_page) \
+    if app.config['STATIC_EXPORT_DIR'] else None
+
+def pages_for(model, item_id):
+    if model is Product:
+        return ['/prod', f'/prod/{item_id}', '/sitemap.xml']
+    if model is Job:
+        return ['/vacancy', '/feeds/jobs.atom', '/sitemap.xml']
+    if model is TeamMember:
+        return ['/about']
+    if model is Event:
+        return ['/bloog', '/feeds/events.ics']
+    if model is BlogPost:
+        return ['/bloog', f'/bloog/post/{item_id}', '/feeds/blog.atom', '/sitemap.xml']
+    if model is NewsArticle:
+        return ['/bloog', f'/bloog/news/{item_id}', '/feeds/news.atom', '/sitemap.xml']
+    return []
+
+def all_public_pages():
+    pages = list(PUBLIC_PAGES)
+    pages += [f'/prod/{i}' for i, in db.session.query(Product.id).order_by(Product.id)]
+    pages += [f'/bloog/post/{i}' for i, in db.session.query(BlogPost.id).order_by(BlogPost.id)]
+    pages += [f'/bloog/news/{i}' for i, in db.session.query(NewsArticle.id).order_by(NewsArticle.id)]
+    return pages
+
+@on_commit(Product, Job, TeamMember, Event, BlogPost, NewsArticle)
+def publish_changed_pages(changes):
+    if static_site is None:
+        return
+    paths = list(dict.fromkeys(path for change in changes for path in pages_for(change.model, change.id)))
+    # A fresh app context gets its own session; the committing one cannot be used now.
+    with app.app_context():
+        queue.enqueue('publish_pages', {'paths': paths})
+        db.session.commit()
+
+@queue.task('publish_pages')
+def publish_pages(paths):
+    if static_site is None:
+        return
+    # This process's cached feeds and sitemap predate the commit that queued us.
+    documents.invalidate(*documents.builders)
+    summary = static_site.publish(paths)
+    if summary['failed']:
+        raise RuntimeError(f"{summary['failed']} of {len(paths)} page(s) failed to render.")
+
+@queue.task('publish_product_pages')
+def publish_product_pages():
+    publish_pages(['/prod', '/sitemap.xml'] +
+                  [f'/prod/{i}' for i, in db.session.query(Product.id).order_by(Product.id)])
+
+# Live admin dashboards: new applications and audit entries are pushed to
+# /admin/stream as server-sent events. Other processes' writes arrive by
+# polling SQLite (default) or through a local broker (`flask pubsub-broker`).
+app.config['PUBSUB_BACKEND'] = os.environ.get('PUBSUB_BACKEND', 'sqlite')
+app.config['PUBSUB_BROKER'] = os.environ.get('PUBSUB_BROKER', '127.0.0.1:8766')
+app.config['ADMIN_STREAM_LIMIT'] = 4
+app.config['ADMIN_STREAM_TIMEOUT'] = 300
+app.config['ADMIN_STREAM_REPLAY'] = 500
+STREAM_SOURCES = {
+    'applied_job': ('applied_job', 'id, job_id, first_name, father_name, applicant_email, gender, age, '
+                                   'cv_path, applied_at'),
+    'action_history': ('action_history', 'id, entity_type, entity_id, action, timestamp, details'),
+}
+pubsub = Broker()
+if app.config['PUBSUB_BACKEND'] == 'broker':
+    broker_host, _, broker_port = app.config['PUBSUB_BROKER'].rpartition(':')
+    fanout = BrokerRelay(pubsub, (broker_host, int(broker_port)))
+else:
+    fanout = SQLitePoller(pubsub, connect_database, STREAM_SOURCES)
+# Every open stream holds a worker thread, so only a few are allowed at once.
+stream_slots = threading.BoundedSemaphore(app.config['ADMIN_STREAM_LIMIT'])
+
+@on_commit(AppliedJob, ActionHistory)
+def publish_new_records(changes):
+    channels = {AppliedJob: 'applied_job', ActionHistory: 'action_history'}
+    for change in changes:
+        if change.created and not change.deleted:
+            channel = channels[change.model]
+            columns = [c.strip() for c in STREAM_SOURCES[channel][1].split(',')]
+            fanout.publish(channel, {c: change.values.get(c) for c in columns})
+
+def stream_positions(last_event_id, channels):
+    """The last row id per channel from a stream event id, or None if it does
+    not cover exactly ``channels``."""
+    positions = {}
+    for part in last_event_id.split(','):
+        channel, _, row_id = part.partition(':')
+        if channel not in channels or not row_id.isdigit():
+            return None
+        positions[channel] = int(row_id)
+    return positions if set(positions) == set(channels) else None
+
+def stream_event_id(positions):
+    return ','.join(f'{channel}:{row_id}' for channel, row_id in sorted(positions.items()))
+
+def stream_backlog(positions, limit):
+    """Rows after ``positions`` as (channel, message), or None if any channel
+    has more than ``limit`` of them."""
+    backlog = []
+    for channel, row_id in positions.items():
+        table, columns = STREAM_SOURCES[channel]
+        rows = db.session.execute(db.text(
+            f'SELECT {columns} FROM {table} WHERE id > :id ORDER BY id LIMIT :limit'
+        ), {'id': row_id, 'limit': limit + 1}).mappings().all()
+        if len(rows) > limit:
+            return None
+        backlog.extend((channel, dict(row)) for row in rows)
+    return backlog
+
+@app.route('/admin/stream')
+def admin_stream():
+    if 'admin_logged_in' not in session or not session['admin_logged_in']:
+        return Response('Login required.', status=403, mimetype='text/plain')
+    channels = [c for c in request.args.get('channels', '').split(',') if c in STREAM_SOURCES] \
+        or list(STREAM_SOURCES)
+    job_id = request.args.get('job_id', type=int)
+    if not stream_slots.acquire(blocking=False):
+        raise TooManyRequests(retry_after=10)
+    subscription = None
+    closed = []
+
+    def close():
+        if not closed:
+            closed.append(True)
+            if subscription is not None:
+                subscription.close()
+            stream_slots.release()
+
+    def event(channel, message):
+        if message['id'] <= positions[channel]:
+            return ''
+        positions[channel] = message['id']
+        if job_id is not None and channel == 'applied_job' and message['job_id'] != job_id:
+            return ''
+        return (f"id: {stream_event_id(positions)}\nevent: {channel}\n"
+                f"data: {json.dumps(message, default=str)}\n\n")
+
+    def generate():
+        # Streams end after ADMIN_STREAM_TIMEOUT; EventSource reconnects by itself.
+        yield 'retry: 3000\n\n'
+        if backlog is None:
+            # Too far behind, or not an id of ours: the client starts over.
+            yield 'event: reset\ndata: {}\n\n'
+            return
+        # An id without data is not dispatched but still becomes the client's
+        # Last-Event-ID, so a reconnect before the first event resumes from here.
+        yield f'id: {stream_event_id(positions)}\n\n'
+        for channel, message in backlog:
+            yield event(channel, message)
+        deadline = time.monotonic() + app.config['ADMIN_STREAM_TIMEOUT']
+        while time.monotonic() < deadline:
+            item = subscription.get(timeout=15)
+            if subscription.overflowed:
+                yield 'event: reset\ndata: {}\n\n'
+                return
+            if item is None:
+                yield ': keepalive\n\n'
+                continue
+            yield event(*item)
+
+    # Until the response owns close(), any failure must give the slot back,
+    # or a few errors would lock every dashboard out until a restart.
+    try:
+        fanout.start()
+        subscription = pubsub.subscribe(channels)
+        # Every event id carries the last row id of each channel, so a client
+        # reconnecting with Last-Event-ID is sent the rows it missed, read back
+        # from the database. Rows also delivered by the subscription are skipped.
+        last_event_id = request.headers.get('Last-Event-ID')
+        if last_event_id:
+            positions = stream_positions(last_event_id, channels)
+            backlog = stream_backlog(positions, app.config['ADMIN_STREAM_REPLAY']) if positions else None
+        else:
+            positions = {channel: db.session.execute(db.text(
+                f'SELECT coalesce(max(id), 0) FROM {STREAM_SOURCES[channel][0]}')).scalar()
+                for channel in channels}
+            backlog = []
+        response = Response(generate(), mimetype='text/event-stream')
+        response.call_on_close(close)
+    except BaseException:
+        close()
+        raise
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+# Online database maintenance. Every step works in short increments on its
+# own connection, so requests keep being served while it runs.
+app.config['DB_BACKUP_DIR'] = os.environ.get('DB_BACKUP_DIR', os.path.join(app.instance_path, 'backups'))
+app.config['DB_BACKUP_KEEP'] = 7
+app.config['DB_BACKUP_PAGES'] = 256
+app.config['DB_MAINT_PAUSE'] = 0.05
+app.config['DB_MAINT_INTERVAL'] = 24 * 3600
+app.config['DB_CHECKPOINT_INTERVAL'] = 600
+
+def backup_database(directory=None, keep=None, progress=None):
+    directory = directory or app.config['DB_BACKUP_DIR']
+    path = dbmaint.backup(connect_database, directory, prefix='amco', pages=app.config['DB_BACKUP_PAGES'],
+                          pause=app.config['DB_MAINT_PAUSE'], progress=progress)
+    keep = app.config['DB_BACKUP_KEEP'] if keep is None else keep
+    dbmaint.prune_backups(directory, prefix='amco', keep=keep)
+    return path
+
+@queue.periodic('maintain_database', interval=app.config['DB_MAINT_INTERVAL'])
+def maintain_database():
+    path = backup_database()
+    connection = connect_database()
+    try:
+        freed = dbmaint.incremental_vacuum(connection, pause=app.config['DB_MAINT_PAUSE'])
+        dbmaint.optimize(connection)
+        problems = dbmaint.integrity_check(connection, quick=True)
+    finally:
+        connection.close()
+    for problem in problems:
+        app.logger.error('Database check: %s', problem)
+    app.logger.info('Backed up database to %s, freed %s page(s)', path, freed or 0)
+
+@queue.periodic('checkpoint_database', interval=app.config['DB_CHECKPOINT_INTERVAL'])
+def checkpoint_database():
+    connection = connect_database()
+    try:
+        dbmaint.checkpoint(connection, 'PASSIVE')
+    finally:
+        connection.close()
+
+# Query plan audit: every GET route, and the read-only POSTs in
+# QUERY_AUDIT_FORMS, is requested through the test client as an admin and
+# each statement it sends through SQLAlchemy is run with EXPLAIN QUERY PLAN.
+QUERY_AUDIT_SKIP = {'static', 'admin_stream', 'uploaded_file', 'download_cv', 'delete_member',
+                    'logout', 'lagout', 'bagout', 'sagout', 'tagout', 'sample_worker'}
+QUERY_AUDIT_FORMS = {'search': {'search_term': 'engineer'}}
+
+def create_database():
+    """Create any missing tables, with the search index and change-log triggers."""
+    db.create_all()
+    with db.engine.begin() as connection:
+        cvindex.ensure_index(connection)
+        for statement in CHANGE_LOG_DDL:
+            connection.exec_driver_sql(statement)
+
+def seed_sample_data(count):
+    """Insert ``count`` rows into each content table, for audits on an empty database."""
+    now = datetime.utcnow()
+    today = date.today()
+    jobs = max(count // 10, 1)
+    rows = {
+        Product: [{'name': f'Product {i}', 'price': float(i * 10), 'image': 'sample.png',
+                   'description': f'Sample product {i}', 'updated_at': now} for i in range(count)],
+        Job: [{'title': f'Engineer {i}', 'description': f'Sample job {i}', 'requirements': 'Python, SQL',
+               'deadline': now + timedelta(days=30), 'is_active': i % 3 != 0, 'updated_at': now}
+              for i in range(jobs)],
+        AppliedJob: [{'job_id': i % jobs + 1, 'first_name': f'Applicant {i}', 'father_name': 'Sample',
+                      'applicant_email': f'applicant{i}@example.com', 'gender': 'female', 'age': 30,
+                      'applied_at': now - timedelta(hours=i)} for i in range(count)],
+        ActionHistory: [{'entity_type': 'Product', 'entity_id': i + 1, 'action': 'edit',
+                         'details': f'Sample action {i}', 'timestamp': now - timedelta(minutes=i)}
+                        for i in range(count)],
+        Event: [{'title': f'Event {i}', 'description': 'Sample event', 'location': 'Addis Ababa',
+                 'date': today + timedelta(days=i - count // 2), 'updated_at': now} for i in range(count)],
+        TeamMember: [{'name': f'Member {i}', 'job_title': 'Engineer'} for i in range(min(count, 50))],
+    }
+    for model, prefix in ((BlogPost, 'Post'), (NewsArticle, 'Article')):
+        html = content.render_markdown(f'Sample *{prefix.lower()}* text.')
+        rows[model] = [{'title': f'{prefix} {i}', 'content': f'Sample *{prefix.lower()}* text.', 'author': 'AMCO',
+                        'content_html': html, 'excerpt': content.excerpt(html), 'updated_at': now}
+                       for i in range(count)]
+    for model, values in rows.items():
+        for batch in catalog_io.chunked(values, 500):
+            db.session.execute(db.insert(model), batch)
+    db.session.commit()
+
+def audit_route_queries():
+    """Return (method, path, endpoint, status, findings) for each audited route."""
+    client = app.test_client()
+    client.environ_base['amco.internal'] = True
+    with client.session_transaction() as client_session:
+        client_session['admin_logged_in'] = True
+    results = []
+    enabled, limiter.enabled = limiter.enabled, False
+    connection = db.engine.raw_connection()
+    try:
+        for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+            form = QUERY_AUDIT_FORMS.get(rule.endpoint)
+            method = 'POST' if form is not None else 'GET'
+            if rule.endpoint in QUERY_AUDIT_SKIP or method not in rule.methods:
+                continue
+            path = rule.build({argument: 1 for argument in rule.arguments})[1]
+            with planaudit.capture(db.engine) as statements:
+                response = client.open(path, method=method, data=form)
+                response.close()
+            results.append((method, path, rule.endpoint, response.status_code,
+                            planaudit.audit(connection, statements)))
+    finally:
+        connection.close()
+        limiter.enabled = enabled
+    return results
+
+@app.cli.command('worker')
+@click.option('--processes', default=2, show_default=True, help='Number of worker processes.')
+@click.option('--burst', is_flag=True, help='Run due tasks in this process and exit.')
+def worker_command(processes, burst):
+    """Run background tasks from the task queue."""
+    if burst:
+        count = queue.run_pending()
+        click.echo(f"Ran {count} task(s).")
+        return
+    run_worker(app, queue, processes=processes)
+
+@app.cli.command('task-stats')
+@click.option('--purge', is_flag=True, help='Delete old done and dead tasks first.')
+def task_stats_command(purge):
+    """Show how many tasks are queued, running, done and dead."""
+    if purge:
+        purge_tasks()
+    stats = queue.stats()
+    for status in ('queued', 'running', 'done', 'dead'):
+        row = stats.get(status, {'count': 0, 'oldest': None})
+        oldest = f" (oldest run_at {row['oldest']:%Y-%m-%d %H:%M:%S})" if row['oldest'] else ''
+        click.echo(f"{status:8} {row['count']}{oldest}")
+    tasks = queue.table
+    for name, count in db.session.execute(db.select(tasks.c.name, db.func.count())
+                                          .where(tasks.c.status == 'dead').group_by(tasks.c.name)):
+        click.echo(f"  dead {name}: {count}")
+
+@app.cli.command('mail-sink')
+@click.option('--port', default=8025, show_default=True)
+@click.option('--directory', default=None, help='Write received messages here as .eml files.')
+def mail_sink_command(port, directory):
+    """Run a local SMTP stand-in that accepts every message."""
+    sink = MailSink(port=port, directory=directory)
+    click.echo(f"Mail sink listening on localhost:{port}")
+    try:
+        sink.serve_forever()
+    except KeyboardInterrupt:
+        sink.server_close()
+
+@app.cli.command('serve')
+@click.option('--host', default='127.0.0.1', show_default=True)
+@click.option('--port', default=8000, show_default=True)
+@click.option('--workers', default=1, show_default=True, help='Event loop processes.')
+def serve_command(host, port, workers):
+    """Serve the app over ASGI with uvicorn."""
+    try:
+        import uvicorn
+    except ImportError:
+        raise click.ClickException('The serve command requires uvicorn.')
+    uvicorn.run('asgi:application', host=host, port=port, workers=workers,
+                app_dir=app.root_path, lifespan='on')
+
+@app.cli.command('object-sink')
+@click.option('--port', default=9000, show_default=True)
+def object_sink_command(port):
+    """Run a local S3-compatible stand-in for STORAGE_BACKEND=s3."""
+    sink = ObjectSink(port=port)
+    click.echo(f"Object sink listening on http://localhost:{port}")
+    try:
+        sink.serve_forever()
+    except KeyboardInterrupt:
+        sink.server_close()
+
+@app.cli.command('pubsub-broker')
+@click.option('--port', default=8766, show_default=True)
+def pubsub_broker_command(port):
+    """Run a local message broker for PUBSUB_BACKEND=broker."""
+    server = BrokerServer(('127.0.0.1', port))
+    click.echo(f"Pub/sub broker listening on 127.0.0.1:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+@app.cli.command('import-products')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--images', type=click.Path(exists=True), help='Directory or ZIP archive of product images.')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default=None)
+@click.option('--chunk-size', default=1000, show_default=True)
+@click.option('--workers', default=8, show_default=True, help='Threads used to copy images.')
+def import_products_command(path, images, fmt, chunk_size, workers):
+    """Import products from a CSV or JSON lines file."""
+    try:
+        image_source = catalog_io.ImageSource(images) if images else None
+    except ValueError as exc:
+        raise click.BadParameter(str(exc), param_hint='--images')
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        try:
+            summary = import_products(stream, fmt or catalog_io.detect_format(path), image_source,
+                                      chunk_size=chunk_size, workers=workers)
+        finally:
+            if image_source is not None:
+                image_source.close()
+    for line, error in summary['errors']:
+        click.echo(f"Record {line}: {error}", err=True)
+    click.echo(f"Imported {summary['imported']} products, skipped {summary['skipped']}.")
+
+@app.cli.command('export-products')
+@click.argument('path', default='-')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default='csv', show_default=True)
+def export_products_command(path, fmt):
+    """Export all products as CSV or JSON lines (to stdout by default)."""
+    output = sys.stdout if path == '-' else open(path, 'w', encoding='utf-8', newline='')
+    try:
+        for chunk in export_products(fmt):
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+@app.cli.command('bulk-edit-products')
+@click.option('--q', default='', help='Only products whose name starts with this.')
+@click.option('--min-price', type=float)
+@click.option('--max-price', type=float)
+@click.option('--percent', type=float, help='Change prices by this percentage, e.g. -10.')
+@click.option('--delta', type=float, help='Add this amount to prices.')
+@click.option('--set-price', type=float, help='Set prices to this amount.')
+@click.option('--description', help='Replace the description.')
+@click.option('--price-list', type=click.Path(exists=True, dir_okay=False),
+              help='CSV or JSON lines file of id,price pairs to apply instead.')
+@click.option('--chunk-size', default=1000, show_default=True)
+def bulk_edit_products_command(q, min_price, max_price, percent, delta, set_price, description,
+                               price_list, chunk_size):
+    """Reprice or patch many products with set-based updates."""
+    if price_list:
+        with open(price_list, encoding='utf-8-sig', newline='') as stream:
+            records = catalog_io.read_records(stream, catalog_io.detect_format(price_list))
+            try:
+                updated = bulk_set_prices(((r['id'], r['price']) for r in records), chunk_size)
+            except ValueError as exc:
+                raise click.ClickException(str(exc))
+        click.echo(f"Updated {updated} products.")
+        return
+    operations = [(name, value) for name, value in
+                  [('percent', percent), ('delta', delta), ('set', set_price)] if value is not None]
+    if len(operations) > 1:
+        raise click.UsageError('Use only one of --percent, --delta and --set-price.')
+    if any(not math.isfinite(value) for _, value in operations):
+        raise click.UsageError('--percent, --delta and --set-price must be finite numbers.')
+    operation, amount = operations[0] if operations else (None, None)
+    patch = {'description': description} if description is not None else None
+    filters = {'q': q.strip(), 'min_price': min_price, 'max_price': max_price}
+    updated = bulk_update_products(filters, operation, amount, patch, chunk_size)
+    click.echo(f"Updated {updated} products.")
+
+@app.cli.command('gc-uploads')
+@click.option('--dry-run', is_flag=True, help='List orphaned uploads without moving them.')
+@click.option('--grace-hours', type=float, help='Only collect files older than this.')
+@click.option('--purge/--no-purge', default=True, show_default=True,
+              help='Delete quarantined files past UPLOAD_QUARANTINE_DAYS.')
+def gc_uploads_command(dry_run, grace_hours, purge):
+    """Quarantine uploaded files that no product, team member or application references."""
+    grace = None if grace_hours is None else grace_hours * 3600
+    orphans = sweep_uploads(dry_run=dry_run, grace=grace)
+    for name, size in orphans:
+        click.echo(f"{name}\t{size}")
+    total = sum(size for _, size in orphans)
+    verb = 'Would quarantine' if dry_run else 'Quarantined'
+    click.echo(f"{verb} {len(orphans)} file(s), {total / 1024 / 1024:.1f} MiB.")
+    if purge and not dry_run:
+        removed = storage.purge_quarantine(app.config['UPLOAD_QUARANTINE_DAYS'])
+        click.echo(f"Deleted {removed} file(s) from quarantine.")
+
+@app.cli.command('extract-cvs')
+@click.option('--all', 'reextract', is_flag=True, help='Re-extract CVs that already have text.')
+@click.option('--processes', default=None, type=int, help='Size of the process pool.')
+@click.option('--batch-size', default=200, show_default=True)
+def extract_cvs_command(reextract, processes, batch_size):
+    """Extract CV text for stored applications and refresh the search index."""
+    with db.engine.begin() as connection:
+        cvindex.ensure_index(connection)
+    query = db.session.query(AppliedJob.id, AppliedJob.cv_path).filter(AppliedJob.cv_path.isnot(None))
+    if not reextract:
+        query = query.filter(AppliedJob.cv_extracted_at.is_(None))
+    pending = query.all()
+    failed = 0
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        for batch in catalog_io.chunked(pending, batch_size):
+            # Remote backends download each batch to temporary files first.
+            with ExitStack() as stack:
+                paths = [stack.enter_context(storage.local_path(uploadgc.reference_name(cv_path)))
+                         for _, cv_path in batch]
+                results = list(pool.map(cvindex.extract_safely, paths, chunksize=16))
+            for (applied_job_id, _), (text, error) in zip(batch, results):
+                if error:
+                    failed += 1
+                    click.echo(f"Applied job {applied_job_id}: {error}", err=True)
+                AppliedJob.query.filter_by(id=applied_job_id).update(
+                    {'cv_text': text, 'cv_extracted_at': datetime.utcnow()})
+            db.session.commit()
+    click.echo(f"Extracted {len(pending) - failed} CV(s), {failed} failed.")
+
+@app.cli.command('render-content')
+@click.option('--all', 'rerender', is_flag=True, help='Re-render items that already have HTML.')
+@click.option('--batch-size', default=200, show_default=True)
+def render_content_command(rerender, batch_size):
+    """Render stored blog posts and news articles to HTML and excerpts."""
+    total = 0
+    for model in (BlogPost, NewsArticle):
+        query = db.session.query(model.id, model.content)
+        if not rerender:
+            query = query.filter(model.content_html.is_(None))
+        for batch in catalog_io.chunked(query.all(), batch_size):
+            rows = []
+            for item_id, source in batch:
+                html = content.render_markdown(source)
+                rows.append({'id': item_id, 'content_html': html, 'excerpt': content.excerpt(html)})
+            db.session.execute(db.update(model), rows)
+            db.session.commit()
+            total += len(rows)
+    click.echo(f"Rendered {total} item(s).")
+
+@app.cli.command('export-static')
+@click.option('--output', default=None, help='Directory to write to (default: STATIC_EXPORT_DIR).')
+def export_static_command(output):
+    """Render every public page to the static export directory."""
+    directory = output or app.config['STATIC_EXPORT_DIR']
+    if not directory:
+        raise click.UsageError('Set STATIC_EXPORT_DIR or pass --output.')
+    summary = StaticSite(directory, render_public_page).export(all_public_pages())
+    click.echo(f"Wrote {summary['written']} page(s), removed {summary['removed']}, "
+               f"{summary['failed']} failed.")
+
+@app.cli.group('db-maint')
+def db_maint_group():
+    """Back up, vacuum, analyze and check the live database."""
+
+@db_maint_group.command('backup')
+@click.option('--output', default=None, help='Directory to write to (default: DB_BACKUP_DIR).')
+@click.option('--keep', default=None, type=int, help='Backups to keep (default: DB_BACKUP_KEEP).')
+def db_maint_backup_command(output, keep):
+    """Copy the database while it is in use."""
+    def progress(done, total):
+        click.echo(f"\r{done}/{total} pages", nl=False)
+    path = backup_database(output, keep, progress)
+    click.echo(f"\nWrote {path}.")
+
+@db_maint_group.command('vacuum')
+@click.option('--pages', default=500, show_default=True, help='Pages to free per step.')
+@click.option('--limit', default=None, type=int, help='Stop after freeing this many pages.')
+@click.option('--enable-incremental', is_flag=True,
+              help='Switch to incremental auto-vacuum first. Runs a full VACUUM that locks the database.')
+def db_maint_vacuum_command(pages, limit, enable_incremental):
+    """Return free pages to the filesystem in small steps."""
+    connection = connect_database()
+    try:
+        if enable_incremental:
+            dbmaint.enable_incremental_vacuum(connection)
+            click.echo('Incremental auto-vacuum enabled.')
+        freed = dbmaint.incremental_vacuum(connection, pages, app.config['DB_MAINT_PAUSE'], limit)
+    finally:
+        connection.close()
+    if freed is None:
+        raise click.ClickException('Incremental auto-vacuum is off; run again with --enable-incremental.')
+    click.echo(f"Freed {freed} page(s).")
+
+@db_maint_group.command('analyze')
+@click.option('--full', is_flag=True, help='Run a complete ANALYZE instead of PRAGMA optimize.')
+def db_maint_analyze_command(full):
+    """Refresh the query planner's statistics."""
+    connection = connect_database()
+    try:
+        dbmaint.optimize(connection, full=full)
+    finally:
+        connection.close()
+    click.echo('Statistics updated.')
+
+@db_maint_group.command('check')
+@click.option('--quick', is_flag=True, help='Skip index consistency checks.')
+def db_maint_check_command(quick):
+    """Check the database for corruption and broken foreign keys."""
+    connection = connect_database()
+    try:
+        problems = dbmaint.integrity_check(connection, quick=quick)
+    finally:
+        connection.close()
+    for problem in problems:
+        click.echo(problem, err=True)
+    if problems:
+        raise click.ClickException(f"{len(problems)} problem(s) found.")
+    click.echo('ok')
+
+@db_maint_group.command('checkpoint')
+@click.option('--mode', default='PASSIVE', show_default=True,
+              type=click.Choice(['PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'], case_sensitive=False))
+@click.option('--enable-wal', is_flag=True, help='Switch the database to write-ahead logging first.')
+def db_maint_checkpoint_command(mode, enable_wal):
+    """Copy the write-ahead log back into the database file."""
+    connection = connect_database()
+    try:
+        if enable_wal:
+            connection.execute('PRAGMA journal_mode = WAL')
+        result = dbmaint.checkpoint(connection, mode)
+    finally:
+        connection.close()
+    if result is None:
+        raise click.ClickException('The database is not in WAL mode; run again with --enable-wal.')
+    busy, logged, checkpointed = result
+    click.echo(f"Checkpointed {checkpointed} of {logged} page(s){' (busy)' if busy else ''}.")
+
+@db_maint_group.command('run')
+def db_maint_run_command():
+    """Run the scheduled maintenance once: backup, vacuum, optimize and quick check."""
+    maintain_database()
+    checkpoint_database()
+    click.echo('Done.')
+
+@app.cli.command('audit-queries')
+@click.option('--seed', default=0, show_default=True,
+              help='Insert this many sample rows per table first. Refused unless the database is empty.')
+@click.option('--json', 'as_json', is_flag=True, help='Print the report as JSON.')
+@click.option('--strict', is_flag=True, help='Exit with status 1 if any index is suggested.')
+def audit_queries_command(seed, as_json, strict):
+    """Request every route and report full scans, sorts and missing indexes.
+
+    Only statements sent through SQLAlchemy are seen; the read model's own
+    queries are not. Run it against a scratch database, for example
+    DATABASE_URL=sqlite:////tmp/audit.db flask audit-queries --seed 1000.
+    """
+    if seed:
+        create_database()
+        if db.session.query(Product.id).first() or db.session.query(Job.id).first():
+            raise click.UsageError('--seed needs an empty database; point DATABASE_URL at a scratch one.')
+        seed_sample_data(seed)
+    results = audit_route_queries()
+    suggestions = sorted({f.suggestion for *_, findings in results for f in findings if f.suggestion})
+    if as_json:
+        click.echo(json.dumps({
+            'routes': [{'method': method, 'path': path, 'endpoint': endpoint, 'status': status,
+                        'findings': [f.as_dict() for f in findings]}
+                       for method, path, endpoint, status, findings in results],
+            'suggested_indexes': suggestions,
+        }, indent=2))
+    else:
+        for method, path, endpoint, status, findings in results:
+            if not findings and status < 500:
+                continue
+            click.echo(f"{method} {path} ({endpoint}) -> {status}")
+            for finding in findings:
+                click.echo(f"  {finding.kind}: {finding.detail}")
+                click.echo(f"    {' '.join(finding.sql.split())[:160]}")
+                if finding.note:
+                    click.echo(f"    note: {finding.note}")
+                if finding.suggestion:
+                    click.echo(f"    suggest: {finding.suggestion}")
+        click.echo(f"\nAudited {len(results)} route(s); {len(suggestions)} suggested index(es):")
+        for suggestion in suggestions:
+            click.echo(f"  {suggestion}")
+    if strict and suggestions:
+        sys.exit(1)
+
+@app.cli.command('archive-jobs')
+@click.option('--days', default=None, type=int, help='Closed for at least this many days (default: ARCHIVE_AFTER_DAYS).')
+@click.option('--job-id', default=None, type=int, help='Archive this posting only; its deadline must have passed.')
+@click.option('--dry-run', is_flag=True, help='List the postings without archiving them.')
+def archive_jobs_command(days, job_id, dry_run):
+    """Move applications and CVs of long-closed postings to cold storage."""
+    if job_id is not None:
+        job = Job.query.get(job_id)
+        if job is None or not job.deadline or job.deadline >= datetime.now():
+            raise click.UsageError(f"Job {job_id} does not exist or is still open.")
+        jobs = [job]
+    else:
+        jobs = archivable_jobs(days)
+    for job in jobs:
+        if dry_run:
+            click.echo(f"Job {job.id}: {job.title} (closed {job.deadline:%Y-%m-%d})")
+            continue
+        archive = archive_job(job)
+        click.echo(f"Job {job.id}: {archive.applicant_count} application(s), {archive.cv_count} CV(s), "
+                   f"{archive.size / 1024 / 1024:.1f} MiB -> {archive.name}")
+    click.echo(f"{'Would archive' if dry_run else 'Archived'} {len(jobs)} posting(s).")
+
+@app.cli.command('restore-job')
+@click.argument('job_id', type=int)
+def restore_job_command(job_id):
+    """Move a posting's archived applications and CVs back into the database."""
+    if JobArchive.query.filter_by(job_id=job_id).first() is None:
+        raise click.UsageError(f"Job {job_id} has no archive.")
+    restore_job_archive(job_id)
+    click.echo(f"Restored job {job_id}.")
+
+# Admin-only profiling. A request carrying ?__profile=1 or an X-Profile header
+# from a logged-in admin is traced call by call (or sampled, with
+# __profile=sample) and saved as speedscope JSON; the /admin/profile routes
+# sample the whole worker or snapshot tracemalloc. Without the flag a request
+# pays for one dict lookup.
+app.config['PROFILE_FOLDER'] = os.path.join(app.instance_path, 'profiles')
+app.config['PROFILE_KEEP'] = 50
+app.config['PROFILE_INTERVAL'] = 0.005
+app.config['PROFILE_MAX_SECONDS'] = 60
+profile_store = ProfileStore(app.config['PROFILE_FOLDER'], keep=app.config['PROFILE_KEEP'])
+memory_tracer = MemoryTracer()
+
+@app.before_request
+def start_request_profile():
+    mode = request.args.get('__profile') or request.headers.get('X-Profile')
+    if mode and session.get('admin_logged_in'):
+        if mode == 'sample':
+            g.profiler = Sampler([threading.get_ident()], interval=app.config['PROFILE_INTERVAL']).start()
+        else:
+            g.profiler = Tracer().start()
+
+@app.after_request
+def save_request_profile(response):
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        # Covers the view and its template; a streamed body is not included.
+        profiler.stop()
+        name = profile_store.save('request', profiler.speedscope(f'{request.method} {request.full_path}'))
+        response.headers['X-Profile'] = url_for('download_profile', name=name)
+    return response
+
+@app.teardown_request
+def stop_request_profile(exc):
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.stop()
+
+@app.route('/admin/profile/sample')
+def sample_worker():
+    if 'admin_logged_in' not in session or not session['admin_logged_in']:
+        return Response('Login required.', status=403, mimetype='text/plain')
+    seconds = min(max(request.args.get('seconds', 5, type=float), 0.1), app.config['PROFILE_MAX_SECONDS'])
+    interval = max(request.args.get('interval', 0.01, type=float), 0.001)
+    profiler = Sampler(interval=interval).start()
+    time.sleep(seconds)
+    profiler.stop()
+    name = profile_store.save('worker', profiler.speedscope(f'worker {os.getpid()}, {seconds:g}s'))
+    return jsonify({'name': name, 'url': url_for('download_profile', name=name), 'pid': os.getpid(),
+                    'samples': profiler.samples, 'top': profiler.top()})
+
+@app.route('/admin/profile/memory', methods=['GET', 'POST'])
+def memory_profile():
+    if 'admin_logged_in' not in session or not session['admin_logged_in']:
+        return Response('Login required.', status=403, mimetype='text/plain')
+    if request.method == 'POST':
+        action = request.values.get('action')
+        if action == 'start':
+            memory_tracer.start(frames=min(max(request.values.get('frames', 1, type=int), 1), 25))
+        elif action == 'stop':
+            memory_tracer.stop()
+        else:
+            return jsonify({'error': "action must be 'start' or 'stop'."}), 400
+        return jsonify({'tracing': memory_tracer.tracing, 'pid': os.getpid()})
+    if not memory_tracer.tracing:
+        return jsonify({'error': 'Not tracing; POST action=start first.', 'pid': os.getpid()}), 409
+    key_type = 'traceback' if request.args.get('group') == 'traceback' else 'lineno'
+    result = memory_tracer.snapshot(limit=min(request.args.get('limit', 25, type=int), 200), key_type=key_type)
+    result['name'] = profile_store.save('memory', result)
+    return jsonify(result)
+
+@app.route('/admin/profiles')
+def list_profiles():
+    if 'admin_logged_in' not in session or not session['admin_logged_in']:
+        return Response('Login required.', status=403, mimetype='text/plain')
+    return jsonify({'profiles': [{'name': name, 'url': url_for('download_profile', name=name)}
+                                 for name in profile_store.names()]})
+
+@app.route('/admin/profiles/<name>')
+def download_profile(name):
+    if 'admin_logged_in' not in session or not session['admin_logged_in']:
+        return Response('Login required.', status=403, mimetype='text/plain')
+    return send_from_directory(app.config['PROFILE_FOLDER'], name, mimetype='application/json',
+                               as_attachment=True)
+
+@app.cli.command('build-related')
+@click.option('--kind', type=click.Choice(['product', 'job']), multiple=True,
+              help='Only rebuild these kinds (default: both).')
+def build_related_command(kind):
+    """Recompute every related-items list from scratch."""
+    for name in kind or ('product', 'job'):
+        click.echo(f"{name}: {refresh_related(name, full=True)} lists")
+
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        create_database()
     app.run(debug=True)
\ No newline at end of file
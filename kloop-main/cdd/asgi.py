@@ -0,0 +1,15 @@
+"""ASGI entry point: ``uvicorn asgi:application`` (or ``flask serve``).
+
+Uploads and downloads are transferred on the event loop; views still run on
+a thread pool, so slow clients do not hold worker threads.
+"""
+from app import app
+from asgibridge import WSGIBridge
+
+application = WSGIBridge(
+    app,
+    threads=app.config['ASGI_THREADS'],
+    # The largest body any route accepts; each route's own limit is checked
+    # by Flask, exactly as under a WSGI server.
+    max_body=max(app.config['MAX_CONTENT_LENGTH'], app.config['MAX_IMPORT_SIZE']),
+)
@@ -0,0 +1,212 @@
+import asyncio
+import contextlib
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+_DONE = object()
+
+
+class FileWrapper:
+    """``wsgi.file_wrapper`` that marks file responses so the bridge can stream
+    them in large reads instead of the app's small iteration chunks."""
+
+    def __init__(self, filelike, block_size=8192):
+        self.filelike = filelike
+        self.block_size = block_size
+
+    def __iter__(self):
+        while True:
+            data = self.filelike.read(self.block_size)
+            if not data:
+                return
+            yield data
+
+    def close(self):
+        if hasattr(self.filelike, 'close'):
+            self.filelike.close()
+
+
+class _Response:
+    def __init__(self):
+        self.status = None
+        self.headers = None
+        self.written = []
+
+    def start_response(self, status, headers, exc_info=None):
+        if exc_info and self.status is not None:
+            raise exc_info[1].with_traceback(exc_info[2])
+        self.status, self.headers = status, headers
+        return self.written.append
+
+
+class WSGIBridge:
+    """Serve a WSGI app over ASGI without tying threads to slow clients.
+
+    The request body is received on the event loop and spooled to a temporary
+    file (on disk past ``spool_size``), so the WSGI app only runs once the whole
+    upload has arrived. The app then runs on a fixed thread pool, and its
+    response is pulled from that pool one chunk at a time and sent from the
+    event loop. While a client reads or writes slowly, no thread is held.
+    When the client disconnects mid-response, iteration stops and the app's
+    response is closed.
+
+    ``max_body`` only bounds what is spooled; per-route limits are the app's
+    to enforce (Flask's ``MAX_CONTENT_LENGTH``), as under any WSGI server.
+    """
+
+    def __init__(self, wsgi_app, threads=8, max_body=None, spool_size=1024 * 1024,
+                 file_block_size=256 * 1024):
+        self.wsgi_app = wsgi_app
+        self.max_body = max_body
+        self.spool_size = spool_size
+        self.file_block_size = file_block_size
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wsgi')
+        self.io_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='wsgi-io')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] != 'http':
+            return
+        body = await self._receive_body(scope, receive)
+        if body is _DONE:
+            return
+        if body is None:
+            await self._send_simple(send, 413, b'Request body too large.')
+            return
+        try:
+            await self._run(scope, body, receive, send)
+        finally:
+            body.close()
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                self.io_executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _receive_body(self, scope, receive):
+        loop = asyncio.get_running_loop()
+        body = tempfile.SpooledTemporaryFile(max_size=self.spool_size)
+        size = 0
+        more = True
+        while more:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return _DONE
+            chunk = message.get('body', b'')
+            more = message.get('more_body', False)
+            size += len(chunk)
+            if self.max_body is not None and size > self.max_body:
+                body.close()
+                return None
+            if not chunk:
+                continue
+            if size - len(chunk) > self.spool_size:
+                # Past the spool size the body is a real file; keep disk writes off the loop.
+                await loop.run_in_executor(self.io_executor, body.write, chunk)
+            else:
+                body.write(chunk)
+        body.seek(0)
+        return body
+
+    def _environ(self, scope, body):
+        path = scope.get('path', '/')
+        root = scope.get('root_path', '')
+        if root and path.startswith(root):
+            path = path[len(root):]
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        body.seek(0, 2)
+        length = body.tell()
+        body.seek(0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': root.encode('utf-8').decode('latin-1'),
+            'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': str(server[0]),
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'CONTENT_LENGTH': str(length),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+            'wsgi.file_wrapper': FileWrapper,
+        }
+        for name, value in scope.get('headers', []):
+            key = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if key == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+            elif key != 'CONTENT_LENGTH':
+                key = f'HTTP_{key}'
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    def _start(self, environ):
+        """Run the app up to its first body chunk (start_response may be lazy)."""
+        response = _Response()
+        result = self.wsgi_app(environ, response.start_response)
+        if isinstance(result, FileWrapper):
+            result.block_size = self.file_block_size
+        iterator = iter(result)
+        first = next(iterator, _DONE)
+        return response, result, iterator, first
+
+    async def _disconnected(self, receive):
+        # The body has been read in full, so all that can arrive is the disconnect.
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    async def _run(self, scope, body, receive, send):
+        loop = asyncio.get_running_loop()
+        environ = self._environ(scope, body)
+        response, result, iterator, chunk = await loop.run_in_executor(self.executor, self._start, environ)
+        # File reads do not need a view thread.
+        executor = self.io_executor if isinstance(result, FileWrapper) else self.executor
+        disconnected = asyncio.ensure_future(self._disconnected(receive))
+        try:
+            status = int(response.status.split(' ', 1)[0])
+            await send({
+                'type': 'http.response.start',
+                'status': status,
+                'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in response.headers],
+            })
+            for data in response.written:
+                await send({'type': 'http.response.body', 'body': data, 'more_body': True})
+            while chunk is not _DONE:
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                pending = loop.run_in_executor(executor, next, iterator, _DONE)
+                await asyncio.wait((pending, disconnected), return_when=asyncio.FIRST_COMPLETED)
+                if disconnected.done():
+                    # A generator cannot be closed while next() runs in it, so
+                    # let the current chunk finish, then stop pulling.
+                    with contextlib.suppress(Exception):
+                        await pending
+                    return
+                chunk = pending.result()
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            disconnected.cancel()
+            if hasattr(result, 'close'):
+                await loop.run_in_executor(executor, result.close)
+
+    async def _send_simple(self, send, status, text):
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'text/plain'), (b'content-length', str(len(text)).encode())]})
+        await send({'type': 'http.response.body', 'body': text})
@@ -0,0 +1,136 @@
+import csv
+import io
+import json
+import os
+import threading
+import zipfile
+from uuid import uuid4
+
+from werkzeug.utils import secure_filename
+
+PRODUCT_FIELDS = ['id', 'name', 'price', 'image', 'description']
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+
+
+def detect_format(filename):
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def read_records(stream, fmt):
+    """Yield dicts from a text stream of CSV (with header) or JSON lines."""
+    if fmt == 'jsonl':
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    else:
+        yield from csv.DictReader(stream)
+
+
+def write_records(records, fmt, fields=PRODUCT_FIELDS):
+    """Yield the export as text chunks, one record at a time."""
+    if fmt == 'jsonl':
+        for record in records:
+            yield json.dumps({field: record[field] for field in fields}, ensure_ascii=False) + '\n'
+        return
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+    for record in records:
+        writer.writerow(record)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ImageSource:
+    """Images to import, from a directory or a ZIP archive, looked up by base name.
+
+    Raises ValueError if ``path`` is neither. Call ``close()`` (or use it as a
+    context manager) when done to close the archive handles opened by workers.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.is_archive = zipfile.is_zipfile(path)
+        self._local = threading.local()
+        self._archives = []
+        self._lock = threading.Lock()
+        if self.is_archive:
+            with zipfile.ZipFile(path) as archive:
+                self.members = {os.path.basename(name): name
+                                for name in archive.namelist() if not name.endswith('/')}
+        elif os.path.isdir(path):
+            self.members = {entry.name: entry.path for entry in os.scandir(path) if entry.is_file()}
+        else:
+            raise ValueError(f"'{os.path.basename(path)}' is not a ZIP archive or a directory.")
+
+    def open(self, name):
+        member = self.members[os.path.basename(name)]
+        if not self.is_archive:
+            return open(member, 'rb')
+        # A ZipFile handle must not be shared between threads.
+        archive = getattr(self._local, 'archive', None)
+        if archive is None:
+            archive = self._local.archive = zipfile.ZipFile(self.path)
+            with self._lock:
+                self._archives.append(archive)
+        return archive.open(member)
+
+    def close(self):
+        with self._lock:
+            archives, self._archives = self._archives, []
+            self._local = threading.local()
+        for archive in archives:
+            archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __contains__(self, name):
+        return os.path.basename(name) in self.members
+
+
+def _copy_image(source, name, storage):
+    filename = secure_filename(os.path.basename(name))
+    if not filename or filename.rsplit('.', 1)[-1].lower() not in IMAGE_EXTENSIONS:
+        raise ValueError(f"'{name}' is not an allowed image type.")
+    with source.open(name) as src:
+        return storage.save(f"{uuid4().hex[:12]}-{filename}", src)
+
+
+def copy_images(pool, source, names, storage):
+    """Copy images into an upload storage backend on a thread pool.
+
+    Returns ({name: stored filename}, {name: error}).
+    """
+    def copy(name):
+        if name not in source:
+            return name, None, 'not found in image source'
+        try:
+            return name, _copy_image(source, name, storage), None
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile) as exc:
+            return name, None, str(exc)
+
+    stored, errors = {}, {}
+    for name, filename, error in pool.map(copy, [n for n in dict.fromkeys(names) if n]):
+        if error:
+            errors[name] = error
+        else:
+            stored[name] = filename
+    return stored, errors
@@ -0,0 +1,152 @@
+import html
+import re
+
+from markupsafe import escape
+
+# Markdown subset for blog posts and news articles. The source is HTML-escaped
+# before any markup is recognised, so the only tags in the output are the ones
+# emitted here, and links and images are limited to safe URL schemes.
+SAFE_SCHEMES = ('http', 'https', 'mailto')
+
+_HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+_RULE_RE = re.compile(r'^\s{0,3}([-*_])(\s*\1){2,}\s*$')
+_BULLET_RE = re.compile(r'^\s{0,3}[-*+]\s+(.*)$')
+_ORDERED_RE = re.compile(r'^\s{0,3}\d{1,9}[.)]\s+(.*)$')
+_FENCE_RE = re.compile(r'^\s{0,3}(```|~~~)')
+_QUOTE_RE = re.compile(r'^\s{0,3}&gt;\s?(.*)$')
+
+_CODE_SPAN_RE = re.compile(r'(`+)(.+?)\1')
+_IMAGE_RE = re.compile(r'!\[([^\]]*)\]\(\s*([^)\s]+)(?:\s+&#34;[^)]*&#34;)?\s*\)')
+_LINK_RE = re.compile(r'\[([^\]]+)\]\(\s*([^)\s]+)(?:\s+&#34;[^)]*&#34;)?\s*\)')
+_AUTOLINK_RE = re.compile(r'&lt;((?:https?://|mailto:)[^\s&]+)&gt;')
+_STRONG_RE = re.compile(r'(\*\*|__)(?=\S)(.+?)(?<=\S)\1')
+_EM_RE = re.compile(r'(?<![\w*])([*_])(?=\S)(.+?)(?<=\S)\1(?![\w*])')
+_STRIKE_RE = re.compile(r'~~(?=\S)(.+?)(?<=\S)~~')
+_TAG_RE = re.compile(r'<[^>]*>')
+_STASHED_RE = re.compile(r'\x00(\d+)\x00')
+
+
+def safe_url(url):
+    """Return the (escaped) URL if its scheme is allowed, else None."""
+    raw = re.sub(r'[\x00-\x20]', '', html.unescape(url)).lower()
+    scheme = re.match(r'^([a-z][a-z0-9+.-]*):', raw)
+    if scheme and scheme.group(1) not in SAFE_SCHEMES:
+        return None
+    return url
+
+
+def _emphasis(text):
+    text = _STRONG_RE.sub(r'<strong>\2</strong>', text)
+    text = _EM_RE.sub(r'<em>\2</em>', text)
+    return _STRIKE_RE.sub(r'<del>\1</del>', text)
+
+
+def _inline(text):
+    """Inline markup on already-escaped text."""
+    # Finished fragments are set aside so later patterns cannot match inside
+    # code or URLs.
+    stashed = []
+
+    def stash(fragment):
+        stashed.append(fragment)
+        return f"\x00{len(stashed) - 1}\x00"
+
+    def image(match):
+        if '\x00' in match.group(2):
+            # A code span inside the URL wins over the image.
+            return match.group(0)
+        url = safe_url(match.group(2))
+        return stash(f'<img src="{url}" alt="{match.group(1)}">') if url else match.group(1)
+
+    def link(match):
+        if '\x00' in match.group(2):
+            return match.group(0)
+        url = safe_url(match.group(2))
+        if not url:
+            return match.group(1)
+        return stash(f'<a href="{url}" rel="nofollow noopener">{_emphasis(match.group(1))}</a>')
+
+    text = _CODE_SPAN_RE.sub(lambda m: stash(f"<code>{m.group(2).strip()}</code>"), text)
+    text = _IMAGE_RE.sub(image, text)
+    text = _LINK_RE.sub(link, text)
+    text = _AUTOLINK_RE.sub(lambda m: stash(f'<a href="{m.group(1)}" rel="nofollow noopener">{m.group(1)}</a>'), text)
+    text = _emphasis(text)
+    text = re.sub(r' {2,}\n', '<br>\n', text)
+    # Link text can itself hold stashed code spans.
+    while _STASHED_RE.search(text):
+        text = _STASHED_RE.sub(lambda m: stashed[int(m.group(1))], text)
+    return text
+
+
+def _blocks(lines):
+    out = []
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if not line.strip():
+            i += 1
+            continue
+        if _FENCE_RE.match(line):
+            fence = _FENCE_RE.match(line).group(1)
+            body = []
+            i += 1
+            while i < len(lines) and not lines[i].lstrip().startswith(fence):
+                body.append(lines[i])
+                i += 1
+            out.append(f"<pre><code>{chr(10).join(body)}</code></pre>")
+            i += 1
+            continue
+        heading = _HEADING_RE.match(line)
+        if heading:
+            level = len(heading.group(1))
+            out.append(f"<h{level}>{_inline(heading.group(2))}</h{level}>")
+            i += 1
+            continue
+        if _RULE_RE.match(line):
+            out.append('<hr>')
+            i += 1
+            continue
+        if _QUOTE_RE.match(line):
+            quoted = []
+            while i < len(lines) and _QUOTE_RE.match(lines[i]):
+                quoted.append(_QUOTE_RE.match(lines[i]).group(1))
+                i += 1
+            out.append(f"<blockquote>{_blocks(quoted)}</blockquote>")
+            continue
+        for pattern, other, tag in ((_BULLET_RE, _ORDERED_RE, 'ul'), (_ORDERED_RE, _BULLET_RE, 'ol')):
+            if pattern.match(line):
+                items = []
+                while i < len(lines) and lines[i].strip() and not other.match(lines[i]):
+                    item = pattern.match(lines[i])
+                    if item:
+                        items.append(item.group(1))
+                    elif items:
+                        items[-1] += '\n' + lines[i].strip()
+                    i += 1
+                out.append(f"<{tag}>" + ''.join(f"<li>{_inline(item)}</li>" for item in items) + f"</{tag}>")
+                break
+        else:
+            paragraph = []
+            while i < len(lines) and lines[i].strip() and not (
+                    _HEADING_RE.match(lines[i]) or _FENCE_RE.match(lines[i]) or _RULE_RE.match(lines[i])):
+                paragraph.append(lines[i])
+                i += 1
+            out.append(f"<p>{_inline(chr(10).join(paragraph).strip())}</p>")
+    return '\n'.join(out)
+
+
+def render_markdown(text):
+    """Convert Markdown source to sanitized HTML."""
+    # NUL is reserved for the inline placeholders.
+    text = (text or '').replace('\x00', '').replace('\r\n', '\n').replace('\r', '\n')
+    source = str(escape(text))
+    return _blocks(source.split('\n'))
+
+
+def excerpt(rendered, length=200):
+    """Plain-text summary of rendered HTML, cut at a word boundary."""
+    text = ' '.join(html.unescape(_TAG_RE.sub(' ', rendered)).split())
+    if len(text) <= length:
+        return text
+    cut = text[:length + 1].rsplit(' ', 1)[0] if ' ' in text[:length + 1] else text[:length]
+    return cut.rstrip(' ,.;:') + '…'
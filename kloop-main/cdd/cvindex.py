@@ -0,0 +1,183 @@
+import os
+import re
+import unicodedata
+import zipfile
+import zlib
+from xml.etree import ElementTree
+
+import sqlalchemy as sa
+from markupsafe import Markup, escape
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # fall back to the stdlib parser below
+    PdfReader = None
+
+WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+MAX_TEXT_LENGTH = 200_000
+
+_STREAM_RE = re.compile(rb'stream\r?\n(.*?)\r?\nendstream', re.S)
+_TEXT_BLOCK_RE = re.compile(rb'BT(.*?)ET', re.S)
+_TEXT_OP_RE = re.compile(rb'\[(.*?)\]\s*TJ|\(((?:\\.|[^\\)])*)\)\s*(?:Tj|\'|")', re.S)
+_STRING_RE = re.compile(rb'\(((?:\\.|[^\\)])*)\)', re.S)
+_PDF_ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f',
+                b'(': b'(', b')': b')', b'\\': b'\\'}
+_WHITESPACE_RE = re.compile(r'\s+')
+_TOKEN_RE = re.compile(r'\w+', re.U)
+
+
+def _docx_text(path):
+    with zipfile.ZipFile(path) as archive:
+        root = ElementTree.fromstring(archive.read('word/document.xml'))
+    paragraphs = []
+    for paragraph in root.iter(f'{WORD_NS}p'):
+        parts = [node.text or '' for node in paragraph.iter(f'{WORD_NS}t')]
+        if parts:
+            paragraphs.append(''.join(parts))
+    return '\n'.join(paragraphs)
+
+
+def _unescape_pdf_string(raw):
+    out = bytearray()
+    i = 0
+    while i < len(raw):
+        char = raw[i:i + 1]
+        if char == b'\\' and i + 1 < len(raw):
+            following = raw[i + 1:i + 2]
+            octal = re.match(rb'[0-7]{1,3}', raw[i + 1:i + 4])
+            if octal:
+                out.append(int(octal.group(), 8) & 0xFF)
+                i += 1 + len(octal.group())
+                continue
+            out += _PDF_ESCAPES.get(following, following)
+            i += 2
+            continue
+        out += char
+        i += 1
+    return out.decode('latin-1')
+
+
+def _pdf_text_fallback(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    chunks = []
+    for match in _STREAM_RE.finditer(data):
+        stream = match.group(1)
+        try:
+            stream = zlib.decompress(stream)
+        except zlib.error:
+            pass
+        for block in _TEXT_BLOCK_RE.finditer(stream):
+            for op in _TEXT_OP_RE.finditer(block.group(1)):
+                if op.group(1) is not None:
+                    chunks.append(''.join(_unescape_pdf_string(s) for s in _STRING_RE.findall(op.group(1))))
+                else:
+                    chunks.append(_unescape_pdf_string(op.group(2)))
+            chunks.append('\n')
+    return ' '.join(chunks)
+
+
+def _pdf_text(path):
+    if PdfReader is None:
+        return _pdf_text_fallback(path)
+    reader = PdfReader(path)
+    return '\n'.join(page.extract_text() or '' for page in reader.pages)
+
+
+def normalize_text(text):
+    text = unicodedata.normalize('NFKC', text)
+    text = ''.join(ch if ch.isprintable() or ch.isspace() else ' ' for ch in text)
+    return _WHITESPACE_RE.sub(' ', text).strip()[:MAX_TEXT_LENGTH]
+
+
+def extract_text(path):
+    """Return the normalized text of a CV, or '' for unsupported files.
+
+    Runs in worker processes, so it only touches the file system.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.docx':
+        text = _docx_text(path)
+    elif extension == '.pdf':
+        text = _pdf_text(path)
+    elif extension in ('.txt', '.md'):
+        with open(path, encoding='utf-8', errors='replace') as f:
+            text = f.read()
+    else:
+        return ''
+    return normalize_text(text)
+
+
+def extract_safely(path):
+    """Process pool entry point: returns (text, error) for one path."""
+    try:
+        return extract_text(path), None
+    except Exception as exc:
+        return '', f"{type(exc).__name__}: {exc}"
+
+
+# Full-text index: an external-content FTS5 table over applied_job.cv_text,
+# kept in sync by triggers so application code only ever writes cv_text.
+INDEX_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS applied_job_fts USING fts5(
+        cv_text, job_id UNINDEXED,
+        content='applied_job', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS applied_job_fts_ai AFTER INSERT ON applied_job
+        WHEN new.cv_text IS NOT NULL BEGIN
+        INSERT INTO applied_job_fts(rowid, cv_text, job_id) VALUES (new.id, new.cv_text, new.job_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS applied_job_fts_ad AFTER DELETE ON applied_job
+        WHEN old.cv_text IS NOT NULL BEGIN
+        INSERT INTO applied_job_fts(applied_job_fts, rowid, cv_text, job_id)
+        VALUES ('delete', old.id, old.cv_text, old.job_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS applied_job_fts_au AFTER UPDATE OF cv_text, job_id ON applied_job BEGIN
+        INSERT INTO applied_job_fts(applied_job_fts, rowid, cv_text, job_id)
+        SELECT 'delete', old.id, old.cv_text, old.job_id WHERE old.cv_text IS NOT NULL;
+        INSERT INTO applied_job_fts(rowid, cv_text, job_id)
+        SELECT new.id, new.cv_text, new.job_id WHERE new.cv_text IS NOT NULL;
+    END""",
+]
+
+DROP_INDEX_DDL = [
+    'DROP TRIGGER IF EXISTS applied_job_fts_au',
+    'DROP TRIGGER IF EXISTS applied_job_fts_ad',
+    'DROP TRIGGER IF EXISTS applied_job_fts_ai',
+    'DROP TABLE IF EXISTS applied_job_fts',
+]
+
+
+def ensure_index(connection):
+    for statement in INDEX_DDL:
+        connection.execute(sa.text(statement))
+
+
+def rebuild_index(connection):
+    connection.execute(sa.text("INSERT INTO applied_job_fts(applied_job_fts) VALUES ('rebuild')"))
+
+
+def match_expression(query):
+    """Turn free text into an FTS5 query that ORs quoted prefix terms."""
+    tokens = _TOKEN_RE.findall(unicodedata.normalize('NFKC', query))
+    return ' OR '.join(f'"{token}"*' for token in tokens)
+
+
+def search(connection, job_id, query, limit=200):
+    """Ranked matches for one posting as (applied_job_id, score, snippet)."""
+    expression = match_expression(query)
+    if not expression:
+        return []
+    rows = connection.execute(sa.text(
+        "SELECT rowid, bm25(applied_job_fts) AS score, "
+        "snippet(applied_job_fts, 0, char(2), char(3), ' … ', 16) "
+        "FROM applied_job_fts "
+        "WHERE applied_job_fts MATCH :expression AND job_id = :job_id "
+        "ORDER BY score LIMIT :limit"
+    ), {'expression': expression, 'job_id': job_id, 'limit': limit})
+    return [(row[0], -row[1], row[2]) for row in rows]
+
+
+def highlight(snippet):
+    """Escape a search snippet and turn its match markers into <mark> tags."""
+    return Markup(str(escape(snippet)).replace('\x02', '<mark>').replace('\x03', '</mark>'))
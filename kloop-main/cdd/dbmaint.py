@@ -0,0 +1,131 @@
+import glob
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+
+class BackupRestarted(Exception):
+    pass
+
+
+def backup(connect, directory, prefix='backup', pages=256, pause=0.05, max_restarts=3, progress=None):
+    """Copy the database to ``directory`` with the online backup API.
+
+    The copy is made ``pages`` pages at a time with a ``pause`` between
+    steps, so other connections can read and write in between. A write by
+    another connection restarts the copy; after ``max_restarts`` restarts
+    the rest is copied in one step. The result is checked with
+    ``PRAGMA quick_check`` and only then renamed into place.
+    Returns the backup's path.
+    """
+    os.makedirs(directory, exist_ok=True)
+    name = f"{prefix}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.db"
+    final = os.path.join(directory, name)
+    partial = final + '.part'
+    source = connect()
+    target = sqlite3.connect(partial)
+    restarts = [0, None]
+
+    def step(status, remaining, total):
+        if restarts[1] is not None and remaining > restarts[1]:
+            restarts[0] += 1
+            if restarts[0] > max_restarts:
+                raise BackupRestarted()
+        restarts[1] = remaining
+        if progress:
+            progress(total - remaining, total)
+        time.sleep(pause)
+
+    try:
+        try:
+            source.backup(target, pages=pages, progress=step)
+        except BackupRestarted:
+            source.backup(target, pages=-1)
+        result = target.execute('PRAGMA quick_check').fetchone()[0]
+        if result != 'ok':
+            raise sqlite3.DatabaseError(f"Backup failed its check: {result}")
+    except BaseException:
+        target.close()
+        source.close()
+        os.unlink(partial)
+        raise
+    target.close()
+    source.close()
+    os.replace(partial, final)
+    return final
+
+
+def prune_backups(directory, prefix='backup', keep=7):
+    """Delete all but the newest ``keep`` backups; returns the deleted paths."""
+    backups = sorted(glob.glob(os.path.join(directory, f'{prefix}-*.db')))
+    removed = backups[:-keep] if keep else backups
+    for path in removed:
+        os.unlink(path)
+    return removed
+
+
+def pragma(connection, name):
+    return connection.execute(f'PRAGMA {name}').fetchone()[0]
+
+
+def incremental_vacuum(connection, pages=500, pause=0.05, limit=None):
+    """Return free pages to the filesystem a few at a time.
+
+    Each ``PRAGMA incremental_vacuum(pages)`` is its own short write
+    transaction. Needs auto_vacuum=INCREMENTAL (see enable_incremental_vacuum);
+    returns None if the database is not in that mode, else pages freed.
+    """
+    if pragma(connection, 'auto_vacuum') != 2:
+        return None
+    freed = 0
+    free = pragma(connection, 'freelist_count')
+    while free and (limit is None or freed < limit):
+        step = min(pages, free) if limit is None else min(pages, free, limit - freed)
+        connection.execute(f'PRAGMA incremental_vacuum({step})').fetchall()
+        remaining = pragma(connection, 'freelist_count')
+        if remaining >= free:
+            break
+        freed += free - remaining
+        free = remaining
+        time.sleep(pause)
+    return freed
+
+
+def enable_incremental_vacuum(connection):
+    """Switch to auto_vacuum=INCREMENTAL. Takes a full VACUUM, which holds an
+    exclusive lock for its duration, so run it once in a quiet period."""
+    connection.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    connection.execute('VACUUM')
+
+
+def optimize(connection, full=False, analysis_limit=400):
+    """Refresh planner statistics. PRAGMA optimize only analyzes tables whose
+    statistics look stale, sampling at most ``analysis_limit`` rows per index;
+    ``full`` runs a complete ANALYZE instead."""
+    if full:
+        connection.execute('ANALYZE')
+    else:
+        connection.execute(f'PRAGMA analysis_limit = {int(analysis_limit)}')
+        connection.execute('PRAGMA optimize')
+
+
+def integrity_check(connection, quick=False, max_errors=100):
+    """Return the problems found (empty when the database is fine)."""
+    name = 'quick_check' if quick else 'integrity_check'
+    rows = [row[0] for row in connection.execute(f'PRAGMA {name}({int(max_errors)})')]
+    rows += [f"foreign key: {table} row {rowid} -> {parent}"
+             for table, rowid, parent, _ in connection.execute('PRAGMA foreign_key_check')]
+    return [row for row in rows if row != 'ok']
+
+
+def checkpoint(connection, mode='PASSIVE'):
+    """Run a WAL checkpoint; returns (busy, wal pages, checkpointed pages), or
+    None if the database is not in WAL mode. PASSIVE never waits for readers
+    or writers; TRUNCATE waits and then empties the WAL file."""
+    if pragma(connection, 'journal_mode') != 'wal':
+        return None
+    mode = mode.upper()
+    if mode not in ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'):
+        raise ValueError(f"Unknown checkpoint mode: {mode}")
+    return tuple(connection.execute(f'PRAGMA wal_checkpoint({mode})').fetchone())
@@ -0,0 +1,189 @@
+import hashlib
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from xml.sax.saxutils import escape, quoteattr
+
+ATOM_NS = 'http://www.w3.org/2005/Atom'
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+EPOCH = datetime(1970, 1, 1)
+
+
+def _utc(value):
+    """Naive datetimes in the database are UTC."""
+    value = value or EPOCH
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def _timestamp(value):
+    return _utc(value).isoformat().replace('+00:00', 'Z')
+
+
+class Entry:
+    __slots__ = ('id', 'title', 'url', 'updated', 'summary', 'author')
+
+    def __init__(self, id, title, url, updated, summary='', author=None):
+        self.id = id
+        self.title = title
+        self.url = url
+        self.updated = updated
+        self.summary = summary
+        self.author = author
+
+
+def atom_feed(feed_id, title, url, self_url, entries):
+    """Return (xml, last modified) for an Atom feed of ``entries``, newest first."""
+    entries = sorted(entries, key=lambda e: (_utc(e.updated), e.id), reverse=True)
+    updated = max((_utc(e.updated) for e in entries), default=_utc(None))
+    parts = [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        f'<feed xmlns="{ATOM_NS}">',
+        f'<id>{escape(feed_id)}</id>',
+        f'<title>{escape(title)}</title>',
+        f'<updated>{_timestamp(updated)}</updated>',
+        f'<link rel="alternate" href={quoteattr(url)}/>',
+        f'<link rel="self" href={quoteattr(self_url)}/>',
+    ]
+    for entry in entries:
+        parts.append('<entry>')
+        parts.append(f'<id>{escape(entry.id)}</id>')
+        parts.append(f'<title>{escape(entry.title)}</title>')
+        parts.append(f'<link rel="alternate" href={quoteattr(entry.url)}/>')
+        parts.append(f'<updated>{_timestamp(entry.updated)}</updated>')
+        if entry.author:
+            parts.append(f'<author><name>{escape(entry.author)}</name></author>')
+        if entry.summary:
+            parts.append(f'<summary>{escape(entry.summary)}</summary>')
+        parts.append('</entry>')
+    parts.append('</feed>')
+    return '\n'.join(parts), updated
+
+
+def sitemap_urls(urls):
+    """Return (<url> elements, last modified) for (location, lastmod) pairs."""
+    parts = []
+    updated = _utc(None)
+    for location, lastmod in urls:
+        if lastmod:
+            updated = max(updated, _utc(lastmod))
+            parts.append(f'<url><loc>{escape(location)}</loc><lastmod>{_timestamp(lastmod)}</lastmod></url>')
+        else:
+            parts.append(f'<url><loc>{escape(location)}</loc></url>')
+    return '\n'.join(parts), updated
+
+
+def sitemap(sections):
+    """Join sections from sitemap_urls into one document."""
+    body = '\n'.join(part for part, _ in sections if part)
+    updated = max((modified for _, modified in sections), default=_utc(None))
+    return (f'<?xml version="1.0" encoding="utf-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n{body}\n</urlset>',
+            updated)
+
+
+def _ical_text(value):
+    return (value or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,') \
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def _ical_fold(line):
+    """Split a content line into 75-octet pieces (RFC 5545, 3.1)."""
+    data = line.encode('utf-8')
+    pieces = []
+    while len(data) > 75:
+        cut = 75 if not pieces else 74
+        # Do not split a multi-byte character
+        while cut and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        pieces.append(data[:cut].decode('utf-8'))
+        data = data[cut:]
+    pieces.append(data.decode('utf-8'))
+    return '\r\n '.join(pieces)
+
+
+class CalendarEvent:
+    __slots__ = ('uid', 'title', 'date', 'location', 'description', 'url', 'updated')
+
+    def __init__(self, uid, title, date, location='', description='', url=None, updated=None):
+        self.uid = uid
+        self.title = title
+        self.date = date
+        self.location = location
+        self.description = description
+        self.url = url
+        self.updated = updated
+
+
+def ical_calendar(name, events, product_id='-//AMCO//Events//EN'):
+    """Return (text, last modified) for an iCalendar of all-day events."""
+    updated = max((_utc(e.updated) for e in events), default=_utc(None))
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', f'PRODID:{product_id}', 'CALSCALE:GREGORIAN',
+             f'X-WR-CALNAME:{_ical_text(name)}']
+    for event in events:
+        lines += [
+            'BEGIN:VEVENT',
+            f'UID:{event.uid}',
+            f"DTSTAMP:{_utc(event.updated).strftime('%Y%m%dT%H%M%SZ')}",
+            f"DTSTART;VALUE=DATE:{event.date.strftime('%Y%m%d')}",
+            f"DTEND;VALUE=DATE:{(event.date + timedelta(days=1)).strftime('%Y%m%d')}",
+            f'SUMMARY:{_ical_text(event.title)}',
+        ]
+        if event.location:
+            lines.append(f'LOCATION:{_ical_text(event.location)}')
+        if event.description:
+            lines.append(f'DESCRIPTION:{_ical_text(event.description)}')
+        if event.url:
+            lines.append(f'URL:{event.url}')
+        lines.append('END:VEVENT')
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(_ical_fold(line) for line in lines) + '\r\n', updated
+
+
+class Document:
+    __slots__ = ('body', 'etag', 'last_modified', 'built_at')
+
+    def __init__(self, body, last_modified):
+        self.body = body.encode('utf-8') if isinstance(body, str) else body
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        self.last_modified = last_modified
+        self.built_at = time.monotonic()
+
+
+class DocumentCache:
+    """Generated documents kept until a write invalidates them.
+
+    Each name has a builder returning (body, last modified). Documents are
+    built on first use and rebuilt only after ``invalidate()`` names them,
+    or once they are older than ``max_age`` seconds, which picks up writes
+    made by other processes. A document can be assembled from others with
+    ``get()``, so invalidating one part rebuilds only that part and the
+    documents it is joined into.
+    """
+
+    def __init__(self, max_age=300):
+        self.max_age = max_age
+        self.builders = {}
+        self.parents = {}
+        self.documents = {}
+        self.lock = threading.RLock()
+
+    def register(self, name, builder, parts=()):
+        self.builders[name] = builder
+        for part in parts:
+            self.parents.setdefault(part, set()).add(name)
+
+    def get(self, name):
+        with self.lock:
+            document = self.documents.get(name)
+            if document is None or time.monotonic() - document.built_at > self.max_age:
+                document = self.documents[name] = Document(*self.builders[name]())
+            return document
+
+    def invalidate(self, *names):
+        with self.lock:
+            pending = list(names)
+            while pending:
+                name = pending.pop()
+                self.documents.pop(name, None)
+                pending.extend(self.parents.get(name, ()))
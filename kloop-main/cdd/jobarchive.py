@@ -0,0 +1,62 @@
+import json
+import os
+import shutil
+import zipfile
+from contextlib import closing
+from datetime import date, datetime
+
+MANIFEST = 'job.json'
+APPLICANTS = 'applicants.jsonl'
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot archive {type(value).__name__}")
+
+
+def write(fileobj, job, applicants, open_cv):
+    """Pack a job posting and its applications into a zip written to ``fileobj``.
+
+    ``job`` and each of ``applicants`` are dicts of column values. An
+    applicant's CV, named by its ``cv_name``, is read from ``open_cv(name)``
+    and stored as ``cvs/<id>/<name>``; its member name is recorded as
+    ``cv_member``, or None if the file was missing. Returns the number of
+    CVs packed.
+    """
+    packed = 0
+    with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=6) as bundle:
+        bundle.writestr(MANIFEST, json.dumps(job, default=_default))
+        lines = []
+        for applicant in applicants:
+            applicant = dict(applicant)
+            name = applicant.pop('cv_name', None)
+            applicant['cv_member'] = None
+            if name:
+                member = f"cvs/{applicant['id']}/{os.path.basename(name)}"
+                try:
+                    with closing(open_cv(name)) as source, bundle.open(member, 'w') as target:
+                        shutil.copyfileobj(source, target, 1024 * 1024)
+                    applicant['cv_member'] = member
+                    packed += 1
+                except FileNotFoundError:
+                    pass
+            lines.append(json.dumps(applicant, default=_default))
+        bundle.writestr(APPLICANTS, '\n'.join(lines))
+    return packed
+
+
+def read(file):
+    """(job, applicants) from an archive, with values as written (dates as ISO strings)."""
+    with zipfile.ZipFile(file) as bundle:
+        job = json.loads(bundle.read(MANIFEST))
+        applicants = [json.loads(line) for line in bundle.read(APPLICANTS).decode('utf-8').splitlines() if line]
+    return job, applicants
+
+
+def verify(file):
+    """Raise if any member of the archive fails its CRC check."""
+    with zipfile.ZipFile(file) as bundle:
+        bad = bundle.testzip()
+    if bad is not None:
+        raise zipfile.BadZipFile(f"Corrupt member in archive: {bad}")
@@ -0,0 +1,84 @@
+import os
+import socketserver
+import threading
+import time
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP dialogue: accepts every message and hands it to the server."""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.reply('220 mailsink ready')
+        sender, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb in ('HELO', 'EHLO'):
+                self.reply('250 mailsink')
+            elif verb == 'MAIL':
+                sender, recipients = command.split(':', 1)[1].strip(), []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                recipients.append(command.split(':', 1)[1].strip())
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b'.\r\n', b'.\n'):
+                        break
+                    if data.startswith(b'..'):
+                        data = data[1:]
+                    lines.append(data)
+                self.server.deliver(sender, recipients, b''.join(lines))
+                self.reply('250 OK')
+            elif verb == 'RSET':
+                sender, recipients = None, []
+                self.reply('250 OK')
+            elif verb == 'NOOP':
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class MailSink(socketserver.ThreadingTCPServer):
+    """Local SMTP stand-in that keeps every message it receives.
+
+    Messages are kept in ``self.messages`` and, if ``directory`` is given,
+    written there as ``.eml`` files so they can be inspected from tests.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='localhost', port=8025, directory=None):
+        super().__init__((host, port), _SMTPHandler)
+        self.directory = directory
+        self.messages = []
+        self._lock = threading.Lock()
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def deliver(self, sender, recipients, data):
+        with self._lock:
+            self.messages.append({'from': sender, 'to': recipients, 'data': data})
+            if self.directory:
+                filename = f"{time.time():.6f}-{len(self.messages)}.eml"
+                with open(os.path.join(self.directory, filename), 'wb') as f:
+                    f.write(data)
+
+    def start(self):
+        """Serve in a background thread; returns the bound port."""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self.server_address[1]
@@ -0,0 +1,141 @@
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r'[^\W_]{2,}', re.U)
+
+STOP_WORDS = frozenset('''
+a about above after again all also an and any are as at be been before being below
+between both but by can could did do does doing down during each few for from further
+had has have having he her here hers him his how i if in into is it its itself just
+me more most my no nor not now of off on once only or other our ours out over own
+same she should so some such than that the their theirs them then there these they
+this those through to too under until up very was we were what when where which while
+who whom why will with would you your yours
+'''.split())
+
+
+def tokenize(text):
+    return [t for t in _TOKEN_RE.findall((text or '').lower()) if t not in STOP_WORDS]
+
+
+class JobMatcher:
+    """TF-IDF cosine similarity between one job posting and its applicants' CVs.
+
+    Applicant term frequencies are kept as a growing sparse (COO) matrix, so an
+    application is added in O(terms in CV). Scores for every applicant are
+    computed in one vectorized pass and cached until the next change.
+    """
+
+    def __init__(self, job_text):
+        self.job_text = job_text
+        self.vocabulary = {}
+        self.df = np.zeros(0, dtype=np.int64)
+        self.doc_ids = []
+        self.stamps = []
+        self.alive = np.zeros(0, dtype=bool)
+        self.rows = {}
+        self._doc_columns = []
+        self._pending = []
+        self._coo = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0))
+        self._scores = None
+        self.job_terms = self._term_columns(tokenize(job_text))
+        self.lock = threading.Lock()
+
+    def __contains__(self, doc_id):
+        return doc_id in self.rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def stamp(self, doc_id):
+        return self.stamps[self.rows[doc_id]]
+
+    def _term_columns(self, tokens):
+        counts = Counter(tokens)
+        columns = np.empty(len(counts), dtype=np.int64)
+        for i, term in enumerate(counts):
+            column = self.vocabulary.get(term)
+            if column is None:
+                column = self.vocabulary[term] = len(self.vocabulary)
+            columns[i] = column
+        if len(self.vocabulary) > len(self.df):
+            grown = np.zeros(max(len(self.vocabulary), 2 * len(self.df)), dtype=np.int64)
+            grown[:len(self.df)] = self.df
+            self.df = grown
+        tf = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+        return columns, tf
+
+    def add(self, doc_id, text, stamp=None):
+        if doc_id in self.rows:
+            self.remove(doc_id)
+        columns, tf = self._term_columns(tokenize(text))
+        row = len(self.doc_ids)
+        self.rows[doc_id] = row
+        self.doc_ids.append(doc_id)
+        self.stamps.append(stamp)
+        self._doc_columns.append(columns)
+        if row >= len(self.alive):
+            grown = np.zeros(max(16, 2 * len(self.alive)), dtype=bool)
+            grown[:len(self.alive)] = self.alive
+            self.alive = grown
+        self.alive[row] = True
+        self._pending.append((np.full(len(columns), row, dtype=np.int64), columns, tf))
+        self.df[columns] += 1
+        self._scores = None
+
+    def remove(self, doc_id):
+        row = self.rows.pop(doc_id, None)
+        if row is None:
+            return
+        self.alive[row] = False
+        self.df[self._doc_columns[row]] -= 1
+        self._scores = None
+
+    def _matrix(self):
+        if self._pending:
+            rows, cols, tf = self._coo
+            self._coo = (
+                np.concatenate([rows] + [p[0] for p in self._pending]),
+                np.concatenate([cols] + [p[1] for p in self._pending]),
+                np.concatenate([tf] + [p[2] for p in self._pending]),
+            )
+            self._pending = []
+        rows, cols, tf = self._coo
+        if len(self.rows) * 2 < len(self.doc_ids):
+            # Drop entries of removed applicants once they are the majority.
+            keep = self.alive[rows]
+            self._coo = (rows[keep], cols[keep], tf[keep])
+        return self._coo
+
+    def scores(self):
+        """Return (doc_ids, cosine similarities) for every live applicant."""
+        if self._scores is not None:
+            return self._scores
+        rows, cols, tf = self._matrix()
+        n_rows = len(self.doc_ids)
+        alive = self.alive[:n_rows]
+        n_terms = len(self.vocabulary)
+        idf = np.log((1.0 + alive.sum()) / (1.0 + self.df[:n_terms])) + 1.0
+
+        job_cols, job_tf = self.job_terms
+        query = np.zeros(n_terms)
+        query[job_cols] = job_tf * idf[job_cols]
+        query_norm = np.linalg.norm(query) or 1.0
+
+        weights = tf * idf[cols]
+        dots = np.bincount(rows, weights=weights * query[cols], minlength=n_rows)
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=n_rows))
+        cosine = np.divide(dots, norms * query_norm, out=np.zeros(n_rows), where=norms > 0)
+
+        live = np.flatnonzero(alive)
+        self._scores = (np.asarray(self.doc_ids, dtype=np.int64)[live], cosine[live])
+        return self._scores
+
+    def ranked(self):
+        """Return [(doc_id, score)] ordered from best to worst match."""
+        doc_ids, scores = self.scores()
+        order = np.argsort(-scores, kind='stable')
+        return list(zip(doc_ids[order].tolist(), scores[order].tolist()))
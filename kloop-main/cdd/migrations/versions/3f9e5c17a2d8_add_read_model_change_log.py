@@ -0,0 +1,66 @@
+"""Add read model change log
+
+Revision ID: 3f9e5c17a2d8
+Revises: e2b7d04a9c31
+Create Date: 2026-10-19 19:25:48.604113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9e5c17a2d8'
+down_revision = 'e2b7d04a9c31'
+branch_labels = None
+depends_on = None
+
+# The change log table and triggers as readmodel defined them at this
+# revision; a migration must not follow later edits to the module.
+CHANGE_LOG_DDL = [
+    """CREATE TABLE IF NOT EXISTS read_model_change (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name VARCHAR(20) NOT NULL,
+        row_id INTEGER NOT NULL)""",
+    """CREATE TRIGGER IF NOT EXISTS product_change_ai AFTER INSERT ON product BEGIN
+        INSERT INTO read_model_change (table_name, row_id) VALUES ('product', new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS product_change_au
+        AFTER UPDATE OF name, price, image, description ON product BEGIN
+        INSERT INTO read_model_change (table_name, row_id) VALUES ('product', new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS product_change_ad AFTER DELETE ON product BEGIN
+        INSERT INTO read_model_change (table_name, row_id) VALUES ('product', old.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS job_change_ai AFTER INSERT ON job BEGIN
+        INSERT INTO read_model_change (table_name, row_id) VALUES ('job', new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS job_change_au
+        AFTER UPDATE OF title, description, requirements, deadline, is_active ON job BEGIN
+        INSERT INTO read_model_change (table_name, row_id) VALUES ('job', new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS job_change_ad AFTER DELETE ON job BEGIN
+        INSERT INTO read_model_change (table_name, row_id) VALUES ('job', old.id);
+    END""",
+]
+
+DROP_CHANGE_LOG_DDL = [
+    'DROP TRIGGER IF EXISTS job_change_ad',
+    'DROP TRIGGER IF EXISTS job_change_au',
+    'DROP TRIGGER IF EXISTS job_change_ai',
+    'DROP TRIGGER IF EXISTS product_change_ad',
+    'DROP TRIGGER IF EXISTS product_change_au',
+    'DROP TRIGGER IF EXISTS product_change_ai',
+    'DROP TABLE IF EXISTS read_model_change',
+]
+
+
+def upgrade():
+    # Table and triggers are raw DDL; not autogenerated.
+    for statement in CHANGE_LOG_DDL:
+        op.execute(statement)
+
+
+def downgrade():
+    for statement in DROP_CHANGE_LOG_DDL:
+        op.execute(statement)
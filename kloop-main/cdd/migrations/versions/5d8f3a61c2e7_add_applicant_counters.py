@@ -0,0 +1,110 @@
+"""Add applicant counters and pre-aggregated statistics
+
+Revision ID: 5d8f3a61c2e7
+Revises: c41e7b2f0a93
+Create Date: 2026-10-19 13:25:48.903114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d8f3a61c2e7'
+down_revision = 'c41e7b2f0a93'
+branch_labels = None
+depends_on = None
+
+# The applied_job_fts sync triggers as of c41e7b2f0a93, copied here so later
+# changes to cvindex cannot alter what this revision runs.
+FTS_TRIGGERS_DDL = [
+    """CREATE TRIGGER IF NOT EXISTS applied_job_fts_ai AFTER INSERT ON applied_job
+        WHEN new.cv_text IS NOT NULL BEGIN
+        INSERT INTO applied_job_fts(rowid, cv_text, job_id) VALUES (new.id, new.cv_text, new.job_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS applied_job_fts_ad AFTER DELETE ON applied_job
+        WHEN old.cv_text IS NOT NULL BEGIN
+        INSERT INTO applied_job_fts(applied_job_fts, rowid, cv_text, job_id)
+        VALUES ('delete', old.id, old.cv_text, old.job_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS applied_job_fts_au AFTER UPDATE OF cv_text, job_id ON applied_job BEGIN
+        INSERT INTO applied_job_fts(applied_job_fts, rowid, cv_text, job_id)
+        SELECT 'delete', old.id, old.cv_text, old.job_id WHERE old.cv_text IS NOT NULL;
+        INSERT INTO applied_job_fts(rowid, cv_text, job_id)
+        SELECT new.id, new.cv_text, new.job_id WHERE new.cv_text IS NOT NULL;
+    END""",
+]
+
+DROP_FTS_TRIGGERS_DDL = [
+    'DROP TRIGGER IF EXISTS applied_job_fts_au',
+    'DROP TRIGGER IF EXISTS applied_job_fts_ad',
+    'DROP TRIGGER IF EXISTS applied_job_fts_ai',
+]
+
+
+def upgrade():
+    op.create_table('job_applicant_hourly',
+    sa.Column('job_id', sa.Integer(), nullable=False),
+    sa.Column('hour', sa.DateTime(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('job_id', 'hour')
+    )
+    op.create_table('job_applicant_breakdown',
+    sa.Column('job_id', sa.Integer(), nullable=False),
+    sa.Column('dimension', sa.String(length=20), nullable=False),
+    sa.Column('bucket', sa.String(length=20), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('job_id', 'dimension', 'bucket')
+    )
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('applicant_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('applicants_24h', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('applicants_7d', sa.Integer(), server_default='0', nullable=False))
+
+    # Rebuilding applied_job drops its FTS triggers, so recreate them after.
+    for statement in DROP_FTS_TRIGGERS_DDL:
+        op.execute(statement)
+    with op.batch_alter_table('applied_job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('applied_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_applied_job_job_id'), ['job_id'], unique=False)
+        batch_op.create_foreign_key('fk_applied_job_job_id_job', 'job', ['job_id'], ['id'])
+    for statement in FTS_TRIGGERS_DDL:
+        op.execute(statement)
+
+    # Backfill from existing applications; their application time is unknown,
+    # so they only count towards the totals.
+    op.execute("""UPDATE job SET applicant_count =
+        (SELECT COUNT(*) FROM applied_job WHERE applied_job.job_id = job.id)""")
+    op.execute("""INSERT INTO job_applicant_breakdown (job_id, dimension, bucket, count)
+        SELECT job_id, 'gender', COALESCE(NULLIF(
+            UPPER(SUBSTR(TRIM(gender), 1, 1)) || LOWER(SUBSTR(TRIM(gender), 2, 19)), ''), 'Unknown'), COUNT(*)
+        FROM applied_job GROUP BY 1, 2, 3""")
+    op.execute("""INSERT INTO job_applicant_breakdown (job_id, dimension, bucket, count)
+        SELECT job_id, 'age', CASE
+            WHEN age IS NULL THEN 'Unknown'
+            WHEN age < 18 THEN 'Under 18'
+            WHEN age < 25 THEN '18-24'
+            WHEN age < 35 THEN '25-34'
+            WHEN age < 45 THEN '35-44'
+            WHEN age < 55 THEN '45-54'
+            ELSE '55+' END, COUNT(*)
+        FROM applied_job GROUP BY 1, 2, 3""")
+
+
+def downgrade():
+    for statement in DROP_FTS_TRIGGERS_DDL:
+        op.execute(statement)
+    with op.batch_alter_table('applied_job', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_applied_job_job_id_job', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_applied_job_job_id'))
+        batch_op.drop_column('applied_at')
+    for statement in FTS_TRIGGERS_DDL:
+        op.execute(statement)
+
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.drop_column('applicants_7d')
+        batch_op.drop_column('applicants_24h')
+        batch_op.drop_column('applicant_count')
+
+    op.drop_table('job_applicant_breakdown')
+    op.drop_table('job_applicant_hourly')
@@ -0,0 +1,42 @@
+"""Make action_history.timestamp NOT NULL and index it
+
+Revision ID: 7c3d9e2a41f5
+Revises: f4c27a9e8b16
+Create Date: 2026-10-19 22:05:31.417920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from onlinemigrate import backfill, copy_and_swap
+
+
+# revision identifiers, used by Alembic.
+revision = '7c3d9e2a41f5'
+down_revision = 'f4c27a9e8b16'
+branch_labels = None
+depends_on = None
+
+
+def action_history(nullable, *indexes):
+    return sa.Table('action_history', sa.MetaData(),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('entity_type', sa.String(length=50), nullable=True),
+        sa.Column('entity_id', sa.Integer(), nullable=True),
+        sa.Column('action', sa.String(length=50), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=nullable),
+        sa.Column('details', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        *indexes
+    )
+
+
+def upgrade():
+    # action_history grows with every admin action; both steps run in
+    # batches so the table stays writable.
+    backfill('action_history', 'timestamp = CURRENT_TIMESTAMP', where='timestamp IS NULL')
+    copy_and_swap(action_history(False, sa.Index('ix_action_history_timestamp', 'timestamp')))
+
+
+def downgrade():
+    copy_and_swap(action_history(True))
@@ -0,0 +1,41 @@
+"""Add task queue
+
+Revision ID: 91a2d9fbfbfd
+Revises: 8cd2a79c2cc4
+Create Date: 2026-10-19 09:12:04.118203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '91a2d9fbfbfd'
+down_revision = '8cd2a79c2cc4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('task_queue',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_until', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('task_queue', schema=None) as batch_op:
+        batch_op.create_index('ix_task_queue_status_run_at', ['status', 'run_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('task_queue', schema=None) as batch_op:
+        batch_op.drop_index('ix_task_queue_status_run_at')
+
+    op.drop_table('task_queue')
@@ -0,0 +1,35 @@
+"""Add job_archive stubs
+
+Revision ID: a5e07c93d2b1
+Revises: 7c3d9e2a41f5
+Create Date: 2026-10-19 23:18:06.552104
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5e07c93d2b1'
+down_revision = '7c3d9e2a41f5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('job_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('applicant_count', sa.Integer(), nullable=False),
+    sa.Column('cv_count', sa.Integer(), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['job_id'], ['job.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('job_id')
+    )
+
+
+def downgrade():
+    op.drop_table('job_archive')
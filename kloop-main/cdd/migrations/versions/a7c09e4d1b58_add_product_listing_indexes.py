@@ -0,0 +1,28 @@
+"""Add product listing indexes
+
+Revision ID: a7c09e4d1b58
+Revises: 5d8f3a61c2e7
+Create Date: 2026-10-19 15:40:12.377615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c09e4d1b58'
+down_revision = '5d8f3a61c2e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.create_index('ix_product_price_id', ['price', 'id'], unique=False)
+        batch_op.create_index('ix_product_name_id', [sa.text('name COLLATE NOCASE'), 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.drop_index('ix_product_name_id')
+        batch_op.drop_index('ix_product_price_id')
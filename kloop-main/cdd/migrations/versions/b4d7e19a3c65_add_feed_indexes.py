@@ -0,0 +1,30 @@
+"""Add indexes for the feed queries
+
+Revision ID: b4d7e19a3c65
+Revises: f1a6c3d82e94
+Create Date: 2026-10-20 10:02:51.774103
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4d7e19a3c65'
+down_revision = 'f1a6c3d82e94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Plain CREATE INDEX rather than a batch copy, which would drop the change
+    # log triggers on job.
+    op.create_index(op.f('ix_blog_posts_updated_at'), 'blog_posts', ['updated_at'], unique=False)
+    op.create_index(op.f('ix_news_article_updated_at'), 'news_article', ['updated_at'], unique=False)
+    op.create_index('ix_job_is_active_updated_at', 'job', ['is_active', 'updated_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_job_is_active_updated_at', table_name='job')
+    op.drop_index(op.f('ix_news_article_updated_at'), table_name='news_article')
+    op.drop_index(op.f('ix_blog_posts_updated_at'), table_name='blog_posts')
@@ -0,0 +1,54 @@
+"""Add CV text and full-text search index
+
+Revision ID: c41e7b2f0a93
+Revises: 91a2d9fbfbfd
+Create Date: 2026-10-19 11:02:37.554810
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41e7b2f0a93'
+down_revision = '91a2d9fbfbfd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('applied_job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cv_text', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('cv_extracted_at', sa.DateTime(), nullable=True))
+
+    # FTS5 table and sync triggers; these cannot be autogenerated.
+    op.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS applied_job_fts USING fts5(
+        cv_text, job_id UNINDEXED,
+        content='applied_job', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2')""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS applied_job_fts_ai AFTER INSERT ON applied_job
+        WHEN new.cv_text IS NOT NULL BEGIN
+        INSERT INTO applied_job_fts(rowid, cv_text, job_id) VALUES (new.id, new.cv_text, new.job_id);
+    END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS applied_job_fts_ad AFTER DELETE ON applied_job
+        WHEN old.cv_text IS NOT NULL BEGIN
+        INSERT INTO applied_job_fts(applied_job_fts, rowid, cv_text, job_id)
+        VALUES ('delete', old.id, old.cv_text, old.job_id);
+    END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS applied_job_fts_au AFTER UPDATE OF cv_text, job_id ON applied_job BEGIN
+        INSERT INTO applied_job_fts(applied_job_fts, rowid, cv_text, job_id)
+        SELECT 'delete', old.id, old.cv_text, old.job_id WHERE old.cv_text IS NOT NULL;
+        INSERT INTO applied_job_fts(rowid, cv_text, job_id)
+        SELECT new.id, new.cv_text, new.job_id WHERE new.cv_text IS NOT NULL;
+    END""")
+
+
+def downgrade():
+    op.execute('DROP TRIGGER IF EXISTS applied_job_fts_au')
+    op.execute('DROP TRIGGER IF EXISTS applied_job_fts_ad')
+    op.execute('DROP TRIGGER IF EXISTS applied_job_fts_ai')
+    op.execute('DROP TABLE IF EXISTS applied_job_fts')
+
+    with op.batch_alter_table('applied_job', schema=None) as batch_op:
+        batch_op.drop_column('cv_extracted_at')
+        batch_op.drop_column('cv_text')
@@ -0,0 +1,31 @@
+"""Add item_view_hourly rollups
+
+Revision ID: c8f2d4b61e07
+Revises: a5e07c93d2b1
+Create Date: 2026-10-19 23:52:40.218337
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8f2d4b61e07'
+down_revision = 'a5e07c93d2b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('item_view_hourly',
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('hour', sa.DateTime(), nullable=False),
+    sa.Column('metric', sa.String(length=20), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('kind', 'hour', 'metric', 'item_id')
+    )
+
+
+def downgrade():
+    op.drop_table('item_view_hourly')
@@ -0,0 +1,59 @@
+"""Add updated_at columns
+
+Revision ID: d83a5f21e6c4
+Revises: b6d1e84f0c39
+Create Date: 2026-10-19 21:12:44.508317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd83a5f21e6c4'
+down_revision = 'b6d1e84f0c39'
+branch_labels = None
+depends_on = None
+
+# The read model change log triggers as of 3f9e5c17a2d8.
+CHANGE_LOG_TRIGGERS_DDL = [
+    """CREATE TRIGGER IF NOT EXISTS product_change_ai AFTER INSERT ON product BEGIN
+        INSERT INTO read_model_change (table_name, row_id) VALUES ('product', new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS product_change_au
+        AFTER UPDATE OF name, price, image, description ON product BEGIN
+        INSERT INTO read_model_change (table_name, row_id) VALUES ('product', new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS product_change_ad AFTER DELETE ON product BEGIN
+        INSERT INTO read_model_change (table_name, row_id) VALUES ('product', old.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS job_change_ai AFTER INSERT ON job BEGIN
+        INSERT INTO read_model_change (table_name, row_id) VALUES ('job', new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS job_change_au
+        AFTER UPDATE OF title, description, requirements, deadline, is_active ON job BEGIN
+        INSERT INTO read_model_change (table_name, row_id) VALUES ('job', new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS job_change_ad AFTER DELETE ON job BEGIN
+        INSERT INTO read_model_change (table_name, row_id) VALUES ('job', old.id);
+    END""",
+]
+
+TABLES = ('product', 'job', 'blog_posts', 'news_article')
+
+
+def upgrade():
+    # Plain ADD COLUMN rather than a batch copy, which would drop the change
+    # log triggers on product and job.
+    for table in TABLES:
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute(f"UPDATE {table} SET updated_at = CURRENT_TIMESTAMP")
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('updated_at')
+    # The batch copies of product and job dropped the change log triggers.
+    for statement in CHANGE_LOG_TRIGGERS_DDL:
+        op.execute(statement)
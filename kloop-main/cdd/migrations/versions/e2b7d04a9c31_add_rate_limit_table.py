@@ -0,0 +1,30 @@
+"""Add rate limit table
+
+Revision ID: e2b7d04a9c31
+Revises: a7c09e4d1b58
+Create Date: 2026-10-19 18:42:05.119268
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b7d04a9c31'
+down_revision = 'a7c09e4d1b58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('rate_limit',
+    sa.Column('key', sa.String(length=200), nullable=False),
+    sa.Column('tokens', sa.Float(), nullable=False),
+    sa.Column('allowed', sa.Boolean(), nullable=False),
+    sa.Column('updated_at', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade():
+    op.drop_table('rate_limit')
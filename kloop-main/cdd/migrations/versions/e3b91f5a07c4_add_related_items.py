@@ -0,0 +1,38 @@
+"""Add related_item lists and their cursor
+
+Revision ID: e3b91f5a07c4
+Revises: c8f2d4b61e07
+Create Date: 2026-10-20 00:41:12.903215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b91f5a07c4'
+down_revision = 'c8f2d4b61e07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('related_item',
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('related_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('kind', 'item_id', 'rank')
+    )
+    op.create_table('related_item_cursor',
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('built_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('kind')
+    )
+
+
+def downgrade():
+    op.drop_table('related_item_cursor')
+    op.drop_table('related_item')
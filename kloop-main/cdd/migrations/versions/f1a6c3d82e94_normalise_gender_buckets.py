@@ -0,0 +1,38 @@
+"""Normalise gender buckets
+
+Revision ID: f1a6c3d82e94
+Revises: e3b91f5a07c4
+Create Date: 2026-10-20 09:14:27.310468
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1a6c3d82e94'
+down_revision = 'e3b91f5a07c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Buckets written by the application used str.title() ('Non-Binary')
+    # while the 5d8f3a61c2e7 backfill capitalised only the first letter
+    # ('Non-binary'). Re-key every gender bucket the backfill's way and merge
+    # the counts; the rows cannot be rebuilt from applied_job because
+    # archived applications are still counted.
+    op.execute("""CREATE TEMPORARY TABLE gender_bucket_merge AS
+        SELECT job_id, COALESCE(NULLIF(
+            UPPER(SUBSTR(TRIM(bucket), 1, 1)) || LOWER(SUBSTR(TRIM(bucket), 2, 19)), ''), 'Unknown') AS bucket,
+            SUM(count) AS count
+        FROM job_applicant_breakdown WHERE dimension = 'gender' GROUP BY 1, 2""")
+    op.execute("DELETE FROM job_applicant_breakdown WHERE dimension = 'gender'")
+    op.execute("""INSERT INTO job_applicant_breakdown (job_id, dimension, bucket, count)
+        SELECT job_id, 'gender', bucket, count FROM gender_bucket_merge""")
+    op.execute('DROP TABLE gender_bucket_merge')
+
+
+def downgrade():
+    # The merged buckets cannot be split again.
+    pass
@@ -0,0 +1,29 @@
+"""Add events date index
+
+Revision ID: f4c27a9e8b16
+Revises: d83a5f21e6c4
+Create Date: 2026-10-19 22:03:19.664120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4c27a9e8b16'
+down_revision = 'd83a5f21e6c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_events_date'), ['date'], unique=False)
+    op.execute("UPDATE events SET updated_at = CURRENT_TIMESTAMP")
+
+
+def downgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_events_date'))
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,252 @@
+import email.parser
+import email.policy
+import hashlib
+import threading
+import time
+import uuid
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+
+def _iso(timestamp):
+    return time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(timestamp))
+
+
+class _S3Handler(BaseHTTPRequestHandler):
+    """Path-style subset of the S3 REST API; request signatures are not checked."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _target(self):
+        url = urlsplit(self.path)
+        bucket, _, key = url.path.lstrip('/').partition('/')
+        query = {k: v[0] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+        return unquote(bucket), unquote(key), query
+
+    def _send(self, status, body=b'', headers=None, content_type='application/xml'):
+        self.send_response(status)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Expose-Headers', 'ETag')
+        if body or status not in (204, 304):
+            self.send_header('Content-Type', content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _error(self, status, code, message=''):
+        body = (f'<?xml version="1.0" encoding="UTF-8"?><Error><Code>{code}</Code>'
+                f'<Message>{escape(message)}</Message></Error>').encode()
+        self._send(status, body)
+
+    def _read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            data = self._read_chunks()
+        else:
+            data = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if 'aws-chunked' in self.headers.get('Content-Encoding', ''):
+            data = self._decode_aws_chunked(data)
+        return data
+
+    def _read_chunks(self):
+        parts = []
+        while True:
+            size = int(self.rfile.readline().split(b';', 1)[0].strip() or b'0', 16)
+            if size == 0:
+                while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                    pass
+                return b''.join(parts)
+            parts.append(self.rfile.read(size))
+            self.rfile.readline()
+
+    @staticmethod
+    def _decode_aws_chunked(data):
+        parts, position = [], 0
+        while True:
+            end = data.index(b'\r\n', position)
+            size = int(data[position:end].split(b';', 1)[0], 16)
+            if size == 0:
+                return b''.join(parts)
+            parts.append(data[end + 2:end + 2 + size])
+            position = end + 2 + size + 2
+
+    def do_OPTIONS(self):
+        self._send(200, headers={
+            'Access-Control-Allow-Methods': 'GET, PUT, POST, DELETE, HEAD',
+            'Access-Control-Allow-Headers': self.headers.get('Access-Control-Request-Headers', '*'),
+        })
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        bucket, key, query = self._target()
+        store = self.server
+        if not key:
+            return self._list(bucket, query)
+        item = store.get(bucket, key)
+        if item is None:
+            if self.command == 'HEAD':
+                return self._send(404)
+            return self._error(404, 'NoSuchKey', key)
+        data, modified, etag = item
+        headers = {'ETag': etag, 'Last-Modified': formatdate(modified, usegmt=True)}
+        if 'response-content-disposition' in query:
+            headers['Content-Disposition'] = query['response-content-disposition']
+        self._send(200, data, headers, content_type='application/octet-stream')
+
+    def _list(self, bucket, query):
+        prefix = query.get('prefix', '')
+        contents = ''.join(
+            f'<Contents><Key>{escape(key)}</Key><LastModified>{_iso(modified)}</LastModified>'
+            f'<ETag>{escape(etag)}</ETag><Size>{len(data)}</Size></Contents>'
+            for key, (data, modified, etag) in self.server.items(bucket, prefix)
+        )
+        body = (f'<?xml version="1.0" encoding="UTF-8"?><ListBucketResult><Name>{escape(bucket)}</Name>'
+                f'<Prefix>{escape(prefix)}</Prefix><KeyCount>{contents.count("<Contents>")}</KeyCount>'
+                f'<IsTruncated>false</IsTruncated>{contents}</ListBucketResult>')
+        self._send(200, body.encode())
+
+    def do_PUT(self):
+        bucket, key, query = self._target()
+        data = self._read_body()
+        if not key:
+            return self._send(200)
+        if 'uploadId' in query:
+            etag = self.server.put_part(query['uploadId'], int(query['partNumber']), data)
+            return self._send(200, headers={'ETag': etag})
+        source = self.headers.get('x-amz-copy-source')
+        if source:
+            source_bucket, _, source_key = unquote(source).lstrip('/').partition('/')
+            item = self.server.get(source_bucket, source_key)
+            if item is None:
+                return self._error(404, 'NoSuchKey', source_key)
+            etag = self.server.put(bucket, key, item[0])
+            body = (f'<?xml version="1.0" encoding="UTF-8"?><CopyObjectResult>'
+                    f'<LastModified>{_iso(time.time())}</LastModified><ETag>{escape(etag)}</ETag>'
+                    f'</CopyObjectResult>')
+            return self._send(200, body.encode())
+        etag = self.server.put(bucket, key, data)
+        self._send(200, headers={'ETag': etag})
+
+    def do_POST(self):
+        bucket, key, query = self._target()
+        data = self._read_body()
+        if 'delete' in query:
+            root = ElementTree.fromstring(data)
+            keys = [el.text for el in root.iter() if el.tag.endswith('Key')]
+            for name in keys:
+                self.server.delete(bucket, name)
+            deleted = ''.join(f'<Deleted><Key>{escape(name)}</Key></Deleted>' for name in keys)
+            return self._send(200, f'<DeleteResult>{deleted}</DeleteResult>'.encode())
+        if 'uploads' in query:
+            upload_id = self.server.create_multipart(bucket, key)
+            body = (f'<InitiateMultipartUploadResult><Bucket>{escape(bucket)}</Bucket>'
+                    f'<Key>{escape(key)}</Key><UploadId>{upload_id}</UploadId>'
+                    f'</InitiateMultipartUploadResult>')
+            return self._send(200, body.encode())
+        if 'uploadId' in query:
+            etag = self.server.complete_multipart(query['uploadId'])
+            body = (f'<CompleteMultipartUploadResult><Bucket>{escape(bucket)}</Bucket>'
+                    f'<Key>{escape(key)}</Key><ETag>{escape(etag)}</ETag>'
+                    f'</CompleteMultipartUploadResult>')
+            return self._send(200, body.encode())
+        return self._form_upload(bucket, data)
+
+    def _form_upload(self, bucket, data):
+        # Browser upload with a presigned POST form: fields first, then the file.
+        header = f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode()
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(header + data)
+        fields, content, filename = {}, None, ''
+        for part in message.iter_parts():
+            name = part.get_param('name', header='content-disposition')
+            if name == 'file':
+                content = part.get_payload(decode=True) or b''
+                filename = part.get_filename() or ''
+            else:
+                fields[name] = part.get_content().strip() if part.get_content_type().startswith('text') \
+                    else part.get_payload(decode=True).decode()
+        if content is None or 'key' not in fields:
+            return self._error(400, 'InvalidArgument', 'A key field and a file are required.')
+        key = fields['key'].replace('${filename}', filename)
+        etag = self.server.put(bucket, key, content)
+        status = int(fields.get('success_action_status', 204))
+        self._send(status if status in (200, 201, 204) else 204, headers={'ETag': etag, 'Location': f'/{bucket}/{key}'})
+
+    def do_DELETE(self):
+        bucket, key, query = self._target()
+        if 'uploadId' in query:
+            self.server.abort_multipart(query['uploadId'])
+        elif key:
+            self.server.delete(bucket, key)
+        self._send(204)
+
+
+class ObjectSink(ThreadingHTTPServer):
+    """Local S3-compatible stand-in (MinIO-style, path addressing) kept in memory.
+
+    Supports what the S3 storage backend uses: put/get/head/delete, copy,
+    list, batch delete, multipart and presigned browser form uploads.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='localhost', port=9000):
+        super().__init__((host, port), _S3Handler)
+        self.objects = {}
+        self.uploads = {}
+        self._lock = threading.Lock()
+
+    def put(self, bucket, key, data):
+        etag = f'"{hashlib.md5(data).hexdigest()}"'
+        with self._lock:
+            self.objects[(bucket, key)] = (data, time.time(), etag)
+        return etag
+
+    def get(self, bucket, key):
+        with self._lock:
+            return self.objects.get((bucket, key))
+
+    def delete(self, bucket, key):
+        with self._lock:
+            self.objects.pop((bucket, key), None)
+
+    def items(self, bucket, prefix=''):
+        with self._lock:
+            return sorted((key, item) for (b, key), item in self.objects.items()
+                          if b == bucket and key.startswith(prefix))
+
+    def create_multipart(self, bucket, key):
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self.uploads[upload_id] = (bucket, key, {})
+        return upload_id
+
+    def put_part(self, upload_id, number, data):
+        with self._lock:
+            self.uploads[upload_id][2][number] = data
+        return f'"{hashlib.md5(data).hexdigest()}"'
+
+    def complete_multipart(self, upload_id):
+        with self._lock:
+            bucket, key, parts = self.uploads.pop(upload_id)
+        return self.put(bucket, key, b''.join(parts[n] for n in sorted(parts)))
+
+    def abort_multipart(self, upload_id):
+        with self._lock:
+            self.uploads.pop(upload_id, None)
+
+    def start(self):
+        """Serve in a background thread; returns the bound port."""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self.server_address[1]
@@ -0,0 +1,172 @@
+"""Migration helpers for large SQLite tables.
+
+A plain Alembic migration runs as one transaction, and on SQLite
+``batch_alter_table`` rebuilds the table with a single INSERT ... SELECT,
+so the write lock is held for the whole copy. These helpers work in key
+ranges of ``batch_size`` rows instead, each committed on its own with the
+position recorded in ``migration_checkpoint``. An interrupted
+``flask db upgrade`` resumes where it stopped when run again.
+
+They commit as they go, so everything the migration did before them is
+committed too. They need a live database connection (not ``--sql``).
+"""
+import logging
+import time
+from contextlib import contextmanager
+
+import sqlalchemy as sa
+from alembic import op
+
+CHECKPOINT_TABLE = 'migration_checkpoint'
+CHECKPOINT_DDL = f"""CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (
+    name VARCHAR(100) PRIMARY KEY,
+    position INTEGER NOT NULL,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP)"""
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+
+@contextmanager
+def _autocommit():
+    with op.get_context().autocommit_block():
+        yield op.get_bind()
+
+
+@contextmanager
+def _transaction(connection):
+    # Write lock taken up front, so a batch never fails half way on a busy database
+    connection.exec_driver_sql('BEGIN IMMEDIATE')
+    try:
+        yield
+    except BaseException:
+        connection.exec_driver_sql('ROLLBACK')
+        raise
+    connection.exec_driver_sql('COMMIT')
+
+
+def _scalar(connection, sql, *parameters):
+    return connection.exec_driver_sql(sql, parameters).scalar()
+
+
+def _checkpoint(connection, name):
+    connection.exec_driver_sql(CHECKPOINT_DDL)
+    return _scalar(connection, f'SELECT position FROM {CHECKPOINT_TABLE} WHERE name = ?', name)
+
+
+def _save_checkpoint(connection, name, position):
+    connection.exec_driver_sql(
+        f'INSERT INTO {CHECKPOINT_TABLE} (name, position, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP) '
+        'ON CONFLICT (name) DO UPDATE SET position = excluded.position, updated_at = excluded.updated_at',
+        (name, position))
+
+
+def _clear_checkpoint(connection, name):
+    connection.exec_driver_sql(f'DELETE FROM {CHECKPOINT_TABLE} WHERE name = ?', (name,))
+    if not _scalar(connection, f'SELECT count(*) FROM {CHECKPOINT_TABLE}'):
+        connection.exec_driver_sql(f'DROP TABLE {CHECKPOINT_TABLE}')
+
+
+def _run_batches(connection, name, table, statement, key, batch_size, pause):
+    """Run ``statement`` (with :lo and :hi bounds on ``key``) over the table in ranges."""
+    position = _checkpoint(connection, name)
+    if position is None:
+        position = _scalar(connection, f'SELECT min({key}) - 1 FROM {table}')
+    last = _scalar(connection, f'SELECT max({key}) FROM {table}')
+    if position is None or last is None:
+        return
+    statement = sa.text(statement)
+    while position < last:
+        upper = _scalar(connection, f'SELECT {key} FROM {table} WHERE {key} > ? ORDER BY {key} '
+                                    f'LIMIT 1 OFFSET {batch_size - 1}', position)
+        upper = last if upper is None else min(upper, last)
+        with _transaction(connection):
+            connection.execute(statement, {'lo': position, 'hi': upper})
+            _save_checkpoint(connection, name, upper)
+        position = upper
+        logger.info('%s: %s up to %s of %s', name, table, position, last)
+        time.sleep(pause)
+
+
+def backfill(table, assignments, where=None, key='id', batch_size=1000, pause=0.05, name=None):
+    """``UPDATE table SET assignments [WHERE where]``, a key range at a time.
+
+    ``key`` must be an integer key, normally the primary key. Rows added
+    after the backfill starts are not visited, so new writes must already
+    produce the backfilled value (a column default, or the model).
+    """
+    name = name or f'backfill:{table}'
+    condition = f' AND ({where})' if where else ''
+    with _autocommit() as connection:
+        _run_batches(connection, name, table,
+                     f'UPDATE {table} SET {assignments} WHERE {key} > :lo AND {key} <= :hi{condition}',
+                     key, batch_size, pause)
+        with _transaction(connection):
+            _clear_checkpoint(connection, name)
+
+
+def copy_and_swap(new_table, copy=None, after_swap=(), key='id', batch_size=1000, pause=0.05):
+    """Rebuild a table as ``new_table`` without locking it for the whole copy.
+
+    ``new_table`` is a ``sa.Table`` with the full new definition, under the
+    existing table's name, in its own MetaData. Its columns are filled from
+    the same-named old columns, or from SQL expressions over the old row
+    given in ``copy`` ({column: expression}); any other column gets its
+    default.
+
+    The rows are copied into a shadow table in key ranges while triggers on
+    the old table mirror every insert, update and delete made meanwhile.
+    The swap is one short transaction: the old table is dropped, the
+    shadow renamed, ``new_table``'s indexes built and the old table's
+    triggers recreated, followed by any ``after_swap`` statements.
+    """
+    table = new_table.name
+    shadow = f'_shadow_{table}'
+    name = f'copy:{table}'
+    copy = dict(copy or {})
+    with _autocommit() as connection:
+        existing = {row[1] for row in connection.exec_driver_sql(f'PRAGMA table_info({table})')}
+        columns = [column.name for column in new_table.columns if column.name in copy or column.name in existing]
+        names = ', '.join(columns)
+        values = ', '.join(copy.get(column, column) for column in columns)
+        triggers = [sql for trigger, sql in connection.exec_driver_sql(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (table,))
+            if not trigger.startswith(shadow)]
+
+        if _checkpoint(connection, name) is None:
+            with _transaction(connection):
+                connection.exec_driver_sql(f'DROP TABLE IF EXISTS {shadow}')
+                create = sa.schema.CreateTable(new_table.to_metadata(sa.MetaData(), name=shadow))
+                connection.exec_driver_sql(str(create.compile(dialect=connection.dialect)))
+                mirror = f'INSERT OR REPLACE INTO {shadow} ({names}) SELECT {values} FROM {table} WHERE {key} = new.{key}'
+                connection.exec_driver_sql(
+                    f'CREATE TRIGGER {shadow}_ai AFTER INSERT ON {table} BEGIN {mirror}; END')
+                connection.exec_driver_sql(
+                    f'CREATE TRIGGER {shadow}_au AFTER UPDATE ON {table} BEGIN '
+                    f'DELETE FROM {shadow} WHERE {key} = old.{key}; {mirror}; END')
+                connection.exec_driver_sql(
+                    f'CREATE TRIGGER {shadow}_ad AFTER DELETE ON {table} BEGIN '
+                    f'DELETE FROM {shadow} WHERE {key} = old.{key}; END')
+                _save_checkpoint(connection, name, _scalar(connection, f'SELECT coalesce(min({key}), 1) - 1 FROM {table}'))
+
+        # Rows the triggers already mirrored are newer than the copy; keep them
+        _run_batches(connection, name, table,
+                     f'INSERT OR IGNORE INTO {shadow} ({names}) SELECT {values} FROM {table} '
+                     f'WHERE {key} > :lo AND {key} <= :hi',
+                     key, batch_size, pause)
+
+        # Dropping the old table must not cascade to or fail on rows that
+        # reference it; the setting is put back however the swap ends.
+        foreign_keys = _scalar(connection, 'PRAGMA foreign_keys')
+        connection.exec_driver_sql('PRAGMA foreign_keys = OFF')
+        try:
+            with _transaction(connection):
+                connection.exec_driver_sql(f'DROP TABLE {table}')
+                connection.exec_driver_sql(f'ALTER TABLE {shadow} RENAME TO {table}')
+                for index in new_table.indexes:
+                    connection.exec_driver_sql(str(sa.schema.CreateIndex(index).compile(dialect=connection.dialect)))
+                for statement in list(triggers) + list(after_swap):
+                    connection.exec_driver_sql(statement)
+                _clear_checkpoint(connection, name)
+        finally:
+            connection.exec_driver_sql(f'PRAGMA foreign_keys = {"ON" if foreign_keys else "OFF"}')
+        logger.info('%s: swapped in the new %s', name, table)
@@ -0,0 +1,175 @@
+import re
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.elements import BinaryExpression, ColumnClause, UnaryExpression
+
+SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?(?: USING (COVERING )?INDEX (\w+))?')
+AUTOMATIC_RE = re.compile(r'^SEARCH (?:TABLE )?(\w+)(?: AS (\w+))? USING AUTOMATIC (?:COVERING |PARTIAL )*INDEX \(([^)]*)\)')
+TEMP_RE = re.compile(r'^USE TEMP B-TREE FOR (.+)$')
+EXPLAINED = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+
+EQUALITY = {operators.eq, operators.in_op, operators.is_}
+RANGE = {operators.lt, operators.le, operators.gt, operators.ge, operators.between_op}
+PATTERN = {operators.like_op, operators.ilike_op}
+
+
+class Statement:
+    __slots__ = ('sql', 'parameters', 'clause')
+
+    def __init__(self, sql, parameters, clause):
+        self.sql = sql
+        self.parameters = parameters
+        self.clause = clause
+
+
+class Finding:
+    """One line of a query plan worth a look.
+
+    ``kind`` is 'scan' (a full scan of ``table``), 'sort' (a temporary
+    B-tree for ORDER BY, GROUP BY or DISTINCT) or 'automatic-index' (an index
+    SQLite builds for one query and throws away). ``suggestion`` is CREATE
+    INDEX DDL when the statement filters or sorts on columns an index would
+    serve, else None.
+    """
+
+    __slots__ = ('kind', 'table', 'detail', 'sql', 'suggestion', 'note')
+
+    def __init__(self, kind, table, detail, sql, suggestion=None, note=None):
+        self.kind = kind
+        self.table = table
+        self.detail = detail
+        self.sql = sql
+        self.suggestion = suggestion
+        self.note = note
+
+    def key(self):
+        return self.kind, self.table, self.detail, self.sql
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+@contextmanager
+def capture(engine):
+    """Collect the statements run on ``engine`` inside the block."""
+    statements = []
+
+    def record(connection, cursor, sql, parameters, context, executemany):
+        if sql.lstrip().split(None, 1)[0].upper() not in EXPLAINED:
+            return
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        compiled = getattr(context, 'compiled', None)
+        statements.append(Statement(sql, parameters, getattr(compiled, 'statement', None)))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+def _table_names(table):
+    """(name in the query plan, real table name) of a FROM element."""
+    name = getattr(table, 'name', None)
+    element = getattr(table, 'element', table)
+    return name, getattr(element, 'name', name)
+
+
+def _column(element):
+    if isinstance(element, UnaryExpression):
+        element = element.element
+    # Every index already ends in the rowid, so primary keys never need one
+    if isinstance(element, ColumnClause) and getattr(element, 'table', None) is not None \
+            and not getattr(element, 'primary_key', False):
+        return element
+    return None
+
+
+def referenced_columns(clause):
+    """Map each table in ``clause`` (by query-plan name) to the columns an
+    index could serve: (real table name, equality, range, order by, patterns)."""
+    usage = {}
+
+    def entry(column):
+        name, real = _table_names(column.table)
+        return usage.setdefault(name, (real, [], [], [], []))
+
+    if clause is None:
+        return usage
+    for element in visitors.iterate(clause):
+        if isinstance(element, BinaryExpression):
+            column = _column(element.left)
+            if column is None:
+                continue
+            if element.operator in EQUALITY:
+                entry(column)[1].append(column.name)
+            elif element.operator in RANGE:
+                entry(column)[2].append(column.name)
+            elif element.operator in PATTERN:
+                entry(column)[4].append(column.name)
+        for order in getattr(element, '_order_by_clauses', ()):
+            column = _column(order)
+            if column is not None:
+                entry(column)[3].append(column.name)
+    return usage
+
+
+def suggest_index(table, columns):
+    """CREATE INDEX DDL for ``columns`` of ``table``, duplicates dropped."""
+    columns = list(dict.fromkeys(columns))
+    if not columns:
+        return None
+    return f"CREATE INDEX ix_{table}_{'_'.join(columns)} ON {table} ({', '.join(columns)});"
+
+
+def explain(connection, statement):
+    """Plan detail lines for one captured statement (an open DBAPI connection)."""
+    rows = connection.execute(f'EXPLAIN QUERY PLAN {statement.sql}', statement.parameters).fetchall()
+    return [row[-1] for row in rows]
+
+
+def audit(connection, statements):
+    """Findings for ``statements``, each distinct statement explained once."""
+    findings = {}
+    for statement in {s.sql: s for s in statements}.values():
+        usage = referenced_columns(statement.clause)
+        plan = explain(connection, statement)
+        sorts = any(detail.startswith('USE TEMP B-TREE FOR ORDER BY') for detail in plan)
+        for detail in plan:
+            finding = _finding(detail, statement, usage, sorts)
+            if finding is not None:
+                findings.setdefault(finding.key(), finding)
+    return list(findings.values())
+
+
+def _finding(detail, statement, usage, sorts):
+    match = SCAN_RE.match(detail)
+    if match and 'VIRTUAL TABLE' not in detail and match.group(1) != 'CONSTANT':
+        name = match.group(2) or match.group(1)
+        real, equality, ranges, order, patterns = usage.get(name, (match.group(1), [], [], [], []))
+        # An equality or range filter, or a sort, that no index served
+        suggestion = suggest_index(real, equality + ranges[:1] + (order if sorts and not ranges else []))
+        note = None
+        if patterns and not suggestion:
+            note = f"LIKE on {', '.join(dict.fromkeys(patterns))} cannot use an index; consider full-text search"
+        elif match.group(4) and not suggestion:
+            note = f"reads all of index {match.group(4)}"
+        return Finding('scan', real, detail, statement.sql, suggestion, note)
+    match = AUTOMATIC_RE.match(detail)
+    if match:
+        name = match.group(2) or match.group(1)
+        real = usage.get(name, (match.group(1),))[0]
+        columns = [term.split('=')[0].split('>')[0].split('<')[0] for term in match.group(3).split(' AND ')]
+        return Finding('automatic-index', real, detail, statement.sql, suggest_index(real, columns))
+    match = TEMP_RE.match(detail)
+    if match:
+        if match.group(1).startswith('ORDER BY'):
+            # Filter columns then sort columns lets one index serve both
+            for real, equality, _, order, _ in usage.values():
+                if order:
+                    return Finding('sort', real, detail, statement.sql, suggest_index(real, equality + order))
+        return Finding('sort', None, detail, statement.sql)
+    return None
@@ -0,0 +1,266 @@
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+SPEEDSCOPE_SCHEMA = 'https://www.speedscope.app/file-format-schema.json'
+
+
+def _stack(frame, max_depth=128):
+    stack = []
+    while frame is not None and len(stack) < max_depth:
+        code = frame.f_code
+        stack.append((getattr(code, 'co_qualname', code.co_name), code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+class Sampler:
+    """Statistical profiler: a thread records the Python stacks of the given
+    threads (all but itself if None) every ``interval`` seconds.
+
+    Nothing is hooked into the interpreter, so the profiled code runs at full
+    speed apart from the sampler competing for the GIL, and nothing at all
+    happens while no sampler is running.
+    """
+
+    def __init__(self, thread_ids=None, interval=0.005):
+        self.thread_ids = thread_ids
+        self.interval = interval
+        self.stacks = Counter()
+        self.thread_names = {}
+        self.samples = 0
+        self.elapsed = 0.0
+        self._started = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self._started
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (self.thread_ids is not None and ident not in self.thread_ids):
+                    continue
+                self.stacks[ident, _stack(frame)] += 1
+                self.thread_names.setdefault(ident, names.get(ident, str(ident)))
+            self.samples += 1
+
+    def top(self, limit=20):
+        """[{function, file, line, self, total}] by samples, most self time first."""
+        own, total = Counter(), Counter()
+        for (_, stack), count in self.stacks.items():
+            if stack:
+                own[stack[-1]] += count
+            for frame in set(stack):
+                total[frame] += count
+        return [{'function': name, 'file': path, 'line': line, 'self': count, 'total': total[name, path, line]}
+                for (name, path, line), count in own.most_common(limit)]
+
+    def speedscope(self, name):
+        """The samples as a speedscope document, one profile per thread."""
+        frames, index = [], {}
+        profiles = []
+        for ident, thread_name in self.thread_names.items():
+            samples, weights = [], []
+            for (stack_ident, stack), count in self.stacks.items():
+                if stack_ident != ident:
+                    continue
+                path = []
+                for frame in stack:
+                    if frame not in index:
+                        index[frame] = len(frames)
+                        frames.append({'name': frame[0], 'file': frame[1], 'line': frame[2]})
+                    path.append(index[frame])
+                samples.append(path)
+                weights.append(count * self.interval)
+            profiles.append({
+                'type': 'sampled',
+                'name': f'{name} [{thread_name}]',
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': sum(weights),
+                'samples': samples,
+                'weights': weights,
+            })
+        return {
+            '$schema': SPEEDSCOPE_SCHEMA,
+            'name': name,
+            'exporter': 'amco',
+            'activeProfileIndex': 0,
+            'shared': {'frames': frames},
+            'profiles': profiles,
+        }
+
+
+class Tracer:
+    """Exact call tree of the calling thread, recorded with ``sys.setprofile``.
+
+    Every call and return is timed, which slows the traced code down several
+    times over; meant for one request at a time. Recording stops after
+    ``max_events`` events.
+    """
+
+    def __init__(self, max_events=1000000):
+        self.max_events = max_events
+        self.frames = []
+        self.index = {}
+        self.events = []
+        self.stack = []
+        self.truncated = False
+        self.elapsed = 0.0
+        self._started = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        sys.setprofile(self._event)
+        return self
+
+    def stop(self):
+        sys.setprofile(None)
+        self.elapsed = time.perf_counter() - self._started
+        # The call to setprofile itself
+        if not self.truncated and self.stack and self.events[-1]['type'] == 'O':
+            self.events.pop()
+            self.stack.pop()
+        while self.stack:
+            self.events.append({'type': 'C', 'frame': self.stack.pop(), 'at': self.elapsed})
+        return self
+
+    def _frame(self, frame, event, arg):
+        if event == 'c_call':
+            module = getattr(arg, '__module__', None) or '<built-in>'
+            key = (getattr(arg, '__qualname__', arg.__name__), module, 0)
+        else:
+            key = _stack(frame, max_depth=1)[0]
+        column = self.index.get(key)
+        if column is None:
+            column = self.index[key] = len(self.frames)
+            self.frames.append({'name': key[0], 'file': key[1], 'line': key[2]})
+        return column
+
+    def _event(self, frame, event, arg):
+        at = time.perf_counter() - self._started
+        if event in ('call', 'c_call'):
+            if len(self.events) >= self.max_events:
+                sys.setprofile(None)
+                self.truncated = True
+                return
+            column = self._frame(frame, event, arg)
+            self.stack.append(column)
+            self.events.append({'type': 'O', 'frame': column, 'at': at})
+        elif self.stack:
+            # Returns from frames entered before start() arrive with an empty stack
+            self.events.append({'type': 'C', 'frame': self.stack.pop(), 'at': at})
+
+    def speedscope(self, name):
+        return {
+            '$schema': SPEEDSCOPE_SCHEMA,
+            'name': name + (' (truncated)' if self.truncated else ''),
+            'exporter': 'amco',
+            'activeProfileIndex': 0,
+            'shared': {'frames': self.frames},
+            'profiles': [{
+                'type': 'evented',
+                'name': name,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': self.elapsed,
+                'events': self.events,
+            }],
+        }
+
+
+class MemoryTracer:
+    """tracemalloc snapshots of this process, each compared with the one before."""
+
+    def __init__(self):
+        self.previous = None
+        self.lock = threading.Lock()
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self, frames=1):
+        # Tracing slows every allocation down, so it only runs when asked for.
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self.previous = None
+
+    def stop(self):
+        tracemalloc.stop()
+        self.previous = None
+
+    def snapshot(self, limit=25, key_type='lineno'):
+        """Top allocation sites, and the biggest changes since the last snapshot."""
+        with self.lock:
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+                tracemalloc.Filter(False, '<unknown>'),
+            ])
+            current, peak = tracemalloc.get_traced_memory()
+            result = {
+                'taken_at': datetime.utcnow().isoformat(),
+                'pid': os.getpid(),
+                'traced_bytes': current,
+                'peak_bytes': peak,
+                'top': [{'size': stat.size, 'count': stat.count, 'traceback': stat.traceback.format()}
+                        for stat in snapshot.statistics(key_type)[:limit]],
+                'growth': None,
+            }
+            if self.previous is not None:
+                result['growth'] = [
+                    {'size_diff': stat.size_diff, 'count_diff': stat.count_diff, 'size': stat.size,
+                     'traceback': stat.traceback.format()}
+                    for stat in snapshot.compare_to(self.previous, key_type)[:limit]]
+            self.previous = snapshot
+        return result
+
+
+class ProfileStore:
+    """Captured profiles as JSON files in ``directory``, newest ``keep`` kept."""
+
+    def __init__(self, directory, keep=50):
+        self.directory = directory
+        self.keep = keep
+
+    def save(self, kind, document):
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{kind}-{os.getpid()}.json"
+        path = os.path.join(self.directory, name)
+        with open(path + '.part', 'w') as file:
+            json.dump(document, file)
+        os.replace(path + '.part', path)
+        for old in self.names()[self.keep:]:
+            try:
+                os.remove(os.path.join(self.directory, old))
+            except FileNotFoundError:
+                pass
+        return name
+
+    def names(self):
+        """Stored profile names, newest first."""
+        try:
+            return sorted((name for name in os.listdir(self.directory) if name.endswith('.json')),
+                          reverse=True)
+        except FileNotFoundError:
+            return []
@@ -0,0 +1,91 @@
+import os
+import posixpath
+import tempfile
+
+
+class StaticSite:
+    """Rendered public pages kept as files under ``directory``.
+
+    ``render(path)`` returns (status, body) for a URL path. A page that
+    renders with 200 is written to ``<path>/index.html`` (or to ``<path>``
+    itself when the last segment has an extension, like ``sitemap.xml``),
+    via a temporary file and ``os.replace`` so the front server never sees
+    a partial file. A page that now renders 404 or 410 is removed; any other
+    status leaves the previous file in place. Unchanged pages are not
+    rewritten, so their modification time (and the server's ETag) survive.
+    """
+
+    def __init__(self, directory, render):
+        self.directory = directory
+        self.render = render
+
+    def file_for(self, path):
+        path = posixpath.normpath('/' + path.strip('/'))
+        if '..' in path.split('/'):
+            raise ValueError(f"Invalid path: {path}")
+        name = path.lstrip('/')
+        if not name:
+            return os.path.join(self.directory, 'index.html')
+        if '.' in posixpath.basename(name):
+            return os.path.join(self.directory, *name.split('/'))
+        return os.path.join(self.directory, *name.split('/'), 'index.html')
+
+    def _write(self, filename, body):
+        try:
+            with open(filename, 'rb') as existing:
+                if existing.read() == body:
+                    return False
+        except FileNotFoundError:
+            pass
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(filename), prefix='.publish-')
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                handle.write(body)
+            os.chmod(temporary, 0o644)
+            os.replace(temporary, filename)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        return True
+
+    def _remove(self, filename):
+        try:
+            os.unlink(filename)
+        except FileNotFoundError:
+            return False
+        # Drop directories left empty, up to the site root
+        directory = os.path.dirname(filename)
+        while os.path.abspath(directory) != os.path.abspath(self.directory):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
+        return True
+
+    def publish(self, paths):
+        """Re-render ``paths``; returns counts of written, removed and failed pages."""
+        summary = {'written': 0, 'removed': 0, 'failed': 0}
+        for path in dict.fromkeys(paths):
+            status, body = self.render(path)
+            filename = self.file_for(path)
+            if status == 200:
+                summary['written'] += self._write(filename, body)
+            elif status in (404, 410):
+                summary['removed'] += self._remove(filename)
+            else:
+                summary['failed'] += 1
+        return summary
+
+    def export(self, paths):
+        """Publish every page in ``paths`` and delete files for any other page."""
+        paths = list(dict.fromkeys(paths))
+        summary = self.publish(paths)
+        keep = {os.path.abspath(self.file_for(path)) for path in paths}
+        for root, _, files in os.walk(self.directory, topdown=False):
+            for name in files:
+                filename = os.path.abspath(os.path.join(root, name))
+                if filename not in keep and not name.startswith('.'):
+                    summary['removed'] += self._remove(filename)
+        return summary
@@ -0,0 +1,262 @@
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+
+
+class Subscription:
+    """Messages for one subscriber, in a bounded queue.
+
+    A subscriber that falls ``max_queue`` messages behind is marked
+    ``overflowed`` and gets nothing more; it should start over from a full
+    reload rather than see a stream with holes in it.
+    """
+
+    def __init__(self, broker, channels, max_queue):
+        self.broker = broker
+        self.channels = frozenset(channels)
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+    def put(self, channel, message):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait((channel, message))
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout=None):
+        """Next (channel, message), or None if none arrived within ``timeout``."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Broker:
+    """In-process publish/subscribe. Publishing never blocks on subscribers."""
+
+    def __init__(self, max_queue=1000):
+        self.max_queue = max_queue
+        self.subscriptions = set()
+        self.lock = threading.Lock()
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, channels, self.max_queue)
+        with self.lock:
+            self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions.discard(subscription)
+
+    def publish(self, channel, message):
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            if channel in subscription.channels:
+                subscription.put(channel, message)
+
+
+class SQLitePoller:
+    """Cross-process fan-out by polling the database.
+
+    ``sources`` maps a channel to (table, columns); rows with an id above
+    the last one seen are published as dicts. One thread per process runs
+    the queries, and only after ``PRAGMA data_version`` shows another
+    connection has committed, so idle polling costs one pragma per interval
+    however many clients are subscribed. Every writer is seen, including
+    the worker and other app processes.
+    """
+
+    def __init__(self, broker, connect, sources, interval=1.0, batch_size=500):
+        self.broker = broker
+        self.connect = connect
+        self.sources = sources
+        self.interval = interval
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self._pid = None
+
+    def start(self):
+        """Start polling in this process, if not running already."""
+        with self.lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self._run, name='pubsub-poller', daemon=True).start()
+
+    def publish(self, channel, message):
+        # Rows reach subscribers through polling; nothing to send.
+        pass
+
+    def _start_positions(self, connection):
+        last_ids, queries = {}, {}
+        for channel, (table, columns) in self.sources.items():
+            last_ids[channel] = connection.execute(f'SELECT coalesce(max(id), 0) FROM {table}').fetchone()[0]
+            queries[channel] = f'SELECT {columns} FROM {table} WHERE id > ? ORDER BY id LIMIT {self.batch_size}'
+        return last_ids, queries
+
+    def _run(self):
+        connection = positions = data_version = None
+        while True:
+            try:
+                if connection is None:
+                    connection = self.connect()
+                    connection.isolation_level = None
+                if positions is None:
+                    positions = self._start_positions(connection)
+                version = connection.execute('PRAGMA data_version').fetchone()[0]
+                if version != data_version:
+                    data_version = version
+                    self._poll(connection, *positions)
+            except Exception:
+                # The database may be locked or mid-migration; try again next time.
+                data_version = None
+            time.sleep(self.interval)
+
+    def _poll(self, connection, last_ids, queries):
+        for channel, sql in queries.items():
+            while True:
+                cursor = connection.execute(sql, (last_ids[channel],))
+                columns = [column[0] for column in cursor.description]
+                rows = cursor.fetchall()
+                for row in rows:
+                    message = dict(zip(columns, row))
+                    last_ids[channel] = message['id']
+                    self.broker.publish(channel, message)
+                if len(rows) < self.batch_size:
+                    break
+
+
+class BrokerRelay:
+    """Cross-process fan-out through a broker process (see BrokerServer).
+
+    ``publish()`` sends a message to the broker, which passes it to every
+    connected process, this one included. Messages published while the
+    broker is unreachable are delivered locally only.
+
+    The connection is made by ``start()``, or by the first ``publish()`` in
+    a process, so processes that only publish (the worker, app processes
+    with no open stream) still reach the others.
+    """
+
+    def __init__(self, broker, address, reconnect_delay=2.0, connect_timeout=1.0):
+        self.broker = broker
+        self.address = address
+        self.reconnect_delay = reconnect_delay
+        self.connect_timeout = connect_timeout
+        self.lock = threading.Lock()
+        self.connected = threading.Event()
+        self._socket = None
+        self._pid = None
+
+    def start(self):
+        """Start relaying in this process; False if it was running already."""
+        with self.lock:
+            if self._pid == os.getpid():
+                return False
+            self._pid = os.getpid()
+            self._socket = None
+            # A forked child inherits the parent's state but not its thread.
+            self.connected = threading.Event()
+        threading.Thread(target=self._run, name='pubsub-relay', daemon=True).start()
+        return True
+
+    def publish(self, channel, message):
+        if self.start():
+            # First message from this process: give the relay a moment to connect.
+            self.connected.wait(self.connect_timeout)
+        line = json.dumps({'channel': channel, 'message': message}, default=str).encode('utf-8') + b'\n'
+        with self.lock:
+            sock = self._socket
+            if sock is not None:
+                try:
+                    sock.sendall(line)
+                    return
+                except OSError:
+                    self._socket = None
+        self.broker.publish(channel, json.loads(line)['message'])
+
+    def _run(self):
+        while True:
+            try:
+                sock = socket.create_connection(self.address, timeout=10)
+                sock.settimeout(None)
+            except OSError:
+                time.sleep(self.reconnect_delay)
+                continue
+            with self.lock:
+                self._socket = sock
+            self.connected.set()
+            try:
+                for line in sock.makefile('rb'):
+                    try:
+                        data = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.broker.publish(data['channel'], data['message'])
+            except OSError:
+                pass
+            with self.lock:
+                if self._socket is sock:
+                    self._socket = None
+                    self.connected.clear()
+            sock.close()
+            time.sleep(self.reconnect_delay)
+
+
+class _RelayHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.server.add_client(self.wfile)
+        try:
+            for line in self.rfile:
+                if line.strip():
+                    self.server.relay(line if line.endswith(b'\n') else line + b'\n')
+        finally:
+            self.server.remove_client(self.wfile)
+
+
+class BrokerServer(socketserver.ThreadingTCPServer):
+    """Minimal local message broker: every line a client sends is written to
+    all connected clients. A stand-in for a real broker on one host."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, _RelayHandler)
+        self.clients = set()
+        self.clients_lock = threading.Lock()
+
+    def add_client(self, wfile):
+        with self.clients_lock:
+            self.clients.add(wfile)
+
+    def remove_client(self, wfile):
+        with self.clients_lock:
+            self.clients.discard(wfile)
+
+    def relay(self, line):
+        # Writes are serialised so lines from different senders never interleave.
+        with self.clients_lock:
+            for wfile in list(self.clients):
+                try:
+                    wfile.write(line)
+                    wfile.flush()
+                except OSError:
+                    self.clients.discard(wfile)
@@ -0,0 +1,141 @@
+import functools
+import math
+import threading
+import time
+
+import sqlalchemy as sa
+from flask import request
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from werkzeug.exceptions import TooManyRequests
+
+
+class MemoryStore:
+    """Token buckets kept in this process."""
+
+    def __init__(self, max_keys=100000):
+        self.buckets = {}
+        self.max_keys = max_keys
+        self.lock = threading.Lock()
+
+    def consume(self, key, rate, burst, now):
+        """Take one token; returns (allowed, tokens left)."""
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            if len(self.buckets) >= self.max_keys and key not in self.buckets:
+                self._prune(now)
+            self.buckets[key] = (tokens, now)
+        return allowed, tokens
+
+    def _prune(self, now, idle=3600):
+        for key, (_, updated) in list(self.buckets.items()):
+            if now - updated > idle:
+                del self.buckets[key]
+
+
+class DatabaseStore:
+    """Token buckets in a table of the application database, shared by every
+    process using it. Each check is a single atomic upsert.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.table = sa.Table(
+            'rate_limit', db.metadata,
+            sa.Column('key', sa.String(200), primary_key=True),
+            sa.Column('tokens', sa.Float, nullable=False),
+            sa.Column('allowed', sa.Boolean, nullable=False),
+            sa.Column('updated_at', sa.Float, nullable=False),
+        )
+
+    def consume(self, key, rate, burst, now):
+        t = self.table
+        stmt = sqlite_insert(t).values(key=key, tokens=burst - 1, allowed=True, updated_at=now)
+        refilled = sa.func.min(burst, t.c.tokens + (now - t.c.updated_at) * rate)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[t.c.key],
+            set_={
+                'tokens': sa.case((refilled >= 1, refilled - 1), else_=refilled),
+                'allowed': refilled >= 1,
+                'updated_at': now,
+            },
+        ).returning(t.c.allowed, t.c.tokens)
+        # A separate short transaction, so the check never joins the request's session.
+        with self.db.engine.begin() as connection:
+            allowed, tokens = connection.execute(stmt).one()
+        return bool(allowed), tokens
+
+    def purge(self, idle=86400):
+        with self.db.engine.begin() as connection:
+            result = connection.execute(self.table.delete().where(self.table.c.updated_at < time.time() - idle))
+        return result.rowcount
+
+
+class RateLimiter:
+    """Per-client and per-route token buckets plus concurrency caps for views.
+
+    A bucket holds up to ``burst`` tokens and refills at ``rate`` tokens per
+    ``per`` seconds; each request takes one. Rejected requests get 429 with a
+    Retry-After header telling the client when a token will be available.
+    """
+
+    def __init__(self, store=None, enabled=True):
+        self.store = store or MemoryStore()
+        self.enabled = enabled
+        self.semaphores = {}
+
+    def client_key(self):
+        return request.remote_addr or 'unknown'
+
+    def check(self, key, rate, per, burst=None):
+        """Take a token from bucket ``key`` or raise TooManyRequests."""
+        if not self.enabled:
+            return
+        per_second = rate / per
+        allowed, tokens = self.store.consume(key, per_second, burst or rate, time.time())
+        if not allowed:
+            raise TooManyRequests(retry_after=max(1, math.ceil((1 - tokens) / per_second)))
+
+    def limit(self, name, per_client=None, per_route=None, methods=('GET', 'POST')):
+        """Decorate a view with buckets given as (rate, per seconds[, burst]).
+
+        ``per_client`` buckets are keyed by client address, ``per_route``
+        buckets are shared by every client. Views decorated with the same
+        ``name`` share their buckets.
+        """
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if request.method in methods:
+                    if per_client:
+                        self.check(f"{name}:{self.client_key()}", *per_client)
+                    if per_route:
+                        self.check(name, *per_route)
+                return view(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def concurrency(self, name, limit, retry_after=5, methods=('POST',)):
+        """Let at most ``limit`` requests run the view at once in this process.
+
+        Requests over the cap are rejected at once rather than queued, so
+        slow uploads cannot occupy every worker thread.
+        """
+        semaphore = self.semaphores.setdefault(name, threading.BoundedSemaphore(limit))
+
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or request.method not in methods:
+                    return view(*args, **kwargs)
+                if not semaphore.acquire(blocking=False):
+                    raise TooManyRequests(retry_after=retry_after)
+                try:
+                    return view(*args, **kwargs)
+                finally:
+                    semaphore.release()
+            return wrapper
+        return decorator
@@ -0,0 +1,301 @@
+import bisect
+import os
+import threading
+from datetime import datetime
+
+# Change log written by triggers, so every writer (ORM, bulk statements, other
+# processes) is seen. Like the FTS triggers, these are dropped when SQLite batch
+# migrations recreate the product or job table and must be recreated after.
+CHANGE_LOG_DDL = [
+    """CREATE TABLE IF NOT EXISTS read_model_change (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name VARCHAR(20) NOT NULL,
+        row_id INTEGER NOT NULL)""",
+    """CREATE TRIGGER IF NOT EXISTS product_change_ai AFTER INSERT ON product BEGIN
+        INSERT INTO read_model_change (table_name, row_id) VALUES ('product', new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS product_change_au
+        AFTER UPDATE OF name, price, image, description ON product BEGIN
+        INSERT INTO read_model_change (table_name, row_id) VALUES ('product', new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS product_change_ad AFTER DELETE ON product BEGIN
+        INSERT INTO read_model_change (table_name, row_id) VALUES ('product', old.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS job_change_ai AFTER INSERT ON job BEGIN
+        INSERT INTO read_model_change (table_name, row_id) VALUES ('job', new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS job_change_au
+        AFTER UPDATE OF title, description, requirements, deadline, is_active ON job BEGIN
+        INSERT INTO read_model_change (table_name, row_id) VALUES ('job', new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS job_change_ad AFTER DELETE ON job BEGIN
+        INSERT INTO read_model_change (table_name, row_id) VALUES ('job', old.id);
+    END""",
+]
+
+DROP_CHANGE_LOG_DDL = [
+    'DROP TRIGGER IF EXISTS job_change_ad',
+    'DROP TRIGGER IF EXISTS job_change_au',
+    'DROP TRIGGER IF EXISTS job_change_ai',
+    'DROP TRIGGER IF EXISTS product_change_ad',
+    'DROP TRIGGER IF EXISTS product_change_au',
+    'DROP TRIGGER IF EXISTS product_change_ai',
+    'DROP TABLE IF EXISTS read_model_change',
+]
+
+PRODUCT_COLUMNS = 'id, name, price, image, description'
+JOB_COLUMNS = 'id, title, description, requirements, deadline'
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class ProductRecord:
+    __slots__ = ('id', 'name', 'price', 'image', 'description')
+
+    def __init__(self, id, name, price, image, description):
+        self.id = id
+        self.name = name
+        # SQLite keeps a value it cannot convert to REAL as text
+        self.price = price if isinstance(price, float) else _to_float(price)
+        self.image = image
+        self.description = description
+
+    def serialize(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'price': self.price,
+            'image': self.image,
+            'description': self.description,
+        }
+
+
+class JobRecord:
+    __slots__ = ('id', 'title', 'description', 'requirements', 'deadline')
+
+    def __init__(self, id, title, description, requirements, deadline):
+        self.id = id
+        self.title = title
+        self.description = description
+        self.requirements = requirements
+        self.deadline = datetime.fromisoformat(deadline) if isinstance(deadline, str) else deadline
+
+
+class ReadModel:
+    """Process-local copy of the product catalog and active jobs.
+
+    Products are kept as slotted records plus three sorted key lists (id,
+    (price, id) and (casefolded name, id)), so every listing, filter and
+    facet the catalog offers is a binary search and a slice. ``refresh()``
+    checks ``PRAGMA data_version`` on a private connection; only when another
+    connection has committed does it read the trigger-maintained change log
+    and reload the rows that changed.
+    """
+
+    def __init__(self, connect, max_changes=5000):
+        self.connect = connect
+        self.max_changes = max_changes
+        self.lock = threading.RLock()
+        self._connection = None
+        self._pid = None
+        self.loaded = False
+        self.data_version = None
+        self.seq = 0
+        self._clear()
+
+    def _clear(self):
+        self.products = {}
+        self.by_id = []
+        self.by_price = []
+        self.by_name = []
+        self.jobs = {}
+        self._active_jobs = None
+        self._price_counts = {}
+
+    def _db(self):
+        # A SQLite connection must not be used across fork.
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = self.connect()
+            self._connection.isolation_level = None
+            self._pid = os.getpid()
+        return self._connection
+
+    def refresh(self):
+        with self.lock:
+            connection = self._db()
+            version = connection.execute('PRAGMA data_version').fetchone()[0]
+            if self.loaded and version == self.data_version:
+                return
+            self.data_version = version
+            if not self.loaded:
+                return self.load()
+            changes = connection.execute(
+                'SELECT seq, table_name, row_id FROM read_model_change WHERE seq > ? ORDER BY seq '
+                'LIMIT ?', (self.seq, self.max_changes + 1)).fetchall()
+            if not changes:
+                return
+            # Too far behind, or the log was pruned past our position
+            if len(changes) > self.max_changes or changes[0][0] != self.seq + 1:
+                return self.load()
+            self.seq = changes[-1][0]
+            changed = {'product': set(), 'job': set()}
+            for _, table, row_id in changes:
+                changed[table].add(row_id)
+            self._reload_products(changed['product'])
+            self._reload_jobs(changed['job'])
+
+    def load(self):
+        with self.lock:
+            connection = self._db()
+            connection.execute('BEGIN')
+            try:
+                self.seq = connection.execute(
+                    'SELECT coalesce(max(seq), 0) FROM read_model_change').fetchone()[0]
+                products = connection.execute(f'SELECT {PRODUCT_COLUMNS} FROM product').fetchall()
+                jobs = connection.execute(
+                    f'SELECT {JOB_COLUMNS} FROM job WHERE is_active ORDER BY id').fetchall()
+            finally:
+                connection.execute('COMMIT')
+            self._clear()
+            for row in products:
+                record = ProductRecord(*row)
+                self.products[record.id] = record
+            self.by_id = sorted(self.products)
+            self.by_price = sorted((r.price, r.id) for r in self.products.values())
+            self.by_name = sorted((r.name.casefold(), r.id) for r in self.products.values())
+            self.jobs = {row[0]: JobRecord(*row) for row in jobs}
+            self.loaded = True
+
+    def _rows(self, sql, ids):
+        ids = list(ids)
+        rows = []
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows.extend(self._db().execute(sql.format(placeholders), chunk).fetchall())
+        return rows
+
+    @staticmethod
+    def _discard(keys, key):
+        position = bisect.bisect_left(keys, key)
+        if position < len(keys) and keys[position] == key:
+            del keys[position]
+
+    def _reload_products(self, ids):
+        if not ids:
+            return
+        rows = self._rows(f'SELECT {PRODUCT_COLUMNS} FROM product WHERE id IN ({{}})', ids)
+        for product_id in ids:
+            old = self.products.pop(product_id, None)
+            if old is not None:
+                self._discard(self.by_id, old.id)
+                self._discard(self.by_price, (old.price, old.id))
+                self._discard(self.by_name, (old.name.casefold(), old.id))
+        for row in rows:
+            record = ProductRecord(*row)
+            self.products[record.id] = record
+            bisect.insort(self.by_id, record.id)
+            bisect.insort(self.by_price, (record.price, record.id))
+            bisect.insort(self.by_name, (record.name.casefold(), record.id))
+        self._price_counts = {}
+
+    def _reload_jobs(self, ids):
+        if not ids:
+            return
+        rows = self._rows(f'SELECT {JOB_COLUMNS} FROM job WHERE is_active AND id IN ({{}})', ids)
+        for job_id in ids:
+            self.jobs.pop(job_id, None)
+        for row in rows:
+            self.jobs[row[0]] = JobRecord(*row)
+        self._active_jobs = None
+
+    def _name_range(self, prefix):
+        start = bisect.bisect_left(self.by_name, (prefix,))
+        end = start
+        while end < len(self.by_name) and self.by_name[end][0].startswith(prefix):
+            end += 1
+        return start, end
+
+    def _product_ids(self, q, min_price, max_price, sort):
+        def in_range(price):
+            return ((min_price is None or price >= min_price)
+                    and (max_price is None or price <= max_price))
+
+        prefix = (q or '').casefold()
+        products = self.products
+        if prefix:
+            start, end = self._name_range(prefix)
+            ids = [i for _, i in self.by_name[start:end] if in_range(products[i].price)]
+            if sort == 'newest':
+                ids.sort(reverse=True)
+            elif sort == 'price':
+                ids.sort(key=lambda i: (products[i].price, i))
+            elif sort == 'price_desc':
+                ids.sort(key=lambda i: (products[i].price, i), reverse=True)
+            return iter(ids)
+        if sort in ('price', 'price_desc'):
+            lo = 0 if min_price is None else bisect.bisect_left(self.by_price, (min_price,))
+            hi = len(self.by_price) if max_price is None else \
+                bisect.bisect_right(self.by_price, (max_price, float('inf')))
+            positions = range(lo, hi) if sort == 'price' else range(hi - 1, lo - 1, -1)
+            return (self.by_price[p][1] for p in positions)
+        ordered = reversed(self.by_id) if sort == 'newest' else (i for _, i in self.by_name)
+        if min_price is None and max_price is None:
+            return ordered
+        return (i for i in ordered if in_range(products[i].price))
+
+    def product_page(self, q='', min_price=None, max_price=None, sort='newest', offset=0, limit=24):
+        """Return (records, has_next) for one page of the catalog."""
+        with self.lock:
+            ids = self._product_ids(q, min_price, max_price, sort)
+            page = []
+            for position, product_id in enumerate(ids):
+                if position >= offset:
+                    page.append(self.products[product_id])
+                    if len(page) > limit:
+                        break
+        return page[:limit], len(page) > limit
+
+    def price_counts(self, bounds, q=''):
+        """Count products per price bucket; bucket i is [bounds[i], bounds[i + 1]).
+
+        The first bucket is open below and the last one open above.
+        """
+        with self.lock:
+            prefix = (q or '').casefold()
+            if prefix:
+                # Scans every match, so keep the result until products change.
+                key = (prefix, tuple(bounds))
+                counts = self._price_counts.get(key)
+                if counts is None:
+                    if len(self._price_counts) > 1000:
+                        self._price_counts.clear()
+                    start, end = self._name_range(prefix)
+                    counts = [0] * len(bounds)
+                    for _, product_id in self.by_name[start:end]:
+                        price = self.products[product_id].price
+                        counts[max(bisect.bisect_right(bounds, price) - 1, 0)] += 1
+                    self._price_counts[key] = counts
+                return list(counts)
+            edges = [0] + [bisect.bisect_left(self.by_price, (b,)) for b in bounds[1:]] + [len(self.by_price)]
+            return [edges[i + 1] - edges[i] for i in range(len(bounds))]
+
+    def active_jobs(self):
+        with self.lock:
+            if self._active_jobs is None:
+                self._active_jobs = [self.jobs[i] for i in sorted(self.jobs)]
+            return self._active_jobs
+
+    def prune(self, keep=None):
+        """Drop change log rows older than the last ``keep``; readers further
+        behind than that reload in full anyway."""
+        keep = keep or self.max_changes
+        with self.lock:
+            self._db().execute(
+                'DELETE FROM read_model_change WHERE seq <= (SELECT max(seq) FROM read_model_change) - ?',
+                (keep,))
@@ -0,0 +1,134 @@
+import math
+from array import array
+from collections import Counter
+
+import numpy as np
+
+from matching import tokenize
+
+
+def _ranges(starts, lengths):
+    """Indices of the slices [start, start + length), concatenated."""
+    offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.arange(offsets.size, dtype=np.int64) - offsets + np.repeat(starts, lengths)
+
+
+class Vectors:
+    """L2-normalised TF-IDF rows for a set of items, stored sparse.
+
+    The non-zero weights are kept row by row (``indptr``, ``indices``,
+    ``data``, as in CSR) and again term by term (``term_ptr``, ``term_rows``,
+    ``term_data``), so scoring a few rows against every item only touches
+    the items sharing a term with them. Only terms found in at least two
+    items get a column: a term unique to one item adds nothing to any dot
+    product, though it still counts towards that item's norm, so cosines are
+    exact.
+    """
+
+    def __init__(self, ids, texts):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.rows = {item_id: row for row, item_id in enumerate(self.ids.tolist())}
+        counts = [Counter(tokenize(text)) for text in texts]
+        df = Counter(term for terms in counts for term in terms)
+        n = len(counts)
+        shared = sorted(term for term, count in df.items() if count > 1)
+        columns = {term: column for column, term in enumerate(shared)}
+        idf = {term: math.log((1.0 + n) / (1.0 + count)) + 1.0 for term, count in df.items()}
+        indptr, indices, data = array('q', [0]), array('q'), array('d')
+        norms = np.zeros(n)
+        for row, terms in enumerate(counts):
+            norm = 0.0
+            for term, count in terms.items():
+                weight = (1.0 + math.log(count)) * idf[term]
+                norm += weight * weight
+                column = columns.get(term)
+                if column is not None:
+                    indices.append(column)
+                    data.append(weight)
+            norms[row] = norm
+            indptr.append(len(indices))
+        del counts
+        self.indptr = np.frombuffer(indptr, dtype=np.int64)
+        self.indices = np.frombuffer(indices, dtype=np.int64)
+        entry_rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(self.indptr))
+        # Rows with entries have a positive norm.
+        self.data = (np.frombuffer(data, dtype=np.float64) / np.sqrt(norms[entry_rows])).astype(np.float32)
+        order = np.argsort(self.indices, kind='stable')
+        self.term_rows = entry_rows[order]
+        self.term_data = self.data[order]
+        self.term_ptr = np.zeros(len(shared) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=len(shared)), out=self.term_ptr[1:])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def similarities(self, rows):
+        """Cosine of each of ``rows`` against every item, self-matches as -1,
+        as a dense (len(rows), len(self)) array."""
+        rows = np.asarray(rows, dtype=np.int64)
+        n = len(self)
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        entries = _ranges(starts, lengths)
+        query = np.repeat(np.arange(len(rows), dtype=np.int64), lengths)
+        terms, weights = self.indices[entries], self.data[entries]
+        posting_starts = self.term_ptr[terms]
+        posting_lengths = self.term_ptr[terms + 1] - posting_starts
+        postings = _ranges(posting_starts, posting_lengths)
+        keys = np.repeat(query, posting_lengths) * n + self.term_rows[postings]
+        products = np.repeat(weights, posting_lengths).astype(np.float64) * self.term_data[postings]
+        scores = np.bincount(keys, weights=products, minlength=len(rows) * n) \
+            .reshape(len(rows), n).astype(np.float32)
+        scores[np.arange(len(rows)), rows] = -1.0
+        return scores
+
+
+def nearest(vectors, rows, k=6, min_score=0.05, batch_size=64):
+    """Yield (item id, [(related id, score)]) with the top ``k`` neighbours of
+    each of ``rows``, best first, scoring ``batch_size`` rows per matrix product."""
+    rows = list(rows)
+    k = min(k, len(vectors) - 1)
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        if k <= 0:
+            for row in batch:
+                yield int(vectors.ids[row]), []
+            continue
+        scores = vectors.similarities(batch)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        for row, columns, values in zip(batch, top, top_scores):
+            keep = values >= min_score
+            yield int(vectors.ids[row]), list(zip(vectors.ids[columns[keep]].tolist(),
+                                                  values[keep].astype(float).tolist()))
+
+
+def affected(vectors, changed, neighbours, k=6, min_score=0.05, batch_size=64):
+    """Rows whose neighbour lists a change to the items ``changed`` can alter.
+
+    ``changed`` are item ids (removed items included); ``neighbours`` maps an
+    item id to its stored [(related id, score)]. That is the changed items
+    themselves, items listing one of them, and items to which a changed item
+    is now closer than their weakest stored neighbour (or, for items listing
+    fewer than ``k``, closer than ``min_score``).
+    """
+    changed = set(changed)
+    ids = {item_id for item_id in changed if item_id in vectors.rows}
+    ids.update(item_id for item_id, related in neighbours.items()
+               if any(related_id in changed for related_id, _ in related))
+    present = [vectors.rows[item_id] for item_id in changed if item_id in vectors.rows]
+    if present:
+        closest = np.full(len(vectors), -1.0, dtype=np.float32)
+        for start in range(0, len(present), batch_size):
+            scores = vectors.similarities(present[start:start + batch_size])
+            np.maximum(closest, scores.max(axis=0), out=closest)
+        weakest = np.full(len(vectors), min_score, dtype=np.float32)
+        for item_id, related in neighbours.items():
+            row = vectors.rows.get(item_id)
+            if row is not None and len(related) >= k:
+                weakest[row] = min(score for _, score in related)
+        ids.update(vectors.ids[closest >= weakest].tolist())
+    return sorted(vectors.rows[item_id] for item_id in ids if item_id in vectors.rows)
@@ -0,0 +1,62 @@
+// Applies live updates from /admin/stream to admin dashboards.
+// A table with data-stream-url gets a row prepended for each new record; its
+// data-stream-fields lists the message fields shown, one per cell, and
+// data-stream-delete is a delete URL ending in 0 that is pointed at the new
+// record. Elements with data-applicant-count / data-applicants-24h="<job id>"
+// are incremented for each new application to that job.
+document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('[data-stream-url]').forEach(function (element) {
+        var source = new EventSource(element.dataset.streamUrl);
+
+        source.addEventListener('applied_job', function (event) {
+            var message = JSON.parse(event.data);
+            ['data-applicant-count', 'data-applicants-24h'].forEach(function (attribute) {
+                var selector = '[' + attribute + '="' + message.job_id + '"]';
+                document.querySelectorAll(selector).forEach(function (counter) {
+                    counter.textContent = (parseInt(counter.textContent, 10) || 0) + 1;
+                });
+            });
+            addRow(element, message);
+        });
+
+        source.addEventListener('action_history', function (event) {
+            addRow(element, JSON.parse(event.data));
+        });
+
+        // The server dropped messages for this client; start over.
+        source.addEventListener('reset', function () {
+            source.close();
+            window.location.reload();
+        });
+    });
+
+    function addRow(element, message) {
+        var body = element.tBodies && element.tBodies[0];
+        if (!body || !element.dataset.streamFields) {
+            return;
+        }
+        var row = document.createElement('tr');
+        row.className = 'stream-new';
+        element.dataset.streamFields.split(',').forEach(function (field) {
+            var cell = document.createElement('td');
+            var value = message[field.trim()];
+            cell.textContent = value === null || value === undefined ? '' : value;
+            row.appendChild(cell);
+        });
+        var actions = document.createElement('td');
+        if (element.dataset.streamDelete) {
+            var form = document.createElement('form');
+            form.method = 'post';
+            form.action = element.dataset.streamDelete.replace(/0$/, message.id);
+            form.style.display = 'inline';
+            var button = document.createElement('button');
+            button.type = 'submit';
+            button.className = 'btn btn-danger btn-sm';
+            button.textContent = 'Delete';
+            form.appendChild(button);
+            actions.appendChild(form);
+        }
+        row.appendChild(actions);
+        body.insertBefore(row, body.firstChild);
+    }
+});
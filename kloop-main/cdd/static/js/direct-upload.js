@@ -0,0 +1,63 @@
+// Uploads files in forms marked data-direct-upload straight to object storage
+// using a presigned form from /api/uploads/presign. The file input is then
+// replaced by a hidden "<name>_name" field carrying the signed ticket the
+// server issued for the object. If the server has no direct upload
+// support (local storage), the form is submitted as a normal upload.
+document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('form[data-direct-upload]').forEach(function (form) {
+        form.addEventListener('submit', function (event) {
+            var inputs = Array.prototype.filter.call(
+                form.querySelectorAll('input[type="file"][data-upload-kind]'),
+                function (input) { return input.files.length > 0; });
+            if (!inputs.length || form.dataset.uploaded) {
+                return;
+            }
+            event.preventDefault();
+            Promise.all(inputs.map(uploadDirect)).then(function (names) {
+                names.forEach(function (name, i) {
+                    if (!name) {
+                        return;
+                    }
+                    var hidden = document.createElement('input');
+                    hidden.type = 'hidden';
+                    hidden.name = inputs[i].name + '_name';
+                    hidden.value = name;
+                    form.appendChild(hidden);
+                    inputs[i].disabled = true;
+                });
+            }).catch(function () {
+                // Fall back to uploading through the app.
+            }).then(function () {
+                form.dataset.uploaded = '1';
+                form.submit();
+            });
+        });
+    });
+
+    function uploadDirect(input) {
+        var file = input.files[0];
+        return fetch('/api/uploads/presign', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            credentials: 'same-origin',
+            body: JSON.stringify({kind: input.dataset.uploadKind, filename: file.name})
+        }).then(function (response) {
+            if (!response.ok) {
+                return null;
+            }
+            return response.json().then(function (presigned) {
+                var data = new FormData();
+                Object.keys(presigned.fields).forEach(function (key) {
+                    data.append(key, presigned.fields[key]);
+                });
+                data.append('file', file);
+                return fetch(presigned.url, {method: 'POST', body: data}).then(function (upload) {
+                    if (!upload.ok) {
+                        throw new Error('Direct upload failed');
+                    }
+                    return presigned.ticket;
+                });
+            });
+        });
+    }
+});
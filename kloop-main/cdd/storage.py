@@ -0,0 +1,245 @@
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import boto3
+    from botocore.config import Config as BotoConfig
+    from botocore.exceptions import ClientError
+except ImportError:  # only needed for the S3 backend
+    boto3 = None
+
+
+def _quarantine_day(now=None):
+    return (now or datetime.utcnow()).strftime('%Y-%m-%d')
+
+
+def _expired_day(name, today, retention_days):
+    try:
+        day = datetime.strptime(name, '%Y-%m-%d').date()
+    except ValueError:
+        return False
+    return (today - day).days > retention_days
+
+
+class LocalStorage:
+    """Uploads kept as flat files in one directory of this node."""
+
+    def __init__(self, directory, quarantine_dir):
+        self.directory = directory
+        self.quarantine_dir = quarantine_dir
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, name):
+        return os.path.join(self.directory, os.path.basename(name))
+
+    def save(self, name, stream):
+        destination = self.path(name)
+        partial = f"{destination}.{threading.get_ident()}.part"
+        with open(partial, 'wb') as f:
+            shutil.copyfileobj(stream, f, 1024 * 1024)
+        os.replace(partial, destination)
+        return os.path.basename(name)
+
+    def open(self, name):
+        return open(self.path(name), 'rb')
+
+    def exists(self, name):
+        return os.path.isfile(self.path(name))
+
+    def modified(self, name):
+        """Modification time as a timestamp, or None if the file does not exist."""
+        try:
+            return os.path.getmtime(self.path(name))
+        except OSError:
+            return None
+
+    def delete(self, name):
+        try:
+            os.remove(self.path(name))
+        except FileNotFoundError:
+            pass
+
+    def list(self):
+        """Yield (name, size, mtime) for every stored file, streamed with os.scandir."""
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    continue
+                yield entry.name, stat.st_size, stat.st_mtime
+
+    @contextmanager
+    def local_path(self, name):
+        yield self.path(name)
+
+    def download_url(self, name, filename=None, expires=300):
+        """Direct URL to the file, or None when it must be served by the app."""
+        return None
+
+    def presign_upload(self, name, max_size, expires=300):
+        """Form for a browser upload straight to storage, or None if unsupported."""
+        return None
+
+    def quarantine(self, name, now=None):
+        folder = os.path.join(self.quarantine_dir, _quarantine_day(now))
+        os.makedirs(folder, exist_ok=True)
+        destination = os.path.join(folder, os.path.basename(name))
+        # os.replace is atomic on the same filesystem; shutil.move copies across devices.
+        try:
+            os.replace(self.path(name), destination)
+        except OSError:
+            shutil.move(self.path(name), destination)
+        return destination
+
+    def purge_quarantine(self, retention_days, now=None):
+        """Delete quarantine folders older than ``retention_days``. Returns files removed."""
+        if not os.path.isdir(self.quarantine_dir):
+            return 0
+        today = (now or datetime.utcnow()).date()
+        removed = 0
+        with os.scandir(self.quarantine_dir) as entries:
+            for entry in entries:
+                if entry.is_dir() and _expired_day(entry.name, today, retention_days):
+                    removed += sum(len(files) for _, _, files in os.walk(entry.path))
+                    shutil.rmtree(entry.path, ignore_errors=True)
+        return removed
+
+
+class S3Storage:
+    """Uploads kept in an S3-compatible bucket (AWS S3, MinIO, ...).
+
+    Objects live under ``prefix``; downloads and direct uploads use presigned
+    URLs so file bytes never pass through the app.
+    """
+
+    def __init__(self, bucket, endpoint_url=None, region=None, access_key=None, secret_key=None,
+                 prefix='uploads/', quarantine_prefix='quarantine/', client=None):
+        if client is None:
+            if boto3 is None:
+                raise RuntimeError('The S3 storage backend requires boto3.')
+            client = boto3.client(
+                's3',
+                endpoint_url=endpoint_url,
+                region_name=region,
+                aws_access_key_id=access_key,
+                aws_secret_access_key=secret_key,
+                config=BotoConfig(signature_version='s3v4',
+                                  s3={'addressing_style': 'path' if endpoint_url else 'auto'}),
+            )
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.quarantine_prefix = quarantine_prefix
+
+    def key(self, name):
+        return self.prefix + os.path.basename(name)
+
+    def save(self, name, stream):
+        self.client.upload_fileobj(stream, self.bucket, self.key(name))
+        return os.path.basename(name)
+
+    def open(self, name):
+        return self.client.get_object(Bucket=self.bucket, Key=self.key(name))['Body']
+
+    def _head(self, name):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self.key(name))
+        except ClientError as exc:
+            if exc.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def exists(self, name):
+        return self._head(name) is not None
+
+    def modified(self, name):
+        head = self._head(name)
+        return head['LastModified'].timestamp() if head else None
+
+    def delete(self, name):
+        self.client.delete_object(Bucket=self.bucket, Key=self.key(name))
+
+    def _objects(self, prefix):
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            yield from page.get('Contents', [])
+
+    def list(self):
+        for item in self._objects(self.prefix):
+            name = item['Key'][len(self.prefix):]
+            if name and '/' not in name and not name.startswith('.'):
+                yield name, item['Size'], item['LastModified'].timestamp()
+
+    @contextmanager
+    def local_path(self, name):
+        """Download to a temporary file that keeps the object's extension."""
+        suffix = os.path.splitext(name)[1]
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                self.client.download_fileobj(self.bucket, self.key(name), f)
+            yield path
+        finally:
+            os.remove(path)
+
+    def download_url(self, name, filename=None, expires=300):
+        params = {'Bucket': self.bucket, 'Key': self.key(name)}
+        if filename:
+            params['ResponseContentDisposition'] = f'attachment; filename="{filename}"'
+        return self.client.generate_presigned_url('get_object', Params=params, ExpiresIn=expires)
+
+    def presign_upload(self, name, max_size, expires=300):
+        post = self.client.generate_presigned_post(
+            self.bucket, self.key(name),
+            Conditions=[['content-length-range', 1, max_size]],
+            ExpiresIn=expires,
+        )
+        return {'url': post['url'], 'fields': post['fields']}
+
+    def quarantine(self, name, now=None):
+        destination = f"{self.quarantine_prefix}{_quarantine_day(now)}/{os.path.basename(name)}"
+        self.client.copy_object(Bucket=self.bucket, Key=destination,
+                                CopySource={'Bucket': self.bucket, 'Key': self.key(name)})
+        self.delete(name)
+        return destination
+
+    def purge_quarantine(self, retention_days, now=None):
+        today = (now or datetime.utcnow()).date()
+        expired = [{'Key': item['Key']} for item in self._objects(self.quarantine_prefix)
+                   if _expired_day(item['Key'][len(self.quarantine_prefix):].split('/', 1)[0],
+                                   today, retention_days)]
+        for start in range(0, len(expired), 1000):
+            self.client.delete_objects(Bucket=self.bucket,
+                                       Delete={'Objects': expired[start:start + 1000], 'Quiet': True})
+        return len(expired)
+
+
+def create_storage(config, archive=False):
+    """Build the storage backend selected by ``STORAGE_BACKEND`` in a Flask config.
+
+    With ``archive``, the same kind of backend for cold archives: files in
+    ``ARCHIVE_FOLDER``, or objects under ``S3_ARCHIVE_PREFIX`` in the bucket.
+    """
+    backend = config.get('STORAGE_BACKEND', 'local')
+    if backend == 'local':
+        directory = config['ARCHIVE_FOLDER'] if archive else config['UPLOAD_FOLDER']
+        return LocalStorage(directory, config['UPLOAD_QUARANTINE_FOLDER'])
+    if backend == 's3':
+        return S3Storage(
+            config['S3_BUCKET'],
+            endpoint_url=config.get('S3_ENDPOINT_URL'),
+            region=config.get('S3_REGION'),
+            access_key=config.get('S3_ACCESS_KEY'),
+            secret_key=config.get('S3_SECRET_KEY'),
+            prefix=config.get('S3_ARCHIVE_PREFIX', 'archive/') if archive else 'uploads/',
+        )
+    raise ValueError(f"Unknown storage backend '{backend}'.")
@@ -0,0 +1,97 @@
+import bisect
+import re
+import threading
+import time
+import unicodedata
+
+_TOKEN_START_RE = re.compile(r'(?:^|(?<=[\W_]))\w', re.U)
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(text.casefold().split())
+
+
+class PrefixIndex:
+    """Sorted-array index answering prefix and token-prefix lookups.
+
+    Every title is stored once per word it contains, as the normalized text
+    from that word to the end ("senior python developer" is also stored as
+    "python developer" and "developer"). A lookup is a binary search for the
+    first key starting with the query followed by a short forward scan.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.built_at = None
+
+    def _keys_for(self, kind, item_id, label):
+        text = normalize(label)
+        return [(text[match.start():], 0 if match.start() == 0 else 1, kind, item_id)
+                for match in _TOKEN_START_RE.finditer(text)]
+
+    def _remove(self, kind, item_id):
+        entry = self.entries.pop((kind, item_id), None)
+        if entry is None:
+            return
+        for key in entry[1]:
+            position = bisect.bisect_left(self.keys, key)
+            if position < len(self.keys) and self.keys[position] == key:
+                del self.keys[position]
+
+    def replace(self, items):
+        """Rebuild from an iterable of (kind, id, label)."""
+        keys, entries = [], {}
+        for kind, item_id, label in items:
+            item_keys = self._keys_for(kind, item_id, label)
+            entries[(kind, item_id)] = (label, item_keys)
+            keys.extend(item_keys)
+        keys.sort()
+        with self.lock:
+            self.keys, self.entries = keys, entries
+            self.built_at = time.monotonic()
+
+    def expire(self):
+        """Mark a built index as due for a rebuild; lookups still use it."""
+        with self.lock:
+            if self.built_at is not None:
+                self.built_at = float('-inf')
+
+    def add(self, kind, item_id, label):
+        with self.lock:
+            self._remove(kind, item_id)
+            item_keys = self._keys_for(kind, item_id, label)
+            self.entries[(kind, item_id)] = (label, item_keys)
+            for key in item_keys:
+                bisect.insort(self.keys, key)
+
+    def remove(self, kind, item_id):
+        with self.lock:
+            self._remove(kind, item_id)
+
+    def lookup(self, query, limit=10, scan=200):
+        """Return up to ``limit`` (kind, id, label), whole-title prefixes first."""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        with self.lock:
+            position = bisect.bisect_left(self.keys, (prefix,))
+            candidates = []
+            for key in self.keys[position:position + scan]:
+                if not key[0].startswith(prefix):
+                    break
+                candidates.append(key)
+            entries = self.entries
+            candidates.sort(key=lambda key: (key[1], len(entries[(key[2], key[3])][0]), key[0]))
+            results, seen = [], set()
+            for _, _, kind, item_id in candidates:
+                if (kind, item_id) in seen:
+                    continue
+                seen.add((kind, item_id))
+                results.append((kind, item_id, entries[(kind, item_id)][0]))
+                if len(results) == limit:
+                    break
+        return results
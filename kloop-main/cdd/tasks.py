@@ -0,0 +1,237 @@
+import json
+import multiprocessing
+import random
+import signal
+import time
+import traceback
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+
+
+class TaskQueue:
+    """Durable task queue stored in a table of the application database.
+
+    Tasks are enqueued on the caller's session so they commit (or roll back)
+    together with the request's own changes. Workers claim tasks with a lease
+    (visibility timeout); a task whose worker dies becomes claimable again once
+    the lease expires. Failed tasks are retried with exponential backoff until
+    ``max_attempts`` is reached, after which they are marked ``dead``.
+    Once a task is done or dead its ``run_at`` records when it finished.
+    """
+
+    def __init__(self, db=None, visibility_timeout=300, max_attempts=5,
+                 backoff_base=2.0, backoff_cap=600.0):
+        self.handlers = {}
+        self.schedule = {}
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.db = None
+        self.table = None
+        if db is not None:
+            self.init_db(db)
+
+    def init_db(self, db):
+        self.db = db
+        self.table = sa.Table(
+            'task_queue', db.metadata,
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('name', sa.String(100), nullable=False),
+            sa.Column('payload', sa.Text, nullable=False),
+            sa.Column('status', sa.String(20), nullable=False, default='queued'),
+            sa.Column('attempts', sa.Integer, nullable=False, default=0),
+            sa.Column('max_attempts', sa.Integer, nullable=False),
+            sa.Column('run_at', sa.DateTime, nullable=False),
+            sa.Column('locked_until', sa.DateTime, nullable=True),
+            sa.Column('last_error', sa.Text, nullable=True),
+            sa.Column('created_at', sa.DateTime, nullable=False),
+            sa.Index('ix_task_queue_status_run_at', 'status', 'run_at'),
+        )
+
+    def task(self, name):
+        def decorator(func):
+            self.handlers[name] = func
+            return func
+        return decorator
+
+    def periodic(self, name, interval):
+        """Register a task that `run_worker` enqueues every ``interval`` seconds."""
+        def decorator(func):
+            self.handlers[name] = func
+            self.schedule[name] = interval
+            return func
+        return decorator
+
+    def enqueue_once(self, name, payload=None):
+        """Enqueue unless a task with this name is already waiting or running."""
+        t = self.table
+        pending = self.db.session.execute(
+            sa.select(t.c.id).where(t.c.name == name, t.c.status.in_(['queued', 'running'])).limit(1)
+        ).first()
+        if pending is None:
+            self.enqueue(name, payload)
+
+    def enqueue(self, name, payload=None, delay=0, max_attempts=None):
+        """Add a task to the current session. The caller commits."""
+        if name not in self.handlers:
+            raise KeyError(f"No task handler registered for '{name}'.")
+        now = datetime.utcnow()
+        self.db.session.execute(self.table.insert().values(
+            name=name,
+            payload=json.dumps(payload or {}),
+            status='queued',
+            attempts=0,
+            max_attempts=max_attempts or self.max_attempts,
+            run_at=now + timedelta(seconds=delay),
+            created_at=now,
+        ))
+
+    def claim(self):
+        """Lease the next due task, or return None if nothing is ready."""
+        t = self.table
+        now = datetime.utcnow()
+        next_id = (
+            sa.select(t.c.id)
+            .where(t.c.run_at <= now)
+            .where(sa.or_(
+                t.c.status == 'queued',
+                sa.and_(t.c.status == 'running', t.c.locked_until < now),
+            ))
+            .order_by(t.c.run_at, t.c.id)
+            .limit(1)
+            .scalar_subquery()
+        )
+        stmt = (
+            t.update()
+            .where(t.c.id == next_id)
+            .values(status='running', attempts=t.c.attempts + 1,
+                    locked_until=now + timedelta(seconds=self.visibility_timeout))
+            .returning(t.c.id, t.c.name, t.c.payload, t.c.attempts, t.c.max_attempts)
+        )
+        row = self.db.session.execute(stmt).first()
+        self.db.session.commit()
+        return row
+
+    def complete(self, task_id, attempts):
+        t = self.table
+        self.db.session.execute(
+            t.update()
+            .where(t.c.id == task_id, t.c.attempts == attempts)
+            .values(status='done', locked_until=None, last_error=None, run_at=datetime.utcnow())
+        )
+        self.db.session.commit()
+
+    def fail(self, task_id, attempts, max_attempts, error):
+        t = self.table
+        if attempts >= max_attempts:
+            values = {'status': 'dead', 'locked_until': None, 'run_at': datetime.utcnow()}
+        else:
+            delay = min(self.backoff_base ** attempts, self.backoff_cap)
+            delay = delay * (0.5 + random.random() / 2)
+            values = {'status': 'queued', 'locked_until': None,
+                      'run_at': datetime.utcnow() + timedelta(seconds=delay)}
+        self.db.session.execute(
+            t.update()
+            .where(t.c.id == task_id, t.c.attempts == attempts)
+            .values(last_error=error, **values)
+        )
+        self.db.session.commit()
+
+    def run_next(self):
+        """Claim and run a single task. Returns False when the queue is idle."""
+        row = self.claim()
+        if row is None:
+            return False
+        handler = self.handlers.get(row.name)
+        try:
+            if handler is None:
+                raise KeyError(f"No task handler registered for '{row.name}'.")
+            handler(**json.loads(row.payload))
+        except Exception:
+            self.db.session.rollback()
+            self.fail(row.id, row.attempts, row.max_attempts, traceback.format_exc())
+        else:
+            self.complete(row.id, row.attempts)
+        finally:
+            self.db.session.remove()
+        return True
+
+    def run_pending(self, limit=None):
+        """Drain due tasks in the current process. Returns the number run."""
+        count = 0
+        while limit is None or count < limit:
+            if not self.run_next():
+                break
+            count += 1
+        return count
+
+    def purge(self, older_than=timedelta(days=7), dead_older_than=timedelta(days=30)):
+        """Delete tasks that finished more than ``older_than`` ago, or
+        ``dead_older_than`` for dead ones. Returns the number of rows deleted.
+
+        Age is counted from when the task finished, so one that was delayed
+        or retried for longer than the window is still kept for inspection.
+        """
+        t = self.table
+        now = datetime.utcnow()
+        result = self.db.session.execute(
+            t.delete().where(sa.or_(
+                sa.and_(t.c.status == 'done', t.c.run_at < now - older_than),
+                sa.and_(t.c.status == 'dead', t.c.run_at < now - dead_older_than),
+            ))
+        )
+        self.db.session.commit()
+        return result.rowcount
+
+    def stats(self):
+        """{status: {'count', 'oldest'}}, oldest being the earliest ``run_at``."""
+        t = self.table
+        rows = self.db.session.execute(
+            sa.select(t.c.status, sa.func.count(), sa.func.min(t.c.run_at)).group_by(t.c.status)
+        ).all()
+        return {status: {'count': count, 'oldest': oldest} for status, count, oldest in rows}
+
+
+def _worker_loop(app, queue, poll_interval, stop):
+    # Connections must not be shared with the parent after fork.
+    with app.app_context():
+        queue.db.engine.dispose()
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        while not stop.is_set():
+            if not queue.run_next():
+                stop.wait(poll_interval)
+
+
+def run_worker(app, queue, processes=2, poll_interval=1.0):
+    """Run a pool of worker processes until interrupted."""
+    stop = multiprocessing.Event()
+    workers = [
+        multiprocessing.Process(target=_worker_loop, args=(app, queue, poll_interval, stop),
+                                daemon=True)
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+
+    def shutdown(signum, frame):
+        stop.set()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    next_run = {name: 0 for name in queue.schedule}
+    try:
+        while not stop.is_set() and any(w.is_alive() for w in workers):
+            now = time.time()
+            due = [name for name, at in next_run.items() if at <= now]
+            if due:
+                with app.app_context():
+                    for name in due:
+                        queue.enqueue_once(name)
+                        next_run[name] = now + queue.schedule[name]
+                    queue.db.session.commit()
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        stop.set()
+    for worker in workers:
+        worker.join()
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import LocalStorage  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def amco(tmp_path_factory):
+    """The app module, pointed at a scratch database before it is imported."""
+    workdir = tmp_path_factory.mktemp('amco')
+    os.environ['DATABASE_URL'] = f"sqlite:///{workdir / 'amco.db'}"
+    # UPLOAD_FOLDER is created relative to the working directory on import
+    os.chdir(workdir)
+    import app as amco
+    amco.app.config['TESTING'] = True
+    amco.limiter.enabled = False
+    return amco
+
+
+@pytest.fixture
+def app(amco, tmp_path, monkeypatch):
+    """A fresh database and upload/archive folders for each test, inside an app context."""
+    monkeypatch.setattr(amco, 'storage', LocalStorage(str(tmp_path / 'uploads'), str(tmp_path / 'quarantine')))
+    monkeypatch.setattr(amco, 'archive_storage', LocalStorage(str(tmp_path / 'archive'),
+                                                              str(tmp_path / 'quarantine')))
+    amco.read_job_archive.cache_clear()
+    with amco.app.app_context():
+        amco.db.engine.dispose()
+        path = amco.db.engine.url.database
+        if os.path.exists(path):
+            os.remove(path)
+        amco.create_database()
+        yield amco
+        amco.db.session.remove()
@@ -0,0 +1,104 @@
+import threading
+from datetime import datetime
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import analytics
+from analytics import ViewCounter
+
+NOON = datetime(2026, 10, 19, 12, 0)
+
+
+@pytest.fixture(autouse=True)
+def no_exit_hooks(monkeypatch):
+    monkeypatch.setattr(analytics.atexit, 'register', lambda func: None)
+
+
+class Sink:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.flushed = []
+        self.called = threading.Event()
+
+    def __call__(self, counts):
+        self.called.set()
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError('database is locked')
+        self.flushed.append(dict(counts))
+
+
+def test_views_are_counted_per_hour():
+    sink = Sink()
+    counter = ViewCounter(sink, interval=3600)
+    counter.record('product', 'impression', [1, 2, 1], now=NOON.replace(minute=5))
+    counter.record('product', 'impression', [1], now=NOON.replace(minute=59))
+    counter.record('product', 'view', [1], now=NOON.replace(hour=13))
+    assert counter.flush_now() == 3
+    assert sink.flushed == [{
+        ('product', 'impression', NOON, 1): 3,
+        ('product', 'impression', NOON, 2): 1,
+        ('product', 'view', NOON.replace(hour=13), 1): 1,
+    }]
+    assert counter.flush_now() == 0
+    assert len(sink.flushed) == 1
+
+
+def test_counts_are_kept_after_a_failed_flush():
+    sink = Sink(failures=1)
+    counter = ViewCounter(sink, interval=3600)
+    counter.record('job', 'view', [7], now=NOON)
+    with pytest.raises(RuntimeError):
+        counter.flush_now()
+    counter.record('job', 'view', [7, 8], now=NOON)
+    assert counter.flush_now() == 2
+    assert sink.flushed == [{('job', 'view', NOON, 7): 2, ('job', 'view', NOON, 8): 1}]
+
+
+def test_counts_inherited_across_fork_are_dropped(monkeypatch):
+    counter = ViewCounter(Sink(), interval=3600)
+    counter.record('blog', 'view', [1], now=NOON)
+    # The child process sees its parent's pending counts and pid.
+    child = counter._pid + 1
+    monkeypatch.setattr(analytics.os, 'getpid', lambda: child)
+    counter.record('blog', 'view', [2], now=NOON)
+    assert counter.drain() == {('blog', 'view', NOON, 2): 1}
+    assert counter._pid == child
+
+
+def test_flusher_runs_early_when_many_keys_are_pending():
+    sink = Sink()
+    counter = ViewCounter(sink, interval=3600, max_keys=3)
+    counter.record('news', 'impression', [1, 2], now=NOON)
+    assert not sink.called.wait(0.2)
+    counter.record('news', 'impression', [3], now=NOON)
+    assert sink.called.wait(5)
+
+
+def view_counts(app):
+    return {(row.kind, row.metric, row.item_id): row.count for row in app.ItemViewHourly.query}
+
+
+def test_flushes_are_added_to_stored_counts(app):
+    app.flush_item_views({('product', 'view', NOON, 1): 2, ('product', 'impression', NOON, 1): 5})
+    # Another process flushing the same hour
+    app.flush_item_views({('product', 'view', NOON, 1): 3, ('product', 'view', NOON, 2): 1})
+    assert view_counts(app) == {('product', 'view', 1): 5, ('product', 'impression', 1): 5,
+                                ('product', 'view', 2): 1}
+
+
+def rename_table(app, old, new):
+    with app.db.engine.begin() as connection:
+        connection.exec_driver_sql(f'ALTER TABLE {old} RENAME TO {new}')
+
+
+def test_a_failed_upsert_keeps_the_counts(app):
+    counter = ViewCounter(app.flush_item_views, interval=3600)
+    counter.record('product', 'view', [1], now=NOON)
+    rename_table(app, 'item_view_hourly', 'item_view_hourly_away')
+    with pytest.raises(OperationalError):
+        counter.flush_now()
+    rename_table(app, 'item_view_hourly_away', 'item_view_hourly')
+    assert counter.flush_now() == 1
+    assert view_counts(app) == {('product', 'view', 1): 1}
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+
+from flask import Flask, request
+
+from asgibridge import WSGIBridge
+
+
+def scope(method='GET', path='/', headers=()):
+    return {'type': 'http', 'method': method, 'path': path, 'query_string': b'', 'headers': list(headers)}
+
+
+def call(bridge, method='GET', path='/', body=b''):
+    """Run one request through the bridge; (status, body)."""
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(bridge(scope(method, path, [(b'content-length', str(len(body)).encode())]), receive, send))
+    return sent[0]['status'], b''.join(m.get('body', b'') for m in sent[1:])
+
+
+def test_disconnect_stops_streaming_and_closes_response():
+    pulled, closed = [], threading.Event()
+
+    class Stream:
+        def __iter__(self):
+            while True:
+                pulled.append(True)
+                yield b'data: tick\n\n'
+
+        def close(self):
+            closed.set()
+
+    def app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/event-stream')])
+        return Stream()
+
+    bridge = WSGIBridge(app, threads=2)
+
+    async def run():
+        gone = asyncio.Event()
+        sent = []
+
+        async def receive():
+            if not sent:
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await gone.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+            if len(sent) == 5:
+                gone.set()
+            await asyncio.sleep(0)
+
+        await asyncio.wait_for(bridge(scope(), receive, send), timeout=5)
+        return sent
+
+    sent = asyncio.run(run())
+    assert closed.is_set()
+    assert sent[-1].get('more_body', False) is True
+    assert len(pulled) < 50
+
+
+def test_body_limits_are_left_to_the_app():
+    app = Flask(__name__)
+    app.config['MAX_CONTENT_LENGTH'] = 1024
+
+    @app.post('/small')
+    def small():
+        return str(len(request.get_data()))
+
+    @app.post('/large')
+    def large():
+        request.max_content_length = 4096
+        return str(len(request.get_data()))
+
+    bridge = WSGIBridge(app, max_body=4096)
+    client = app.test_client()
+    for path, size, expected in [('/small', 512, 200), ('/small', 2048, 413), ('/large', 2048, 200)]:
+        assert call(bridge, 'POST', path, b'x' * size)[0] == expected
+        assert client.post(path, data=b'x' * size).status_code == expected
+    assert call(bridge, 'POST', '/large', b'x' * 8192)[0] == 413
+
+
+def test_application_accepts_catalog_imports(amco):
+    import asgi
+    assert asgi.application.max_body >= amco.app.config['MAX_IMPORT_SIZE']
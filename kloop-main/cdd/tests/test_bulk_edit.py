@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import event
+
+ALL = {'q': '', 'min_price': None, 'max_price': None}
+
+
+def add_products(app, count):
+    app.db.session.add_all([
+        app.Product(name=f'Chair {i}', price=10.0, image='chair.png', description='A chair.')
+        for i in range(count)
+    ])
+    app.db.session.commit()
+
+
+def test_each_chunk_is_audited_with_its_own_commit(app):
+    add_products(app, 5)
+    updates = []
+
+    def fail_third_chunk(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('UPDATE product'):
+            updates.append(statement)
+            if len(updates) == 3:
+                raise RuntimeError('disk full')
+
+    engine = app.db.engine
+    event.listen(engine, 'before_cursor_execute', fail_third_chunk)
+    try:
+        with pytest.raises(RuntimeError):
+            app.bulk_update_products(ALL, 'delta', 5, chunk_size=2)
+    finally:
+        event.remove(engine, 'before_cursor_execute', fail_third_chunk)
+
+    prices = [p.price for p in app.Product.query.order_by(app.Product.id)]
+    assert prices == [15.0, 15.0, 15.0, 15.0, 10.0]
+    details = [h.details for h in app.ActionHistory.query.filter_by(action='Bulk Edited')
+               .order_by(app.ActionHistory.id)]
+    assert details == [
+        'Bulk edited 2 products (IDs 1-2): price delta 5.',
+        'Bulk edited 2 products (IDs 3-4): price delta 5.',
+    ]
+
+
+def test_price_list_audits_every_chunk(app):
+    add_products(app, 3)
+    assert app.bulk_set_prices([(1, '20'), (2, '21'), (3, '22')], chunk_size=2) == 3
+    assert app.ActionHistory.query.filter_by(action='Bulk Edited').count() == 2
+
+
+@pytest.mark.parametrize('amount', ['nan', 'inf', '-inf'])
+def test_view_rejects_non_finite_amounts(app, amount):
+    add_products(app, 1)
+    client = app.app.test_client()
+    with client.session_transaction() as session:
+        session['admin_logged_in'] = True
+    response = client.post('/admin/bulk_edit_products', data={'operation': 'set', 'amount': amount})
+    assert response.status_code == 302
+    assert app.Product.query.one().price == 10.0
+    with client.session_transaction() as session:
+        assert ('error', 'Choose a price operation and amount.') in session['_flashes']
+
+
+def test_non_finite_amounts_are_rejected_outside_the_view(app, tmp_path):
+    add_products(app, 1)
+    with pytest.raises(ValueError):
+        app.bulk_update_products(ALL, 'percent', float('nan'))
+    with pytest.raises(ValueError):
+        app.bulk_set_prices([(1, 'inf')])
+
+    runner = app.app.test_cli_runner()
+    result = runner.invoke(args=['bulk-edit-products', '--set-price', 'nan'])
+    assert result.exit_code == 2
+    assert 'finite' in result.output
+    price_list = tmp_path / 'prices.csv'
+    price_list.write_text('id,price\n1,inf\n')
+    result = runner.invoke(args=['bulk-edit-products', '--price-list', str(price_list)])
+    assert result.exit_code == 1
+    assert 'finite' in result.output
+    assert app.Product.query.one().price == 10.0
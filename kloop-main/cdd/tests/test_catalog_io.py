@@ -0,0 +1,47 @@
+import io
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import catalog_io
+
+
+def test_image_source_rejects_files_that_are_not_archives(tmp_path):
+    path = tmp_path / 'images.zip'
+    path.write_bytes(b'not a zip')
+    with pytest.raises(ValueError):
+        catalog_io.ImageSource(str(path))
+
+
+def test_image_source_closes_worker_archives(tmp_path):
+    path = tmp_path / 'images.zip'
+    with zipfile.ZipFile(path, 'w') as archive:
+        for name in ('a.png', 'b.png', 'c.png'):
+            archive.writestr(f'img/{name}', name)
+
+    def read(name):
+        with source.open(name) as image:
+            return image.read()
+
+    with catalog_io.ImageSource(str(path)) as source:
+        with ThreadPoolExecutor(3) as pool:
+            assert list(pool.map(read, ['a.png', 'b.png', 'c.png'] * 4)) == [b'a.png', b'b.png', b'c.png'] * 4
+        archives = list(source._archives)
+        assert archives
+    assert all(archive.fp is None for archive in archives)
+    assert source._archives == []
+
+
+def test_import_rejects_non_zip_images(app):
+    client = app.app.test_client()
+    with client.session_transaction() as session:
+        session['admin_logged_in'] = True
+    response = client.post('/admin/import_products', data={
+        'file': (io.BytesIO(b'name,price\nDesk,10\n'), 'products.csv'),
+        'images': (io.BytesIO(b'not a zip'), 'images.png'),
+    }, content_type='multipart/form-data')
+    assert response.status_code == 302
+    assert app.Product.query.count() == 0
+    with client.session_transaction() as session:
+        assert ('error', 'Product images must be uploaded as a ZIP archive.') in session['_flashes']
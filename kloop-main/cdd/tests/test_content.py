@@ -0,0 +1,122 @@
+import html
+import re
+
+import pytest
+
+from content import excerpt, render_markdown, safe_url
+
+_ATTR_RE = re.compile(r'<(\w+)((?:\s+[\w-]+="[^"]*")*)\s*/?>')
+
+
+def attributes(rendered):
+    """(tag, {name: value}) for every tag, with values decoded as a browser would."""
+    for match in _ATTR_RE.finditer(rendered):
+        yield match.group(1), {name: html.unescape(value)
+                               for name, value in re.findall(r'([\w-]+)="([^"]*)"', match.group(2))}
+
+
+def assert_no_active_urls(rendered):
+    assert rendered.count('<') == rendered.count('>')
+    for tag, attrs in attributes(rendered):
+        assert set(attrs) <= {'href', 'src', 'alt', 'rel'}, (tag, attrs)
+        for name in ('href', 'src'):
+            url = re.sub(r'[\x00-\x20]', '', attrs.get(name, '')).lower()
+            assert not url.startswith(('javascript:', 'data:', 'vbscript:')), rendered
+
+
+@pytest.mark.parametrize('source', [
+    '<script>alert(1)</script>',
+    '<SCRIPT src=//evil.example></SCRIPT>',
+    '<img src=x onerror=alert(1)>',
+    '```\n<script>alert(1)</script>\n```',
+    '> <script>alert(1)</script>',
+])
+def test_raw_html_is_escaped(source):
+    rendered = render_markdown(source)
+    assert '<script' not in rendered.lower()
+    assert '<img' not in rendered
+    assert '&lt;' in rendered
+
+
+@pytest.mark.parametrize('url', [
+    'javascript:alert(1)',
+    'JaVaScRiPt:alert(1)',
+    ' javascript:alert(1)',
+    'jav&#x61;script:alert(1)',
+    '&#106;avascript:alert(1)',
+    'java&#9;script:alert(1)',
+    'java&#x0A;script:alert(1)',
+    'javascript&colon;alert(1)',
+    'java\tscript:alert(1)',
+    'data:text/html;base64,PHNjcmlwdD4=',
+    'DATA:image/svg+xml,x',
+    'vbscript:msgbox(1)',
+])
+def test_unsafe_schemes_never_reach_an_attribute(url):
+    for source in (f'[click]({url})', f'![pic]({url})', f'<{url}>'):
+        assert_no_active_urls(render_markdown(source))
+
+
+@pytest.mark.parametrize('url', ['javascript:x', 'java\tscript:x', '&#x6A;avascript:x', ' data:x', 'Data:x'])
+def test_safe_url_rejects_obfuscated_schemes(url):
+    assert safe_url(url) is None
+
+
+@pytest.mark.parametrize('url', ['http://example.com/', 'HTTPS://example.com/', 'mailto:a@example.com',
+                                 '/blog/1', 'page#top', 'images/a:b.png'])
+def test_safe_url_keeps_allowed_and_relative_urls(url):
+    assert safe_url(url) == url
+
+
+def test_links_and_images_render():
+    rendered = render_markdown('[**Shop**](https://example.com/a?b=1&c=2 "Title") ![Desk](/static/desk.png)')
+    assert rendered == (
+        '<p><a href="https://example.com/a?b=1&amp;c=2" rel="nofollow noopener"><strong>Shop</strong></a> '
+        '<img src="/static/desk.png" alt="Desk"></p>'
+    )
+
+
+@pytest.mark.parametrize('source', [
+    '[x](http://a.example/"onmouseover="alert(1))',
+    "[x](http://a.example/'onmouseover='alert(1))",
+    '![a" onerror="alert(1)](http://a.example/x.png)',
+    '![a](http://a.example/x.png"onerror="alert(1))',
+    '[a" onclick="alert(1)](http://a.example/)',
+    '<http://a.example/"onmouseover="alert(1)>',
+])
+def test_quotes_cannot_break_out_of_attributes(source):
+    assert_no_active_urls(render_markdown(source))
+
+
+def test_code_spans_are_literal():
+    rendered = render_markdown('Use `<b>**bold**</b>` or ``a `tick` here``.')
+    assert rendered == ('<p>Use <code>&lt;b&gt;**bold**&lt;/b&gt;</code> or '
+                        '<code>a `tick` here</code>.</p>')
+
+
+def test_code_span_wins_over_link_url():
+    rendered = render_markdown('[y](`javascript:alert(1)`)')
+    assert rendered == '<p>[y](<code>javascript:alert(1)</code>)</p>'
+    assert_no_active_urls(rendered)
+
+
+def test_code_span_inside_link_text():
+    assert render_markdown('[`run()`](http://a.example/)') == (
+        '<p><a href="http://a.example/" rel="nofollow noopener"><code>run()</code></a></p>')
+
+
+def test_placeholder_characters_in_source_are_dropped():
+    assert render_markdown('a\x000\x00b `c`') == '<p>a0b <code>c</code></p>'
+
+
+def test_excerpt_keeps_short_text_whole():
+    assert excerpt(render_markdown('# Hi\n\nFish &amp; chips')) == 'Hi Fish &amp; chips'
+    assert excerpt('<p>Fish &amp; chips</p>') == 'Fish & chips'
+
+
+def test_excerpt_cuts_at_a_word_boundary():
+    rendered = render_markdown('One two three, four five six.')
+    assert excerpt(rendered, 16) == 'One two three…'
+    assert excerpt(rendered, 19) == 'One two three, four…'
+    assert excerpt('<p>' + 'x' * 30 + '</p>', 10) == 'x' * 10 + '…'
+    assert len(excerpt(render_markdown('word ' * 100))) <= 201
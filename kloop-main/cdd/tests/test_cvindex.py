@@ -0,0 +1,147 @@
+import re
+import zipfile
+import zlib
+
+import pytest
+
+import cvindex
+
+
+def write_pdf(path, content, compress=True):
+    stream = zlib.compress(content) if compress else content
+    dictionary = b'<< /Length %d%s >>' % (len(stream), b' /Filter /FlateDecode' if compress else b'')
+    path.write_bytes(b'%PDF-1.4\n1 0 obj\n' + dictionary + b'\nstream\n' + stream + b'\nendstream\nendobj\n%%EOF\n')
+    return str(path)
+
+
+def write_docx(path, paragraphs):
+    ns = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+    body = ''.join(f'<w:p>{"".join(f"<w:r><w:t>{run}</w:t></w:r>" for run in runs)}</w:p>'
+                   for runs in paragraphs)
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('word/document.xml', f'<w:document xmlns:w="{ns}"><w:body>{body}</w:body></w:document>')
+    return str(path)
+
+
+@pytest.fixture
+def no_pypdf(monkeypatch):
+    monkeypatch.setattr(cvindex, 'PdfReader', None)
+
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_pdf_fallback_reads_text_operators(tmp_path, no_pypdf, compress):
+    content = (b'BT /F1 12 Tf (Senior \\(lead\\) welder) Tj ET\n'
+               b'BT [(Caf) -20 (\\351 owner)] TJ ET\n'
+               b'BT (Tab\\tand \\101\\102C) Tj ET')
+    path = write_pdf(tmp_path / 'cv.pdf', content, compress)
+    assert cvindex.extract_text(path) == 'Senior (lead) welder Café owner Tab and ABC'
+
+
+def test_pdf_fallback_ignores_streams_without_text(tmp_path, no_pypdf):
+    path = write_pdf(tmp_path / 'scan.pdf', b'\x89PNG not text at all')
+    assert cvindex.extract_text(path) == ''
+
+
+def test_docx_paragraphs_become_text(tmp_path):
+    path = write_docx(tmp_path / 'cv.docx', [['Forklift ', 'driver'], [], ['Licence: C1']])
+    assert cvindex.extract_text(path) == 'Forklift driver Licence: C1'
+
+
+def test_plain_text_is_normalized(tmp_path):
+    path = tmp_path / 'CV.TXT'
+    path.write_bytes('ﬁtter\x07 and\r\n\r\n  welder \xff'.encode('utf-8') + b'\xff')
+    assert cvindex.extract_text(str(path)) == 'fitter and welder ÿ�'
+
+
+def test_unsupported_and_broken_files(tmp_path):
+    image = tmp_path / 'photo.png'
+    image.write_bytes(b'\x89PNG')
+    assert cvindex.extract_text(str(image)) == ''
+    broken = tmp_path / 'cv.docx'
+    broken.write_bytes(b'not a zip')
+    text, error = cvindex.extract_safely(str(broken))
+    assert text == '' and error.startswith('BadZipFile')
+
+
+def test_match_expression_quotes_prefix_terms():
+    assert cvindex.match_expression('python "OR" NEAR(x') == '"python"* OR "OR"* OR "NEAR"* OR "x"*'
+    assert cvindex.match_expression(' -*"() ') == ''
+
+
+def add_applicant(app, job_id, cv_text, name='A'):
+    applicant = app.AppliedJob(job_id=job_id, first_name=name, father_name='B', applicant_email=f'{name}@x',
+                               cv_text=cv_text)
+    app.db.session.add(applicant)
+    app.db.session.commit()
+    return applicant.id
+
+
+@pytest.fixture
+def job(app):
+    job = app.Job(title='Welder', description='Weld things', requirements='Experience')
+    app.db.session.add(job)
+    app.db.session.commit()
+    return job.id
+
+
+def search_ids(app, job_id, query):
+    return [applied_job_id for applied_job_id, _, _ in cvindex.search(app.db.session, job_id, query)]
+
+
+def test_bm25_ranks_denser_matches_first(app, job):
+    once = add_applicant(app, job, 'Welding once, then years of accounting, payroll, audits and tax returns.')
+    often = add_applicant(app, job, 'Welder. Welded pipelines; MIG welding and TIG welding.')
+    accountant = add_applicant(app, job, 'Accountant.')
+    add_applicant(app, job, None)
+    results = cvindex.search(app.db.session, job, 'weld')
+    assert [r[0] for r in results] == [often, once]
+    assert results[0][1] > results[1][1] > 0
+    # Porter stemming and prefixes: 'welds' and 'weld*' reach 'welding'.
+    assert set(search_ids(app, job, 'welds')) == {often, once}
+    assert set(search_ids(app, job, 'acc')) == {once, accountant}
+
+
+def test_search_is_limited_to_one_job(app, job):
+    other = app.Job(title='Driver', description='Drive', requirements='Licence')
+    app.db.session.add(other)
+    app.db.session.commit()
+    mine = add_applicant(app, job, 'Welder')
+    add_applicant(app, other.id, 'Welder')
+    assert search_ids(app, job, 'welder') == [mine]
+
+
+def test_index_follows_updates_and_deletes(app, job):
+    applicant_id = add_applicant(app, job, 'Python developer')
+    applicant = app.db.session.get(app.AppliedJob, applicant_id)
+    applicant.cv_text = 'Forklift driver'
+    app.db.session.commit()
+    assert search_ids(app, job, 'python') == []
+    assert search_ids(app, job, 'forklift') == [applicant_id]
+
+    pending = add_applicant(app, job, None, name='P')
+    app.db.session.get(app.AppliedJob, pending).cv_text = 'Forklift instructor'
+    app.db.session.commit()
+    assert sorted(search_ids(app, job, 'forklift')) == [applicant_id, pending]
+
+    app.db.session.delete(applicant)
+    app.db.session.commit()
+    assert search_ids(app, job, 'forklift') == [pending]
+    app.db.session.execute(app.db.delete(app.AppliedJob).where(app.AppliedJob.job_id == job))
+    app.db.session.commit()
+    assert search_ids(app, job, 'forklift') == []
+    count = app.db.session.execute(app.db.text('SELECT count(*) FROM applied_job_fts')).scalar()
+    assert count == 0
+
+
+def test_applied_jobs_view_searches_cvs(app, job):
+    add_applicant(app, job, 'Accountant with payroll experience.', name='Ann')
+    add_applicant(app, job, 'Certified <b>welder</b>, pipe welding.', name='Bob')
+    client = app.app.test_client()
+    page = client.get(f'/vadmin/applied_jobs/{job}?q=weld').get_data(as_text=True)
+    assert 'Bob' in page and 'Ann' not in page
+    assert '<mark>welder</mark>' in page
+    assert '&lt;b&gt;' in page and '<b>welder' not in page
+    page = client.get(f'/vadmin/applied_jobs/{job}?q=plumber').get_data(as_text=True)
+    assert 'No CVs match "plumber"' in page
+    page = client.get(f'/vadmin/applied_jobs/{job}?q=%22%2A').get_data(as_text=True)
+    assert re.search(r'No CVs match', page)
@@ -0,0 +1,128 @@
+import os
+import sqlite3
+
+import pytest
+
+import dbmaint
+
+
+class RecordingConnection(sqlite3.Connection):
+    backups = []
+
+    def backup(self, target, **kwargs):
+        self.backups.append(kwargs.get('pages'))
+        return super().backup(target, **kwargs)
+
+
+class FailingCheck(sqlite3.Connection):
+    def execute(self, sql, *args):
+        if sql == 'PRAGMA quick_check':
+            return super().execute("SELECT 'row 1 missing from index ix_item_n'")
+        return super().execute(sql, *args)
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / 'app.db')
+    connection = sqlite3.connect(path, isolation_level=None)
+    connection.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, payload TEXT)')
+    connection.executemany('INSERT INTO item (payload) VALUES (?)', [('x' * 1000,) for _ in range(200)])
+    yield path, connection
+    connection.close()
+
+
+@pytest.fixture(autouse=True)
+def no_pauses(monkeypatch):
+    monkeypatch.setattr(dbmaint.time, 'sleep', lambda seconds: None)
+
+
+def count(path):
+    with sqlite3.connect(path) as connection:
+        return connection.execute('SELECT count(*) FROM item').fetchone()[0]
+
+
+def test_backup_copies_and_checks_the_database(database, tmp_path):
+    path, _ = database
+    steps = []
+    result = dbmaint.backup(lambda: sqlite3.connect(path), str(tmp_path / 'backups'), pages=16,
+                            progress=lambda done, total: steps.append(done))
+    assert os.path.basename(result).startswith('backup-') and result.endswith('.db')
+    assert count(result) == 200
+    assert len(steps) > 1
+    assert os.listdir(tmp_path / 'backups') == [os.path.basename(result)]
+
+
+def test_backup_finishes_in_one_step_after_too_many_restarts(database, tmp_path):
+    path, writer = database
+    RecordingConnection.backups = []
+
+    def write(done, total):
+        # Every write by another connection restarts the copy.
+        writer.execute("INSERT INTO item (payload) VALUES ('during backup')")
+
+    result = dbmaint.backup(lambda: sqlite3.connect(path, factory=RecordingConnection),
+                            str(tmp_path / 'backups'), pages=4, max_restarts=2, progress=write)
+    assert RecordingConnection.backups == [4, -1]
+    assert count(result) == count(path)
+
+
+def test_failed_check_removes_the_partial_copy(database, tmp_path, monkeypatch):
+    path, _ = database
+    connect = sqlite3.connect
+    monkeypatch.setattr(dbmaint.sqlite3, 'connect', lambda target: connect(target, factory=FailingCheck))
+    with pytest.raises(sqlite3.DatabaseError, match='row 1 missing'):
+        dbmaint.backup(lambda: connect(path), str(tmp_path / 'backups'))
+    assert os.listdir(tmp_path / 'backups') == []
+
+
+def test_prune_backups_keeps_the_newest(tmp_path):
+    names = ['amco-20260101-000000.db', 'amco-20260102-000000.db', 'amco-20260103-000000.db',
+             'amco-20260104-000000.db.part', 'other-20250101-000000.db']
+    for name in names:
+        (tmp_path / name).write_bytes(b'')
+    removed = dbmaint.prune_backups(str(tmp_path), prefix='amco', keep=2)
+    assert [os.path.basename(p) for p in removed] == ['amco-20260101-000000.db']
+    assert sorted(os.listdir(tmp_path)) == names[1:]
+    dbmaint.prune_backups(str(tmp_path), prefix='amco', keep=0)
+    assert sorted(os.listdir(tmp_path)) == names[3:]
+
+
+def test_incremental_vacuum_needs_incremental_mode(database):
+    _, connection = database
+    connection.execute('DELETE FROM item')
+    assert dbmaint.pragma(connection, 'freelist_count') > 0
+    assert dbmaint.incremental_vacuum(connection) is None
+
+
+def test_incremental_vacuum_frees_pages_in_steps(database):
+    path, connection = database
+    dbmaint.enable_incremental_vacuum(connection)
+    assert dbmaint.pragma(connection, 'auto_vacuum') == 2
+    connection.execute('DELETE FROM item WHERE id > 20')
+    free = dbmaint.pragma(connection, 'freelist_count')
+    assert free > 20
+    size = os.path.getsize(path)
+    assert dbmaint.incremental_vacuum(connection, pages=8, limit=10) == 10
+    assert dbmaint.incremental_vacuum(connection, pages=8) == free - 10
+    assert dbmaint.pragma(connection, 'freelist_count') == 0
+    assert os.path.getsize(path) < size
+    assert dbmaint.incremental_vacuum(connection) == 0
+
+
+def test_checkpoint_needs_wal_mode(database):
+    _, connection = database
+    assert dbmaint.checkpoint(connection) is None
+    connection.execute('PRAGMA journal_mode = WAL')
+    connection.execute("INSERT INTO item (payload) VALUES ('wal')")
+    busy, wal_pages, done = dbmaint.checkpoint(connection, 'truncate')
+    assert busy == 0 and wal_pages == done
+    with pytest.raises(ValueError):
+        dbmaint.checkpoint(connection, 'everything')
+
+
+def test_integrity_check_reports_foreign_key_problems(database):
+    _, connection = database
+    assert dbmaint.integrity_check(connection) == []
+    connection.execute('CREATE TABLE tag (id INTEGER PRIMARY KEY, item_id INTEGER REFERENCES item (id))')
+    connection.execute('INSERT INTO tag (item_id) VALUES (999)')
+    assert dbmaint.integrity_check(connection, quick=True) == ['foreign key: tag row 1 -> item']
@@ -0,0 +1,32 @@
+from datetime import date
+
+import pytest
+
+
+@pytest.fixture
+def feeds_app(app, monkeypatch):
+    monkeypatch.setitem(app.app.config, 'SITE_URL', 'https://amco.example/site')
+    app.documents.invalidate(*app.documents.builders)
+    yield app
+    app.documents.invalidate(*app.documents.builders)
+
+
+def test_cached_feed_links_use_site_url(feeds_app):
+    feeds_app.db.session.add(feeds_app.BlogPost('Hello', 'Body', 'Abebe'))
+    feeds_app.db.session.commit()
+    client = feeds_app.app.test_client()
+    first = client.get('/feeds/blog.atom', base_url='http://attacker.example').get_data(as_text=True)
+    second = client.get('/feeds/blog.atom', base_url='http://localhost').get_data(as_text=True)
+    assert first == second
+    assert 'https://amco.example/site/bloog/post/1' in first
+    assert 'attacker.example' not in first
+
+
+def test_calendar_uids_use_site_host(feeds_app):
+    feeds_app.db.session.add(feeds_app.Event(title='Open day', description='Visit us', date=date.today(),
+                                             location='Addis Ababa'))
+    feeds_app.db.session.commit()
+    body = feeds_app.app.test_client().get('/feeds/events.ics', base_url='http://attacker.example') \
+        .get_data(as_text=True)
+    assert 'UID:event-1@amco.example' in body
+    assert 'attacker.example' not in body
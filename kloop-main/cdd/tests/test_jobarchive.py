@@ -0,0 +1,124 @@
+import io
+import zipfile
+from datetime import datetime, timedelta
+
+import pytest
+
+import jobarchive
+
+
+def pack(applicants, files):
+    def open_cv(name):
+        if name not in files:
+            raise FileNotFoundError(name)
+        return io.BytesIO(files[name])
+
+    buffer = io.BytesIO()
+    packed = jobarchive.write(buffer, {'id': 1, 'deadline': datetime(2024, 1, 1)}, applicants, open_cv)
+    buffer.seek(0)
+    return packed, buffer
+
+
+def test_write_read_round_trip_records_missing_cvs():
+    packed, buffer = pack([{'id': 5, 'first_name': 'Abebe', 'cv_name': 'cv.pdf'},
+                           {'id': 6, 'first_name': 'Sara', 'cv_name': 'gone.pdf'},
+                           {'id': 7, 'first_name': 'Hana', 'cv_name': None}],
+                          {'cv.pdf': b'%PDF-1.4 cv'})
+    assert packed == 1
+    jobarchive.verify(buffer)
+    job, applicants = jobarchive.read(buffer)
+    assert job == {'id': 1, 'deadline': '2024-01-01T00:00:00'}
+    assert [(a['id'], a['cv_member']) for a in applicants] == [(5, 'cvs/5/cv.pdf'), (6, None), (7, None)]
+    with zipfile.ZipFile(buffer) as bundle:
+        assert bundle.read('cvs/5/cv.pdf') == b'%PDF-1.4 cv'
+
+
+def test_verify_rejects_a_corrupt_member():
+    _, buffer = pack([{'id': 5, 'cv_name': 'cv.pdf'}], {'cv.pdf': b'hello world ' * 100})
+    data = bytearray(buffer.getvalue())
+    with zipfile.ZipFile(io.BytesIO(bytes(data))) as bundle:
+        info = bundle.getinfo('cvs/5/cv.pdf')
+    data[info.header_offset + 30 + len(info.filename) + len(info.extra) + 3] ^= 0xFF
+    with pytest.raises(zipfile.BadZipFile):
+        jobarchive.verify(io.BytesIO(bytes(data)))
+
+
+def add_job(app, title, closed_days_ago):
+    job = app.Job(title=title, description='Build things', requirements='Python',
+                  deadline=datetime.now() - timedelta(days=closed_days_ago))
+    app.db.session.add(job)
+    app.db.session.commit()
+    return job
+
+
+def add_applicant(app, job, email, cv_name, content=b'cv'):
+    if content is not None:
+        app.storage.save(cv_name, io.BytesIO(content))
+    applicant = app.AppliedJob(job_id=job.id, first_name='A', father_name='B', applicant_email=email,
+                               gender='female', age=30, cv_path=f'uploads/{cv_name}')
+    app.db.session.add(applicant)
+    app.db.session.commit()
+    return applicant
+
+
+def applicants_of(app, job_id):
+    return app.AppliedJob.query.filter_by(job_id=job_id).order_by(app.AppliedJob.id).all()
+
+
+def test_archive_keeps_cvs_still_used_by_live_applications(app):
+    old = add_job(app, 'Old', closed_days_ago=400)
+    live = add_job(app, 'Live', closed_days_ago=-30)
+    add_applicant(app, old, 'one@example.com', 'unique-one.pdf')
+    add_applicant(app, old, 'two@example.com', 'cv.pdf', b'shared')
+    # Stored before upload names were unique: both rows point at one file
+    add_applicant(app, live, 'three@example.com', 'cv.pdf', content=None)
+
+    assert [job.id for job in app.archivable_jobs()] == [old.id]
+    archive = app.archive_job(old)
+
+    assert applicants_of(app, old.id) == []
+    assert (archive.applicant_count, archive.cv_count) == (2, 2)
+    assert not app.storage.exists('unique-one.pdf')
+    assert app.storage.exists('cv.pdf')
+    assert app.archive_storage.exists(archive.name)
+
+
+@pytest.mark.parametrize('batch_size', [500, 1])
+def test_restore_is_idempotent_when_ids_were_reused(app, monkeypatch, batch_size):
+    monkeypatch.setitem(app.app.config, 'ARCHIVE_BATCH_SIZE', batch_size)
+    old = add_job(app, 'Old', closed_days_ago=400)
+    other = add_job(app, 'Other', closed_days_ago=-30)
+    first = add_applicant(app, old, 'one@example.com', 'one.pdf', b'first cv')
+    add_applicant(app, old, 'two@example.com', 'two.pdf', b'second cv')
+    first_id = first.id
+    archive = app.archive_job(old)
+    name = archive.name
+    with app.archive_storage.local_path(name) as path, open(path, 'rb') as f:
+        packed = f.read()
+
+    # The freed id is taken by a new application before the restore
+    app.db.session.execute(app.db.insert(app.AppliedJob), [{
+        'id': first_id, 'job_id': other.id, 'first_name': 'New', 'father_name': 'Row',
+        'applicant_email': 'new@example.com', 'applied_at': datetime.utcnow()}])
+    app.storage.save('one.pdf', io.BytesIO(b'someone else'))
+    app.db.session.commit()
+
+    app.restore_job_archive(old.id)
+    restored = applicants_of(app, old.id)
+    assert sorted(a.applicant_email for a in restored) == ['one@example.com', 'two@example.com']
+    assert first_id not in [a.id for a in restored]
+    assert app.JobArchive.query.filter_by(job_id=old.id).first() is None
+    for applicant in restored:
+        with app.storage.open(applicant.cv_path.split('/', 1)[1]) as cv:
+            assert cv.read() in (b'first cv', b'second cv')
+    with app.storage.open('one.pdf') as cv:
+        assert cv.read() == b'someone else'
+
+    # Run again as if the first run had stopped before removing the stub
+    app.archive_storage.save(name, io.BytesIO(packed))
+    app.db.session.add(app.JobArchive(job_id=old.id, name=name, applicant_count=2, cv_count=2,
+                                      size=len(packed)))
+    app.db.session.commit()
+    app.restore_job_archive(old.id)
+    assert len(applicants_of(app, old.id)) == 2
+    assert app.db.session.get(app.AppliedJob, first_id).applicant_email == 'new@example.com'
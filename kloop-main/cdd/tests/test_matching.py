@@ -0,0 +1,158 @@
+import math
+import re
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from matching import JobMatcher, tokenize
+
+JOB = 'Senior Python developer: Flask, SQLAlchemy and PostgreSQL; Docker is a plus.'
+CVS = {
+    1: 'Python developer, five years of Flask and SQLAlchemy. Python Python.',
+    2: 'Forklift driver with a clean licence.',
+    3: 'Docker and PostgreSQL administrator; some Python scripting.',
+    4: '',
+    5: 'Java developer. Spring, Hibernate, PostgreSQL.',
+}
+
+
+def reference_scores(job_text, cvs):
+    """Dense TF-IDF cosine, computed from scratch for comparison."""
+    counts = {doc_id: Counter(tokenize(text)) for doc_id, text in cvs.items()}
+    df = Counter(term for c in counts.values() for term in c)
+    idf = {term: math.log((1 + len(cvs)) / (1 + df[term])) + 1 for term in set(df) | set(tokenize(job_text))}
+
+    def vector(c):
+        return {term: (1 + math.log(n)) * idf[term] for term, n in c.items()}
+
+    query = vector(Counter(tokenize(job_text)))
+    query_norm = math.sqrt(sum(w * w for w in query.values())) or 1.0
+    scores = {}
+    for doc_id, c in counts.items():
+        doc = vector(c)
+        norm = math.sqrt(sum(w * w for w in doc.values()))
+        dot = sum(w * query.get(term, 0.0) for term, w in doc.items())
+        scores[doc_id] = dot / (norm * query_norm) if norm else 0.0
+    return scores
+
+
+def assert_matches_reference(matcher, cvs):
+    doc_ids, scores = matcher.scores()
+    assert sorted(doc_ids.tolist()) == sorted(cvs)
+    expected = reference_scores(matcher.job_text, cvs)
+    for doc_id, score in zip(doc_ids.tolist(), scores.tolist()):
+        assert score == pytest.approx(expected[doc_id], abs=1e-9)
+
+
+def test_scores_match_a_dense_reference():
+    matcher = JobMatcher(JOB)
+    for doc_id, text in CVS.items():
+        matcher.add(doc_id, text)
+    assert_matches_reference(matcher, CVS)
+    assert [doc_id for doc_id, _ in matcher.ranked()][:2] == [1, 3]
+    assert dict(matcher.ranked())[4] == 0.0
+
+
+def test_incremental_updates_match_a_rebuild():
+    matcher = JobMatcher(JOB)
+    cvs = {}
+    steps = [('add', 1), ('add', 2), ('add', 3), ('remove', 2), ('add', 5),
+             ('edit', 1), ('add', 2), ('remove', 1), ('remove', 3), ('remove', 5), ('add', 4)]
+    for action, doc_id in steps:
+        if action == 'remove':
+            matcher.remove(doc_id)
+            del cvs[doc_id]
+        else:
+            cvs[doc_id] = CVS[doc_id] if action == 'add' else 'Rust and Go developer.'
+            matcher.add(doc_id, cvs[doc_id])
+        assert_matches_reference(matcher, cvs)
+        assert len(matcher) == len(cvs)
+    # Entries of removed applicants were dropped once they were the majority.
+    rows, _, _ = matcher._coo
+    assert set(rows.tolist()) <= {matcher.rows[doc_id] for doc_id in cvs}
+
+
+def test_scores_are_cached_until_the_applicants_change():
+    matcher = JobMatcher(JOB)
+    matcher.add(1, CVS[1])
+    scores = matcher.scores()
+    assert matcher.scores() is scores
+    matcher.add(2, CVS[2])
+    assert matcher.scores() is not scores
+    scores = matcher.scores()
+    matcher.remove(99)
+    assert matcher.scores() is scores
+    matcher.remove(2)
+    assert matcher.scores() is not scores
+
+
+def test_stamps_are_kept_per_applicant():
+    matcher = JobMatcher(JOB)
+    matcher.add(1, CVS[1], stamp='a')
+    matcher.add(1, CVS[2], stamp='b')
+    assert 1 in matcher and len(matcher) == 1
+    assert matcher.stamp(1) == 'b'
+
+
+@pytest.fixture
+def fresh_matchers(app, monkeypatch):
+    # Job ids start again in every test database.
+    monkeypatch.setattr(app, 'job_matchers', {})
+
+
+def add_job(app, **fields):
+    job = app.Job(title='Python developer', description='Flask and SQLAlchemy', requirements='PostgreSQL',
+                  **fields)
+    app.db.session.add(job)
+    app.db.session.commit()
+    return job
+
+
+def apply(app, job, name, cv_text, extracted_at=datetime(2026, 1, 1)):
+    applicant = app.AppliedJob(job_id=job.id, first_name=name, father_name='B', applicant_email=f'{name}@x',
+                               cv_text=cv_text, cv_extracted_at=extracted_at if cv_text is not None else None)
+    app.db.session.add(applicant)
+    app.db.session.commit()
+    return applicant
+
+
+def listed_names(response):
+    return re.findall(r'<td>(\w+)</td> <!-- Change to first_name -->', response.get_data(as_text=True))
+
+
+def test_applied_jobs_sorts_by_match_score(app, fresh_matchers):
+    job = add_job(app)
+    apply(app, job, 'Driver', 'Forklift driver.')
+    apply(app, job, 'Pending', None)
+    apply(app, job, 'Dev', 'Python developer with Flask, SQLAlchemy and PostgreSQL.')
+    apply(app, job, 'Ops', 'PostgreSQL administrator.')
+    client = app.app.test_client()
+    assert listed_names(client.get(f'/vadmin/applied_jobs/{job.id}')) == ['Driver', 'Pending', 'Dev', 'Ops']
+    response = client.get(f'/vadmin/applied_jobs/{job.id}?sort=match')
+    # Applicants whose CV is not extracted yet have no score and come last.
+    assert listed_names(response) == ['Dev', 'Ops', 'Driver', 'Pending']
+    assert '0%</td>' in response.get_data(as_text=True)
+    assert '<td>-</td>' in response.get_data(as_text=True)
+
+
+def test_job_matcher_follows_the_database(app, fresh_matchers):
+    job = add_job(app)
+    dev = apply(app, job, 'Dev', 'Python developer.')
+    ops = apply(app, job, 'Ops', 'PostgreSQL administrator.')
+    matcher = app.job_matcher(job)
+    assert set(matcher.rows) == {dev.id, ops.id}
+    scores = matcher.scores()
+    assert app.job_matcher(job).scores() is scores
+
+    ops.cv_text = 'Python, Flask, SQLAlchemy and PostgreSQL.'
+    ops.cv_extracted_at += timedelta(minutes=1)
+    app.db.session.delete(dev)
+    app.db.session.commit()
+    doc_ids, scores = app.job_matcher(job).scores()
+    assert doc_ids.tolist() == [ops.id]
+    assert scores[0] == pytest.approx(reference_scores(matcher.job_text, {ops.id: ops.cv_text})[ops.id])
+
+    job.requirements = 'Docker'
+    app.db.session.commit()
+    assert app.job_matcher(job) is not matcher
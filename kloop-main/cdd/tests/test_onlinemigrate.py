@@ -0,0 +1,142 @@
+import pytest
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+import onlinemigrate
+from onlinemigrate import backfill, copy_and_swap
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture
+def connection(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+    with engine.connect() as connection:
+        connection.exec_driver_sql('CREATE TABLE item (id INTEGER PRIMARY KEY, n INTEGER, label VARCHAR(20))')
+        connection.exec_driver_sql('CREATE TABLE item_log (item_id INTEGER, label VARCHAR(20))')
+        connection.exec_driver_sql('CREATE INDEX ix_item_n ON item (n)')
+        connection.exec_driver_sql('CREATE TRIGGER item_logged AFTER INSERT ON item BEGIN '
+                                   'INSERT INTO item_log VALUES (new.id, new.label); END')
+        connection.exec_driver_sql('CREATE TABLE tag (id INTEGER PRIMARY KEY, '
+                                   'item_id INTEGER REFERENCES item (id) ON DELETE CASCADE)')
+        connection.execute(sa.text('INSERT INTO item (id, n, label) VALUES (:id, :n, :label)'),
+                           [{'id': i, 'n': i, 'label': f'item {i}'} for i in range(1, 11)])
+        connection.exec_driver_sql('INSERT INTO tag (item_id) VALUES (3)')
+        connection.commit()
+        context = MigrationContext.configure(connection)
+        with Operations.context(context):
+            yield connection
+
+
+def new_item(*indexes):
+    return sa.Table('item', sa.MetaData(),
+                    sa.Column('id', sa.Integer(), primary_key=True),
+                    sa.Column('n', sa.Integer(), nullable=False),
+                    sa.Column('label', sa.String(20)),
+                    sa.Column('size', sa.Integer(), nullable=False, server_default='0'),
+                    *indexes)
+
+
+def pause_with(monkeypatch, *actions):
+    """Run one action in each pause between batches."""
+    actions = list(actions)
+
+    def sleep(seconds):
+        if actions:
+            actions.pop(0)()
+    monkeypatch.setattr(onlinemigrate.time, 'sleep', sleep)
+
+
+def interrupt():
+    raise Interrupted()
+
+
+def rows(connection, sql):
+    return connection.exec_driver_sql(sql).fetchall()
+
+
+def table_names(connection, kind):
+    return {row[0] for row in rows(connection, f"SELECT name FROM sqlite_master WHERE type = '{kind}'")}
+
+
+def test_backfill_resumes_from_its_checkpoint(connection, monkeypatch):
+    pause_with(monkeypatch, lambda: None, interrupt)
+    with pytest.raises(Interrupted):
+        backfill('item', 'n = n + 100', batch_size=3)
+    assert rows(connection, 'SELECT name, position FROM migration_checkpoint') == [('backfill:item', 6)]
+
+    connection.commit()
+    pause_with(monkeypatch)
+    backfill('item', 'n = n + 100', batch_size=3)
+    # Every row updated exactly once, across both runs.
+    assert [n for n, in rows(connection, 'SELECT n FROM item ORDER BY id')] == list(range(101, 111))
+    assert 'migration_checkpoint' not in table_names(connection, 'table')
+
+
+def test_backfill_only_touches_matching_rows(connection, monkeypatch):
+    pause_with(monkeypatch)
+    backfill('item', "label = 'even'", where='n % 2 = 0', batch_size=4)
+    labels = [label for label, in rows(connection, 'SELECT label FROM item ORDER BY id')]
+    assert labels == ['item 1', 'even', 'item 3', 'even', 'item 5', 'even', 'item 7', 'even', 'item 9', 'even']
+
+
+def test_copy_mirrors_writes_made_during_the_copy(connection, monkeypatch):
+    def write():
+        connection.exec_driver_sql("INSERT INTO item (id, n, label) VALUES (11, 11, 'new')")
+        connection.exec_driver_sql("UPDATE item SET label = 'copied, then changed' WHERE id = 2")
+        connection.exec_driver_sql("UPDATE item SET label = 'changed before copy' WHERE id = 9")
+        connection.exec_driver_sql('DELETE FROM item WHERE id = 1')
+        connection.exec_driver_sql('DELETE FROM item WHERE id = 8')
+
+    pause_with(monkeypatch, write)
+    copy_and_swap(new_item(), copy={'size': 'length(label)'}, batch_size=4)
+    assert rows(connection, 'SELECT id, label, size FROM item ORDER BY id') == [
+        (2, 'copied, then changed', 20),
+        (3, 'item 3', 6), (4, 'item 4', 6), (5, 'item 5', 6), (6, 'item 6', 6), (7, 'item 7', 6),
+        (9, 'changed before copy', 19),
+        (10, 'item 10', 7),
+        (11, 'new', 3),
+    ]
+
+
+def test_copy_resumes_after_an_interruption(connection, monkeypatch):
+    pause_with(monkeypatch, interrupt)
+    with pytest.raises(Interrupted):
+        copy_and_swap(new_item(), batch_size=4)
+    assert rows(connection, 'SELECT position FROM migration_checkpoint') == [(4,)]
+    assert rows(connection, 'SELECT count(*) FROM _shadow_item') == [(4,)]
+    # The mirror triggers stay in place between runs.
+    connection.exec_driver_sql("UPDATE item SET label = 'between runs' WHERE id = 1")
+    connection.commit()
+
+    pause_with(monkeypatch)
+    copy_and_swap(new_item(), batch_size=4)
+    assert rows(connection, 'SELECT id, label, size FROM item ORDER BY id') == (
+        [(1, 'between runs', 0)] + [(i, f'item {i}', 0) for i in range(2, 11)])
+    assert not {name for name in table_names(connection, 'table') if name.startswith('_shadow')}
+    assert 'migration_checkpoint' not in table_names(connection, 'table')
+
+
+def test_swap_keeps_triggers_and_builds_new_indexes(connection, monkeypatch):
+    pause_with(monkeypatch)
+    copy_and_swap(new_item(sa.Index('ix_item_label', 'label')), batch_size=4,
+                  after_swap=['CREATE INDEX ix_item_size ON item (size)'])
+    assert table_names(connection, 'trigger') == {'item_logged'}
+    indexes = {name for name, in rows(connection, "SELECT name FROM sqlite_master WHERE type = 'index' "
+                                                  "AND tbl_name = 'item' AND sql IS NOT NULL")}
+    assert indexes == {'ix_item_label', 'ix_item_size'}
+    connection.exec_driver_sql("INSERT INTO item (n, label) VALUES (12, 'after swap')")
+    assert rows(connection, 'SELECT label FROM item_log ORDER BY rowid DESC LIMIT 1') == [('after swap',)]
+    assert rows(connection, 'PRAGMA table_info(item)')[3][1:3] == ('size', 'INTEGER')
+
+
+def test_swap_leaves_referencing_rows_and_foreign_keys_alone(connection, monkeypatch):
+    connection.exec_driver_sql('PRAGMA foreign_keys = ON')
+    connection.commit()
+    pause_with(monkeypatch)
+    copy_and_swap(new_item(), batch_size=4)
+    assert rows(connection, 'SELECT item_id FROM tag') == [(3,)]
+    assert rows(connection, 'PRAGMA foreign_keys') == [(1,)]
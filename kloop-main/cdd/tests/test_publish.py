@@ -0,0 +1,160 @@
+import json
+import os
+
+import pytest
+
+import publish
+from publish import StaticSite
+
+
+@pytest.fixture
+def pages():
+    return {'/': (200, b'home'), '/prod/1': (200, b'desk'), '/sitemap.xml': (200, b'<urlset/>')}
+
+
+@pytest.fixture
+def site(tmp_path, pages):
+    return StaticSite(str(tmp_path / 'site'), lambda path: pages.get(path, (404, b'')))
+
+
+def read(site, path):
+    with open(site.file_for(path), 'rb') as f:
+        return f.read()
+
+
+def test_file_for_maps_urls_to_files(site):
+    root = site.directory
+    assert site.file_for('/') == os.path.join(root, 'index.html')
+    assert site.file_for('/prod/1/') == os.path.join(root, 'prod', '1', 'index.html')
+    assert site.file_for('/sitemap.xml') == os.path.join(root, 'sitemap.xml')
+    assert site.file_for('/../../etc/passwd') == os.path.join(root, 'etc', 'passwd', 'index.html')
+
+
+def test_publish_writes_pages(site):
+    assert site.publish(['/', '/prod/1', '/sitemap.xml', '/prod/1']) == {'written': 3, 'removed': 0, 'failed': 0}
+    assert read(site, '/prod/1') == b'desk'
+    assert read(site, '/sitemap.xml') == b'<urlset/>'
+    assert oct(os.stat(site.file_for('/')).st_mode & 0o777) == '0o644'
+
+
+def test_unchanged_pages_are_not_rewritten(site, pages):
+    site.publish(['/', '/prod/1'])
+    filename = site.file_for('/prod/1')
+    os.utime(filename, (1000000000, 1000000000))
+    pages['/'] = (200, b'new home')
+    assert site.publish(['/', '/prod/1']) == {'written': 1, 'removed': 0, 'failed': 0}
+    assert os.path.getmtime(filename) == 1000000000
+    assert read(site, '/') == b'new home'
+
+
+def test_pages_are_replaced_atomically(site, pages, monkeypatch):
+    site.publish(['/prod/1'])
+    pages['/prod/1'] = (200, b'a new desk')
+    replaced = []
+    replace = os.replace
+
+    def checked_replace(source, destination):
+        # The new page is complete, next to its destination, before it is swapped in.
+        assert os.path.dirname(source) == os.path.dirname(destination)
+        with open(source, 'rb') as f:
+            replaced.append(f.read())
+        with open(destination, 'rb') as f:
+            assert f.read() == b'desk'
+        replace(source, destination)
+    monkeypatch.setattr(publish.os, 'replace', checked_replace)
+    site.publish(['/prod/1'])
+    assert replaced == [b'a new desk']
+
+
+def test_failed_write_keeps_the_old_page(site, pages, monkeypatch):
+    site.publish(['/prod/1'])
+    pages['/prod/1'] = (200, b'a new desk')
+
+    def fail(source, destination):
+        raise OSError('disk full')
+    monkeypatch.setattr(publish.os, 'replace', fail)
+    with pytest.raises(OSError):
+        site.publish(['/prod/1'])
+    assert read(site, '/prod/1') == b'desk'
+    assert os.listdir(os.path.dirname(site.file_for('/prod/1'))) == ['index.html']
+
+
+def test_gone_pages_are_removed_with_their_directories(site, pages):
+    site.publish(['/', '/prod/1'])
+    pages['/prod/1'] = (410, b'')
+    assert site.publish(['/prod/1', '/prod/2']) == {'written': 0, 'removed': 1, 'failed': 0}
+    assert os.listdir(site.directory) == ['index.html']
+
+
+def test_failed_renders_leave_the_previous_page(site, pages):
+    site.publish(['/prod/1'])
+    pages['/prod/1'] = (500, b'error')
+    assert site.publish(['/prod/1']) == {'written': 0, 'removed': 0, 'failed': 1}
+    assert read(site, '/prod/1') == b'desk'
+
+
+def test_export_removes_pages_no_longer_listed(site, pages):
+    site.publish(['/', '/prod/1'])
+    os.makedirs(os.path.join(site.directory, 'old'))
+    with open(os.path.join(site.directory, 'old', 'index.html'), 'wb') as f:
+        f.write(b'stale')
+    with open(os.path.join(site.directory, '.htaccess'), 'wb') as f:
+        f.write(b'keep')
+    summary = site.export(['/', '/sitemap.xml'])
+    assert summary == {'written': 1, 'removed': 2, 'failed': 0}
+    assert sorted(os.listdir(site.directory)) == ['.htaccess', 'index.html', 'sitemap.xml']
+
+
+def queued_paths(app):
+    tasks = app.queue.table
+    rows = app.db.session.execute(app.db.select(tasks.c.payload).where(tasks.c.name == 'publish_pages'))
+    return [json.loads(payload)['paths'] for payload, in rows]
+
+
+@pytest.fixture
+def static_site(app, tmp_path, monkeypatch):
+    site = StaticSite(str(tmp_path / 'site'), app.render_public_page)
+    monkeypatch.setattr(app, 'static_site', site)
+    return site
+
+
+def test_pages_for_each_model(app):
+    assert app.pages_for(app.Product, 3) == ['/prod', '/prod/3', '/sitemap.xml']
+    assert app.pages_for(app.BlogPost, 4) == ['/bloog', '/bloog/post/4', '/feeds/blog.atom', '/sitemap.xml']
+    assert app.pages_for(app.NewsArticle, 5) == ['/bloog', '/bloog/news/5', '/feeds/news.atom', '/sitemap.xml']
+    assert app.pages_for(app.Job, 6) == ['/vacancy', '/feeds/jobs.atom', '/sitemap.xml']
+    assert app.pages_for(app.TeamMember, 7) == ['/about']
+    assert app.pages_for(app.ActionHistory, 8) == []
+
+
+def test_commits_queue_the_changed_pages(app, static_site):
+    desk = app.Product(name='Desk', price=10, image='desk.png', description='A desk.')
+    chair = app.Product(name='Chair', price=5, image='chair.png', description='A chair.')
+    app.db.session.add_all([desk, chair])
+    app.db.session.commit()
+    assert queued_paths(app) == [['/prod', '/prod/1', '/sitemap.xml', '/prod/2']]
+
+    app.db.session.execute(app.queue.table.delete())
+    app.db.session.commit()
+    app.db.session.delete(chair)
+    app.db.session.commit()
+    assert queued_paths(app) == [['/prod', '/prod/2', '/sitemap.xml']]
+
+
+def test_nothing_is_queued_without_a_static_site(app):
+    app.db.session.add(app.Product(name='Desk', price=10, image='desk.png', description='A desk.'))
+    app.db.session.commit()
+    assert queued_paths(app) == []
+
+
+def test_publish_pages_renders_and_removes(app, static_site):
+    app.db.session.add(app.Product(name='Oak desk', price=10, image='desk.png', description='A desk.'))
+    app.db.session.commit()
+    app.publish_pages(['/prod/1', '/sitemap.xml'])
+    assert b'Oak desk' in read(static_site, '/prod/1')
+    assert b'/prod/1' in read(static_site, '/sitemap.xml')
+
+    app.db.session.delete(app.db.session.get(app.Product, 1))
+    app.db.session.commit()
+    app.publish_pages(['/prod/1'])
+    assert not os.path.exists(static_site.file_for('/prod/1'))
@@ -0,0 +1,40 @@
+import threading
+
+import pytest
+
+from pubsub import Broker, BrokerRelay, BrokerServer
+
+
+@pytest.fixture
+def broker_server():
+    server = BrokerServer(('127.0.0.1', 0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address
+    server.shutdown()
+    server.server_close()
+
+
+def test_publish_only_process_reaches_other_relays(broker_server):
+    # The streaming process has started its relay; the publisher (a worker,
+    # say) never calls start() and relies on publish() to connect.
+    streaming, publishing = Broker(), Broker()
+    reader = BrokerRelay(streaming, broker_server)
+    reader.start()
+    assert reader.connected.wait(5)
+    writer = BrokerRelay(publishing, broker_server)
+
+    with streaming.subscribe(['action_history']) as remote, publishing.subscribe(['action_history']) as local:
+        writer.publish('action_history', {'id': 1, 'action': 'created'})
+        assert remote.get(timeout=5) == ('action_history', {'id': 1, 'action': 'created'})
+        # The broker echoes it back to the publishing process too.
+        assert local.get(timeout=5) == ('action_history', {'id': 1, 'action': 'created'})
+        assert local.get(timeout=0.2) is None
+
+
+def test_publish_without_broker_is_delivered_locally():
+    broker = Broker()
+    relay = BrokerRelay(broker, ('127.0.0.1', 9), reconnect_delay=60, connect_timeout=0.1)
+    with broker.subscribe(['applied_job']) as subscription:
+        relay.publish('applied_job', {'id': 7})
+        assert subscription.get(timeout=1) == ('applied_job', {'id': 7})
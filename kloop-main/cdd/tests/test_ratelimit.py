@@ -0,0 +1,140 @@
+import threading
+
+import pytest
+from flask import Flask
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+import ratelimit
+from ratelimit import MemoryStore, RateLimiter
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit.time, 'time', clock)
+    return clock
+
+
+def limited_app(limiter, **limits):
+    app = Flask(__name__)
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
+
+    @app.route('/hit', methods=['GET', 'POST'])
+    @limiter.limit('hit', **limits)
+    def hit():
+        return 'ok'
+
+    return app
+
+
+def test_memory_bucket_refills_at_its_rate():
+    store = MemoryStore()
+    assert [store.consume('k', 0.5, 2, 0)[0] for _ in range(3)] == [True, True, False]
+    assert store.consume('k', 0.5, 2, 1)[0] is False
+    assert store.consume('k', 0.5, 2, 2)[0] is True
+    # Idle time never fills the bucket beyond its burst.
+    assert [store.consume('k', 0.5, 2, 1000)[0] for _ in range(3)] == [True, True, False]
+
+
+def test_database_bucket_refills_at_its_rate(app):
+    store = app.rate_limit_store
+    assert [store.consume('k', 0.5, 2, 0)[0] for _ in range(3)] == [True, True, False]
+    assert store.consume('k', 0.5, 2, 2)[0] is True
+    assert store.consume('k', 0.5, 2, 2)[0] is False
+    assert [store.consume('k', 0.5, 2, 1000)[0] for _ in range(3)] == [True, True, False]
+
+
+def test_rejection_carries_retry_after(clock):
+    client = limited_app(RateLimiter(), per_client=(6, 60, 2)).test_client()
+    assert [client.get('/hit').status_code for _ in range(3)] == [200, 200, 429]
+    response = client.get('/hit')
+    assert response.status_code == 429
+    # One token every 10 seconds.
+    assert response.headers['Retry-After'] == '10'
+    clock.now += 4
+    assert client.get('/hit').headers['Retry-After'] == '6'
+    clock.now += 6
+    assert client.get('/hit').status_code == 200
+
+
+def test_per_client_buckets_follow_the_forwarded_address(clock):
+    client = limited_app(RateLimiter(), per_client=(1, 60)).test_client()
+
+    def hit(address):
+        return client.get('/hit', headers={'X-Forwarded-For': address}).status_code
+
+    assert [hit('203.0.113.1'), hit('203.0.113.1')] == [200, 429]
+    assert hit('203.0.113.2') == 200
+
+
+def test_per_route_bucket_is_shared_by_every_client(clock):
+    client = limited_app(RateLimiter(), per_client=(5, 60), per_route=(2, 60)).test_client()
+    statuses = [client.get('/hit', headers={'X-Forwarded-For': f'203.0.113.{i}'}).status_code
+                for i in range(3)]
+    assert statuses == [200, 200, 429]
+
+
+def test_disabled_limiter_lets_everything_through(clock):
+    limiter = RateLimiter(enabled=False)
+    client = limited_app(limiter, per_client=(1, 60)).test_client()
+    assert {client.get('/hit').status_code for _ in range(5)} == {200}
+
+
+@pytest.fixture
+def limiter(app, monkeypatch):
+    monkeypatch.setattr(app.limiter, 'store', MemoryStore())
+    monkeypatch.setattr(app.limiter, 'enabled', True)
+    return app.limiter
+
+
+@pytest.mark.parametrize('path', ['/login', '/lagin', '/bagin', '/sagin', '/tagin'])
+def test_login_routes_only_limit_posts(app, limiter, path):
+    client = app.app.test_client()
+    assert all(client.get(path).status_code == 200 for _ in range(20))
+    form = {'username': 'nobody', 'password': 'wrong', 'email': 'nobody@example.com'}
+    statuses = [client.post(path, data=form).status_code for _ in range(11)]
+    assert 429 not in statuses[:10]
+    assert statuses[10] == 429
+
+
+def test_login_routes_share_one_bucket(app, limiter):
+    client = app.app.test_client()
+    for _ in range(10):
+        client.post('/login', data={'username': 'nobody', 'password': 'wrong'})
+    assert client.post('/lagin', data={'username': 'nobody', 'password': 'wrong'}).status_code == 429
+
+
+def test_upload_slot_is_released_when_the_view_fails():
+    limiter = RateLimiter()
+    app = Flask(__name__)
+    entered, release = threading.Event(), threading.Event()
+
+    @app.route('/upload', methods=['POST'])
+    @limiter.concurrency('upload', 1)
+    def upload():
+        if release.is_set():
+            return 'ok'
+        entered.set()
+        release.wait(5)
+        raise RuntimeError('storage is down')
+
+    failed = []
+    worker = threading.Thread(target=lambda: failed.append(app.test_client().post('/upload').status_code))
+    worker.start()
+    assert entered.wait(5)
+    busy = app.test_client().post('/upload')
+    assert busy.status_code == 429
+    assert busy.headers['Retry-After'] == '5'
+    release.set()
+    worker.join(5)
+    assert failed == [500]
+    assert app.test_client().post('/upload').status_code == 200
+    assert limiter.semaphores['upload'].acquire(blocking=False)
@@ -0,0 +1,132 @@
+import sqlite3
+
+import pytest
+
+from readmodel import CHANGE_LOG_DDL, ReadModel
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / 'catalog.db')
+    writer = sqlite3.connect(path, isolation_level=None)
+    writer.execute('CREATE TABLE product (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, '
+                   'price FLOAT NOT NULL, image VARCHAR(100), description TEXT, updated_at DATETIME)')
+    writer.execute('CREATE TABLE job (id INTEGER PRIMARY KEY, title VARCHAR(100), description TEXT, '
+                   'requirements TEXT, deadline DATETIME, is_active BOOLEAN NOT NULL DEFAULT 1)')
+    for statement in CHANGE_LOG_DDL:
+        writer.execute(statement)
+    writer.executemany('INSERT INTO product (id, name, price, image, description) VALUES (?, ?, ?, ?, ?)',
+                       [(1, 'Desk', 300.0, 'desk.png', ''), (2, 'chair', 80.0, 'chair.png', ''),
+                        (3, 'Lamp', 25.0, 'lamp.png', '')])
+    writer.executemany('INSERT INTO job (id, title, deadline, is_active) VALUES (?, ?, ?, ?)',
+                       [(1, 'Welder', '2026-12-01 00:00:00', 1), (2, 'Driver', None, 0)])
+    yield path, writer
+    writer.close()
+
+
+@pytest.fixture
+def model(database, monkeypatch):
+    path, _ = database
+    model = ReadModel(lambda: sqlite3.connect(path, check_same_thread=False), max_changes=5)
+    model.refresh()
+    model.loads = 0
+    load = model.load
+
+    def counted_load():
+        model.loads += 1
+        load()
+    monkeypatch.setattr(model, 'load', counted_load)
+    return model
+
+
+def names(model, sort='newest', **filters):
+    return [record.name for record in model.product_page(sort=sort, **filters)[0]]
+
+
+def test_first_refresh_loads_everything(model):
+    assert names(model) == ['Lamp', 'chair', 'Desk']
+    assert [job.title for job in model.active_jobs()] == ['Welder']
+    assert model.active_jobs()[0].deadline.year == 2026
+    assert model.seq == 5
+
+
+def test_refresh_without_commits_reads_nothing(model, monkeypatch):
+    monkeypatch.setattr(model, '_reload_products', None)
+    model.refresh()
+    assert model.loads == 0
+
+
+def test_refresh_reloads_only_changed_rows(model, database):
+    _, writer = database
+    writer.execute("INSERT INTO product (id, name, price, image, description) VALUES (4, 'Bench', 120, '', '')")
+    writer.execute("UPDATE product SET price = 500 WHERE id = 3")
+    writer.execute('DELETE FROM product WHERE id = 2')
+    # Columns the read model does not keep are not logged.
+    writer.execute("UPDATE product SET updated_at = CURRENT_TIMESTAMP WHERE id = 1")
+    model.refresh()
+    assert model.loads == 0
+    assert model.seq == 8
+    assert names(model) == ['Bench', 'Lamp', 'Desk']
+    assert model.products[3].price == 500.0
+    assert model.by_id == [1, 3, 4]
+
+
+def test_renames_and_reprices_are_resorted(model, database):
+    _, writer = database
+    writer.execute("UPDATE product SET name = 'armchair', price = 900 WHERE id = 2")
+    writer.execute("UPDATE product SET price = 10 WHERE id = 1")
+    model.refresh()
+    assert names(model, 'name') == ['armchair', 'Desk', 'Lamp']
+    assert names(model, 'price') == ['Desk', 'Lamp', 'armchair']
+    assert names(model, 'price_desc') == ['armchair', 'Lamp', 'Desk']
+    assert names(model, 'price', min_price=20, max_price=900) == ['Lamp', 'armchair']
+    assert names(model, 'name', q='ARM') == ['armchair']
+    assert names(model, 'name', q='ch') == []
+    assert model.price_counts([0, 50, 500]) == [2, 0, 1]
+    assert model.by_price == sorted(model.by_price)
+    assert model.by_name == sorted(model.by_name)
+
+
+def test_price_facets_follow_changes(model, database):
+    _, writer = database
+    assert model.price_counts([0, 100], q='d') == [0, 1]
+    writer.execute("UPDATE product SET price = 50 WHERE id = 1")
+    model.refresh()
+    assert model.price_counts([0, 100], q='d') == [1, 0]
+
+
+def test_jobs_are_deactivated_and_reactivated(model, database):
+    _, writer = database
+    writer.execute('UPDATE job SET is_active = 0 WHERE id = 1')
+    writer.execute('UPDATE job SET is_active = 1 WHERE id = 2')
+    model.refresh()
+    assert [job.title for job in model.active_jobs()] == ['Driver']
+    writer.execute('DELETE FROM job WHERE id = 2')
+    model.refresh()
+    assert model.active_jobs() == []
+    assert model.loads == 0
+
+
+def test_reloads_in_full_when_the_log_was_pruned_past_it(model, database):
+    _, writer = database
+    for price in range(10, 16):
+        writer.execute('UPDATE product SET price = ? WHERE id = 1', (price,))
+    model.prune(keep=2)
+    assert writer.execute('SELECT min(seq) FROM read_model_change').fetchone()[0] == 10
+    model.refresh()
+    assert model.loads == 1
+    assert model.seq == 11
+    assert model.products[1].price == 15.0
+
+
+def test_reloads_in_full_when_too_far_behind(model, database):
+    _, writer = database
+    writer.executemany("INSERT INTO product (name, price, image, description) VALUES (?, 1, '', '')",
+                       [(f'Item {i}',) for i in range(6)])
+    model.refresh()
+    assert model.loads == 1
+    assert len(model.products) == 9
+    writer.execute("UPDATE product SET name = 'Stool' WHERE id = 4")
+    model.refresh()
+    assert model.loads == 1
+    assert model.products[4].name == 'Stool'
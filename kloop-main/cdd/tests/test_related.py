@@ -0,0 +1,98 @@
+import json
+from collections import Counter
+
+import numpy as np
+import pytest
+
+import related
+from matching import tokenize
+
+TEXTS = [
+    'oak desk with drawers',
+    'oak office desk',
+    'steel office chair with wheels',
+    'ergonomic office chair',
+    'garden hose',
+    'hose reel for garden hose',
+    'lamp',
+    '',
+]
+
+
+def dense_cosines(texts):
+    """Reference: every term as a column, cosine of every pair."""
+    counts = [Counter(tokenize(text)) for text in texts]
+    df = Counter(term for terms in counts for term in terms)
+    vocabulary = sorted(df)
+    matrix = np.zeros((len(texts), len(vocabulary)))
+    for row, terms in enumerate(counts):
+        for term, count in terms.items():
+            idf = np.log((1.0 + len(texts)) / (1.0 + df[term])) + 1.0
+            matrix[row, vocabulary.index(term)] = (1.0 + np.log(count)) * idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+    return matrix @ matrix.T
+
+
+@pytest.fixture
+def vectors():
+    return related.Vectors(list(range(10, 10 + len(TEXTS))), TEXTS)
+
+
+def test_similarities_match_dense_cosines(vectors):
+    expected = dense_cosines(TEXTS)
+    np.fill_diagonal(expected, -1.0)
+    rows = [5, 0, 7, 2]
+    np.testing.assert_allclose(vectors.similarities(rows), expected[rows], atol=1e-6)
+
+
+def test_only_shared_terms_are_stored(vectors):
+    # 'drawers', 'steel', 'wheels', 'ergonomic', 'reel', 'lamp' are unique to one item.
+    assert len(vectors.term_ptr) - 1 == len({'oak', 'desk', 'office', 'chair', 'garden', 'hose'})
+    assert vectors.indices.size == vectors.term_rows.size == 13
+
+
+@pytest.mark.parametrize('batch_size', [1, 3, 64])
+def test_nearest_ranks_best_first(vectors, batch_size):
+    result = dict(related.nearest(vectors, range(len(vectors)), k=2, batch_size=batch_size))
+    assert [item_id for item_id, _ in result[10]] == [11]
+    assert [item_id for item_id, _ in result[14]] == [15]
+    assert result[16] == [] and result[17] == []
+    scores = [score for _, score in result[12]]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_affected_covers_listing_and_newly_close_items(vectors):
+    neighbours = dict(related.nearest(vectors, range(len(vectors)), k=2))
+    # Item 13 changed: it, items listing it and items it is now closer to than their weakest.
+    rows = related.affected(vectors, [13], neighbours, k=2)
+    assert vectors.rows[13] in rows
+    assert {vectors.rows[item_id] for item_id, listed in neighbours.items()
+            if any(related_id == 13 for related_id, _ in listed)} <= set(rows)
+    assert vectors.rows[14] not in rows
+
+
+def queued_paths(app):
+    tasks = app.queue.table
+    rows = app.db.session.execute(app.db.select(tasks.c.payload).where(tasks.c.name == 'publish_pages'))
+    return sorted(path for payload, in rows for path in json.loads(payload)['paths'])
+
+
+def test_refresh_queues_pages_whose_related_list_changed(app, monkeypatch):
+    for name, description in [('Oak desk', 'oak desk with drawers'), ('Oak office desk', 'oak office desk'),
+                              ('Office chair', 'steel office chair'), ('Garden hose', 'garden hose')]:
+        app.db.session.add(app.Product(name=name, price=10, image='x.png', description=description))
+    app.db.session.commit()
+    monkeypatch.setattr(app, 'static_site', object())
+
+    app.refresh_related('product', full=True)
+    assert queued_paths(app) == ['/prod/1', '/prod/2', '/prod/3']
+    app.db.session.execute(app.queue.table.delete())
+
+    # The hose now reads like a chair: its list and the chair's change, the desks' do not.
+    monkeypatch.setattr(app, 'static_site', None)
+    app.db.session.get(app.Product, 4).description = 'garden chair'
+    app.db.session.commit()
+    monkeypatch.setattr(app, 'static_site', object())
+    app.refresh_related('product')
+    assert queued_paths(app) == ['/prod/3', '/prod/4']
@@ -0,0 +1,20 @@
+import pytest
+import sqlalchemy as sa
+
+# The expression used by the gender backfills in the migrations.
+BACKFILL_BUCKET = ("COALESCE(NULLIF(UPPER(SUBSTR(TRIM(:gender), 1, 1)) || "
+                   "LOWER(SUBSTR(TRIM(:gender), 2, 19)), ''), 'Unknown')")
+
+
+@pytest.mark.parametrize('gender', ['female', 'MALE', ' non-BINARY ', 'x' * 25, '', None])
+def test_gender_bucket_matches_migration_backfill(app, gender):
+    expected = app.db.session.execute(sa.text(f'SELECT {BACKFILL_BUCKET}'), {'gender': gender}).scalar()
+    assert app.gender_bucket(gender) == expected
+
+
+def test_stats_require_admin(app):
+    client = app.app.test_client()
+    assert client.get('/vadmin/stats').status_code == 403
+    with client.session_transaction() as session:
+        session['admin_logged_in'] = True
+    assert client.get('/vadmin/stats').status_code == 200
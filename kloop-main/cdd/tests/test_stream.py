@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+
+def record(app, *actions):
+    for action in actions:
+        app.db.session.add(app.ActionHistory('product', 1, action, ''))
+    app.db.session.commit()
+
+
+def open_stream(app, last_event_id=None):
+    client = app.app.test_client()
+    with client.session_transaction() as session:
+        session['admin_logged_in'] = True
+    headers = {'Last-Event-ID': last_event_id} if last_event_id else {}
+    return client.get('/admin/stream?channels=action_history', headers=headers, buffered=False)
+
+
+def events(response, count):
+    """The first ``count`` chunks of the stream after the retry line, then close it."""
+    chunks = iter(response.response)
+    assert next(chunks) == b'retry: 3000\n\n'
+    try:
+        return [next(chunks).decode() for _ in range(count)]
+    finally:
+        response.close()
+
+
+def fields(chunk):
+    return dict(line.split(': ', 1) for line in chunk.strip().split('\n'))
+
+
+@pytest.fixture
+def stream_app(app, monkeypatch):
+    # Rows reach subscribers by polling; these tests only look at replay.
+    monkeypatch.setattr(app.fanout, 'start', lambda: None)
+    return app
+
+
+def test_fresh_stream_starts_at_latest_row(stream_app):
+    record(stream_app, 'created', 'updated')
+    [start] = events(open_stream(stream_app), 1)
+    assert start == 'id: action_history:2\n\n'
+
+
+def test_reconnect_replays_missed_rows(stream_app):
+    record(stream_app, 'created', 'updated', 'deleted')
+    first, second = events(open_stream(stream_app, 'action_history:1'), 3)[1:]
+    assert fields(first)['id'] == 'action_history:2'
+    assert json.loads(fields(first)['data'])['action'] == 'updated'
+    assert fields(second)['id'] == 'action_history:3'
+    assert json.loads(fields(second)['data'])['action'] == 'deleted'
+
+
+@pytest.mark.parametrize('last_event_id', ['action_history-3', 'applied_job:1', 'action_history:0'])
+def test_reconnect_resets_when_rows_cannot_be_replayed(stream_app, monkeypatch, last_event_id):
+    monkeypatch.setitem(stream_app.app.config, 'ADMIN_STREAM_REPLAY', 2)
+    record(stream_app, 'created', 'updated', 'deleted')
+    [reset] = events(open_stream(stream_app, last_event_id), 1)
+    assert reset == 'event: reset\ndata: {}\n\n'
+
+
+def test_failed_stream_setup_releases_its_slot(stream_app, monkeypatch):
+    def broken(positions, limit):
+        raise RuntimeError('database is locked')
+
+    monkeypatch.setattr(stream_app, 'stream_backlog', broken)
+    for _ in range(stream_app.app.config['ADMIN_STREAM_LIMIT'] + 1):
+        with pytest.raises(RuntimeError):
+            open_stream(stream_app, 'action_history:0')
+    monkeypatch.undo()
+    monkeypatch.setattr(stream_app.fanout, 'start', lambda: None)
+    [start] = events(open_stream(stream_app), 1)
+    assert start == 'id: action_history:0\n\n'
@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def suggest_app(app):
+    app.suggest_index.replace([])
+    app.suggest_index.built_at = None
+    yield app
+    with app.suggest_rebuild:
+        app.suggest_index.built_at = None
+
+
+def suggestions(app, q):
+    return [item['label'] for item in app.app.test_client().get(f'/api/suggest?q={q}').get_json()['suggestions']]
+
+
+def test_stale_index_is_rebuilt_in_the_background(suggest_app, monkeypatch):
+    suggest_app.db.session.add(suggest_app.Product(name='Oak desk', price=1, image='x.png', description=''))
+    suggest_app.db.session.commit()
+    assert suggestions(suggest_app, 'oak') == ['Oak desk']
+
+    # Another process adds a product; this one only sees it after a rebuild.
+    suggest_app.db.session.execute(suggest_app.Product.__table__.insert().values(
+        name='Oak chair', price=1, image='x.png', description=''))
+    suggest_app.db.session.commit()
+    suggest_app.suggest_index.expire()
+    started, release = threading.Event(), threading.Event()
+    build = suggest_app.build_suggest_index
+
+    def slow_build():
+        started.set()
+        release.wait(5)
+        build()
+
+    monkeypatch.setattr(suggest_app, 'build_suggest_index', slow_build)
+    # Answered from the current index while the rebuild waits, and only one rebuild starts.
+    assert suggestions(suggest_app, 'oak') == ['Oak desk']
+    assert started.wait(5)
+    assert suggestions(suggest_app, 'oak') == ['Oak desk']
+    assert suggest_app.suggest_rebuild.locked()
+    release.set()
+    with suggest_app.suggest_rebuild:
+        pass
+    assert sorted(suggestions(suggest_app, 'oak')) == ['Oak chair', 'Oak desk']
+
+
+def test_first_lookups_build_once(suggest_app, monkeypatch):
+    calls = []
+    build = suggest_app.build_suggest_index
+    monkeypatch.setattr(suggest_app, 'build_suggest_index', lambda: (calls.append(1), build()))
+    def lookup():
+        with suggest_app.app.app_context():
+            suggest_app.ensure_suggest_index()
+
+    threads = [threading.Thread(target=lookup) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
@@ -0,0 +1,145 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+
+from tasks import TaskQueue
+
+
+@pytest.fixture
+def queue():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db = SQLAlchemy(app)
+    queue = TaskQueue(db, visibility_timeout=60, max_attempts=3)
+    queue.calls = []
+
+    @queue.task('record')
+    def record(value):
+        queue.calls.append(value)
+
+    @queue.task('explode')
+    def explode():
+        raise RuntimeError('boom')
+
+    with app.app_context():
+        db.create_all()
+        yield queue
+
+
+def rows(queue):
+    return queue.db.session.execute(queue.table.select().order_by(queue.table.c.id)).all()
+
+
+def test_enqueued_task_runs_once_and_is_marked_done(queue):
+    queue.enqueue('record', {'value': 42})
+    queue.db.session.commit()
+    assert queue.run_pending() == 1
+    assert queue.calls == [42]
+    assert rows(queue)[0].status == 'done'
+    assert queue.run_pending() == 0
+
+
+def test_uncommitted_task_is_not_run(queue):
+    queue.enqueue('record', {'value': 1})
+    queue.db.session.rollback()
+    assert queue.run_pending() == 0
+
+
+def test_delayed_task_waits_for_run_at(queue):
+    queue.enqueue('record', {'value': 1}, delay=60)
+    queue.db.session.commit()
+    assert queue.claim() is None
+
+
+def test_lease_hides_task_until_it_expires(queue):
+    queue.enqueue('record', {'value': 1})
+    queue.db.session.commit()
+    first = queue.claim()
+    assert first.attempts == 1
+    assert queue.claim() is None
+
+    # The worker died: once the lease runs out another worker takes over.
+    queue.db.session.execute(queue.table.update().values(locked_until=datetime.utcnow() - timedelta(seconds=1)))
+    queue.db.session.commit()
+    second = queue.claim()
+    assert (second.id, second.attempts) == (first.id, 2)
+
+    # The first worker finishing late must not settle the re-leased attempt.
+    queue.complete(first.id, first.attempts)
+    assert rows(queue)[0].status == 'running'
+    queue.complete(second.id, second.attempts)
+    assert rows(queue)[0].status == 'done'
+
+
+def test_failure_is_retried_with_backoff_then_dead(queue):
+    queue.enqueue('explode')
+    queue.db.session.commit()
+    before = datetime.utcnow()
+    queue.run_next()
+    row = rows(queue)[0]
+    assert row.status == 'queued'
+    assert 'RuntimeError: boom' in row.last_error
+    # base ** attempts, jittered down to half
+    assert before + timedelta(seconds=0.9) <= row.run_at <= datetime.utcnow() + timedelta(seconds=2)
+
+    for _ in range(2):
+        queue.db.session.execute(queue.table.update().values(run_at=datetime.utcnow()))
+        queue.db.session.commit()
+        queue.run_next()
+    row = rows(queue)[0]
+    assert (row.status, row.attempts) == ('dead', 3)
+    assert queue.claim() is None
+
+
+def test_enqueue_requires_a_handler(queue):
+    with pytest.raises(KeyError):
+        queue.enqueue('missing')
+
+
+def test_periodic_registers_schedule_and_enqueue_once_dedupes(queue):
+    @queue.periodic('tick', interval=30)
+    def tick():
+        queue.calls.append('tick')
+
+    assert queue.schedule['tick'] == 30
+    queue.enqueue_once('tick')
+    queue.enqueue_once('tick')
+    queue.db.session.commit()
+    assert len(rows(queue)) == 1
+    queue.run_pending()
+    queue.enqueue_once('tick')
+    queue.db.session.commit()
+    assert [row.status for row in rows(queue)] == ['done', 'queued']
+
+
+def test_purge_keeps_pending_and_recent_tasks(queue):
+    old = datetime.utcnow() - timedelta(days=40)
+    for status in ('done', 'dead', 'queued'):
+        queue.enqueue('record', {'value': status})
+        queue.db.session.execute(queue.table.update().where(queue.table.c.status == 'queued')
+                                 .values(status=status, run_at=old, created_at=old))
+    queue.enqueue('record', {'value': 'recent'})
+    queue.db.session.execute(queue.table.update().where(queue.table.c.status == 'queued',
+                                                        queue.table.c.run_at > old)
+                             .values(status='done'))
+    queue.db.session.commit()
+    assert queue.purge(timedelta(days=7), timedelta(days=30)) == 2
+    assert sorted(row.status for row in rows(queue)) == ['done', 'queued']
+    assert queue.stats()['queued']['count'] == 1
+
+
+def test_purge_counts_age_from_when_a_task_finished(queue):
+    # Created long ago, but delayed and retried until just now
+    old = datetime.utcnow() - timedelta(days=40)
+    queue.enqueue('record', {'value': 'late'})
+    queue.enqueue('explode', max_attempts=1)
+    queue.db.session.execute(queue.table.update().values(run_at=old, created_at=old))
+    queue.db.session.commit()
+    assert queue.run_pending() == 2
+    assert [row.status for row in rows(queue)] == ['done', 'dead']
+    assert all(row.run_at > old + timedelta(days=39) for row in rows(queue))
+    assert queue.purge(timedelta(days=7), timedelta(days=30)) == 0
+    assert queue.purge(timedelta(0), timedelta(days=30)) == 1
+    assert [row.status for row in rows(queue)] == ['dead']
@@ -0,0 +1,77 @@
+import io
+import os
+import time
+from datetime import datetime
+
+import uploadgc
+
+
+def test_reference_name_accepts_every_stored_form():
+    assert uploadgc.reference_name('cv.pdf') == 'cv.pdf'
+    assert uploadgc.reference_name('uploads/cv.pdf') == 'cv.pdf'
+    assert uploadgc.reference_name('/uploads/my%20photo.png?v=2') == 'my photo.png'
+    assert uploadgc.reference_name('') is None
+    assert uploadgc.reference_name(None) is None
+
+
+def test_scan_orphans_skips_referenced_and_recent_files():
+    now = 1_000_000
+    entries = [('kept.png', 10, now - 7200), ('orphan.png', 20, now - 7200), ('fresh.png', 30, now - 60)]
+    assert list(uploadgc.scan_orphans(entries, {'kept.png'}, grace=3600, now=now)) == [('orphan.png', 20)]
+
+
+def store(app, name, age=0):
+    app.storage.save(name, io.BytesIO(b'data'))
+    if age:
+        stamp = time.time() - age
+        os.utime(app.storage.path(name), (stamp, stamp))
+
+
+def quarantined(app, name):
+    return os.path.exists(os.path.join(app.storage.quarantine_dir, f"{datetime.utcnow():%Y-%m-%d}", name))
+
+
+def test_sweep_quarantines_only_old_unreferenced_uploads(app):
+    day = 24 * 3600
+    for name in ('product.png', 'photo.png', 'cv.pdf', 'orphan.png'):
+        store(app, name, age=2 * day)
+    store(app, 'fresh.png')
+    job = app.Job(title='Job', description='d', requirements='r')
+    app.db.session.add_all([
+        app.Product(name='Chair', price=1, image='product.png', description='d'),
+        app.TeamMember(name='Abebe', job_title='CEO', photo_url='/uploads/photo.png'),
+        job,
+    ])
+    app.db.session.flush()
+    app.db.session.add(app.AppliedJob(job_id=job.id, first_name='A', father_name='B', applicant_email='a@b',
+                                      gender='male', age=30, cv_path='uploads/cv.pdf'))
+    app.db.session.commit()
+
+    assert app.sweep_uploads(dry_run=True) == [('orphan.png', 4)]
+    assert app.storage.exists('orphan.png')
+
+    assert app.sweep_uploads() == [('orphan.png', 4)]
+    assert not app.storage.exists('orphan.png') and quarantined(app, 'orphan.png')
+    assert all(app.storage.exists(name) for name in ('product.png', 'photo.png', 'cv.pdf', 'fresh.png'))
+
+
+def test_released_upload_is_collected_after_grace_unless_reused(app, monkeypatch):
+    monkeypatch.setitem(app.app.config, 'UPLOAD_GC_GRACE', 0)
+    store(app, 'old.png', age=60)
+    store(app, 'reused.png', age=60)
+    product = app.Product(name='Chair', price=1, image='reused.png', description='d')
+    app.db.session.add(product)
+    app.release_upload('uploads/old.png')
+    app.release_upload('reused.png')
+    app.db.session.commit()
+
+    assert app.queue.run_pending() == 2
+    assert quarantined(app, 'old.png') and not app.storage.exists('old.png')
+    assert app.storage.exists('reused.png')
+
+
+def test_released_upload_overwritten_within_grace_is_kept(app, monkeypatch):
+    monkeypatch.setitem(app.app.config, 'UPLOAD_GC_GRACE', 3600)
+    store(app, 'new.png')
+    app.collect_upload('new.png')
+    assert app.storage.exists('new.png')
@@ -0,0 +1,144 @@
+import io
+
+import pytest
+import requests
+from itsdangerous import URLSafeTimedSerializer
+
+from objectsink import ObjectSink
+from storage import LocalStorage, S3Storage
+
+
+@pytest.fixture(scope='module')
+def sink():
+    sink = ObjectSink(port=0)
+    port = sink.start()
+    yield sink, f'http://localhost:{port}'
+    sink.shutdown()
+    sink.server_close()
+
+
+@pytest.fixture
+def s3(sink, monkeypatch):
+    server, endpoint = sink
+    server.objects.clear()
+    monkeypatch.setenv('AWS_EC2_METADATA_DISABLED', 'true')
+    return S3Storage('amco-uploads', endpoint_url=endpoint, region='us-east-1',
+                     access_key='test', secret_key='test')
+
+
+def direct_upload(form, content, filename='upload.bin'):
+    return requests.post(form['url'], data=form['fields'], files={'file': (filename, content)}, timeout=5)
+
+
+def test_local_storage_has_no_direct_uploads(tmp_path):
+    storage = LocalStorage(str(tmp_path / 'uploads'), str(tmp_path / 'quarantine'))
+    assert storage.presign_upload('a.pdf', 1024) is None
+    assert not storage.exists('a.pdf')
+    storage.save('a.pdf', io.BytesIO(b'cv'))
+    assert storage.exists('a.pdf')
+    assert storage.exists('../uploads/a.pdf')
+    assert not storage.exists('b.pdf')
+
+
+def test_s3_exists_follows_saves_and_deletes(s3):
+    assert not s3.exists('a.pdf')
+    s3.save('a.pdf', io.BytesIO(b'cv'))
+    assert s3.exists('a.pdf')
+    assert s3.modified('a.pdf') is not None
+    s3.delete('a.pdf')
+    assert not s3.exists('a.pdf')
+    assert s3.modified('a.pdf') is None
+
+
+def test_s3_presigned_form_uploads_under_the_prefix(s3, sink):
+    form = s3.presign_upload('a.pdf', 1024, expires=60)
+    assert form['fields']['key'] == 'uploads/a.pdf'
+    assert direct_upload(form, b'%PDF-1.4').status_code == 204
+    assert sink[0].get('amco-uploads', 'uploads/a.pdf')[0] == b'%PDF-1.4'
+    assert s3.exists('a.pdf')
+    with s3.open('a.pdf') as body:
+        assert body.read() == b'%PDF-1.4'
+
+
+@pytest.fixture
+def uploads(app, s3, monkeypatch):
+    monkeypatch.setattr(app, 'storage', s3)
+    return app
+
+
+def presign(client, kind, filename):
+    return client.post('/api/uploads/presign', json={'kind': kind, 'filename': filename})
+
+
+def attach(app, ticket, field='cv', name_field='cv_name'):
+    with app.app.test_request_context(method='POST', data={name_field: ticket}):
+        return app.save_upload(field, name_field)
+
+
+def test_presigned_ticket_attaches_its_upload(uploads):
+    response = presign(uploads.app.test_client(), 'cv', 'My CV.pdf')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['name'].endswith('-My_CV.pdf')
+    assert direct_upload(data, b'%PDF-1.4').status_code == 204
+    assert attach(uploads, data['ticket']) == data['name']
+
+
+def test_ticket_without_an_uploaded_object_is_refused(uploads):
+    data = presign(uploads.app.test_client(), 'cv', 'cv.pdf').get_json()
+    assert attach(uploads, data['ticket']) is None
+
+
+def test_ticket_for_another_kind_is_refused(uploads):
+    data = presign(uploads.app.test_client(), 'cv', 'photo.png').get_json()
+    direct_upload(data, b'png')
+    assert attach(uploads, data['ticket'], 'image', 'image_name') is None
+
+
+def test_expired_ticket_is_refused(uploads, monkeypatch):
+    data = presign(uploads.app.test_client(), 'cv', 'cv.pdf').get_json()
+    direct_upload(data, b'%PDF-1.4')
+    monkeypatch.setitem(uploads.app.config, 'UPLOAD_TICKET_MAX_AGE', -1)
+    assert attach(uploads, data['ticket']) is None
+
+
+def test_forged_tickets_are_refused(uploads):
+    uploads.storage.save('0123456789ab-cv.pdf', io.BytesIO(b'%PDF-1.4'))
+    forged = URLSafeTimedSerializer('not the secret', salt='direct-upload').dumps(['cv', '0123456789ab-cv.pdf'])
+    assert attach(uploads, forged) is None
+    genuine = uploads.upload_tickets.dumps(['cv', '0123456789ab-cv.pdf'])
+    assert attach(uploads, genuine.rsplit('.', 1)[0] + '.' + 'A' * 27) is None
+    assert attach(uploads, 'not-a-ticket') is None
+    assert attach(uploads, uploads.upload_tickets.dumps('0123456789ab-cv.pdf')) is None
+    assert attach(uploads, genuine) == '0123456789ab-cv.pdf'
+
+
+def test_ticket_for_a_referenced_upload_is_refused(uploads):
+    client = uploads.app.test_client()
+    with client.session_transaction() as session:
+        session['admin_logged_in'] = True
+    data = presign(client, 'image', 'desk.png').get_json()
+    direct_upload(data, b'png')
+    uploads.db.session.add(uploads.Product(name='Desk', price=10, image=data['name'], description='A desk.'))
+    uploads.db.session.commit()
+    assert attach(uploads, data['ticket'], 'image', 'image_name') is None
+
+
+def test_image_tickets_need_an_admin_session(uploads):
+    client = uploads.app.test_client()
+    assert presign(client, 'image', 'desk.png').status_code == 403
+    with client.session_transaction() as session:
+        session['admin_logged_in'] = True
+    assert presign(client, 'image', 'desk.exe').status_code == 400
+    assert presign(client, 'image', 'desk.png').status_code == 200
+
+
+def test_presign_needs_a_kind_and_filename(uploads):
+    client = uploads.app.test_client()
+    assert presign(client, 'avatar', 'a.png').status_code == 400
+    assert presign(client, 'cv', '../..').status_code == 400
+
+
+def test_presign_is_unavailable_with_local_storage(app):
+    response = presign(app.app.test_client(), 'cv', 'cv.pdf')
+    assert response.status_code == 404
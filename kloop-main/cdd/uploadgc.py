@@ -0,0 +1,33 @@
+import os
+import time
+from urllib.parse import unquote
+
+
+def reference_name(value):
+    """File name an upload column refers to: a bare name, 'uploads/x' or '/uploads/x'."""
+    if not value:
+        return None
+    return os.path.basename(unquote(value).split('?', 1)[0]) or None
+
+
+def build_references(*columns):
+    """Set of referenced file names from iterables of column values."""
+    references = set()
+    for values in columns:
+        for value in values:
+            name = reference_name(value)
+            if name:
+                references.add(name)
+    return references
+
+
+def scan_orphans(entries, references, grace, now=None):
+    """Yield (name, size) for unreferenced files older than ``grace`` seconds.
+
+    ``entries`` is a stream of (name, size, mtime), such as a storage
+    backend's ``list()``.
+    """
+    cutoff = (now or time.time()) - grace
+    for name, size, mtime in entries:
+        if name not in references and mtime < cutoff:
+            yield name, size